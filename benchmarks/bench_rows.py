@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+读取与行转换的内存分配
+不写出文件，只测量从打开工作簿到得到写出后端所需的数据行这一段，两种引擎包含相同的阶段：
+- streaming: open_rows打开工作簿并逐行读取
+- pandas: read_excel_dataframe整表读取，再用frame_rows转换DataFrame
+用tracemalloc记录这一段的分配峰值，折算为每行字节数，同时输出每秒行数
+
+用法:
+    python benchmarks/bench_rows.py --rows 100000 --profiles numeric,date
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..', 'src'))
+
+from split_engine import frame_rows, open_rows, read_excel_dataframe  # noqa: E402
+from synthetic import PROFILES, SHAPES, ensure_workbook  # noqa: E402
+
+
+def _traced(produce):
+    """执行produce()并逐行消费其结果，返回 (行数, 耗时, 分配峰值字节数)"""
+    tracemalloc.start()
+    started = time.perf_counter()
+    count = sum(1 for _ in produce())
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return count, elapsed, peak
+
+
+def measure_streaming(input_path):
+    return _traced(lambda: open_rows(input_path)[1])
+
+
+def measure_pandas(input_path):
+    return _traced(lambda: frame_rows(read_excel_dataframe(input_path))[1])
+
+
+def _split_list(value):
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="读取与行转换的内存分配")
+    parser.add_argument('--rows', type=int, default=100000, help="数据行数")
+    parser.add_argument('--shapes', default='narrow', help="表格宽度: narrow,wide")
+    parser.add_argument('--profiles', default=','.join(PROFILES), help="数据类型: numeric,text,date")
+    parser.add_argument('--data-dir', default=os.path.join(BENCH_DIR, '.data'), help="合成数据缓存目录")
+    args = parser.parse_args()
+
+    print(f"{'数据':<28}{'引擎':<11}{'行/秒':>10}{'分配峰值(字节/行)':>20}")
+    for shape in _split_list(args.shapes):
+        for profile in _split_list(args.profiles):
+            input_path = ensure_workbook(args.data_dir, args.rows, profile, shape)
+            dataset = f"{profile}_{shape}_{args.rows}"
+            for engine, measure in (('streaming', measure_streaming), ('pandas', measure_pandas)):
+                count, elapsed, peak = measure(input_path)
+                print(f"{dataset:<28}{engine:<11}{count / elapsed:>10.0f}{peak / max(count, 1):>20.1f}")
+
+
+if __name__ == '__main__':
+    main()
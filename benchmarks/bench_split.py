@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+拆分性能测试
+用合成工作簿（10k~2M行，窄表/宽表，数值/文本/日期为主）分别测试每个拆分引擎，
+输出每秒行数、峰值内存（RSS）和生成第一个文件所用的时间。
+每次测试在单独的子进程中运行，峰值内存互不影响。
+
+用法:
+    python benchmarks/bench_split.py --rows 10000,100000 --engines streaming,pandas
+    python benchmarks/bench_split.py --json result.json
+    python benchmarks/bench_split.py --baseline result.json --tolerance 0.2
+
+指定--baseline时，与基线相比每秒行数下降或峰值内存上升超过容差的测试会被标记，
+并以退出码1结束，可用于发现性能回退。
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(BENCH_DIR, '..', 'src')
+sys.path.insert(0, SRC_DIR)
+
+from synthetic import PROFILES, SHAPES, ensure_workbook  # noqa: E402
+
+
+def _measure(input_path, output_dir, rows_per_file, engine, writer, workers):
+    """在子进程中执行一次拆分"""
+    sys.path.insert(0, SRC_DIR)
+    from profiling import peak_rss_bytes
+    from splitter import Splitter
+
+    result = Splitter(input_path, rows_per_file, output_dir=output_dir, engine=engine,
+                      writer=writer, workers=workers).run()
+    return {
+        'rows': result['rows'],
+        'files': len(result['files']),
+        'elapsed': result['elapsed'],
+        'rows_per_sec': result['rows_per_sec'],
+        'first_file_seconds': result['first_file_seconds'],
+        'peak_rss_mb': (peak_rss_bytes() or 0) / (1024 * 1024),
+    }
+
+
+def run_case(input_path, rows_per_file, engine, writer, workers):
+    output_dir = tempfile.mkdtemp(prefix='bench_split_')
+    try:
+        # spawn启动的子进程不继承父进程内存，峰值RSS只反映本次拆分
+        context = multiprocessing.get_context('spawn')
+        with context.Pool(1) as pool:
+            return pool.apply(_measure, (input_path, output_dir, rows_per_file, engine, writer, workers))
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+
+def find_regressions(results, baseline, tolerance):
+    """与基线比较，返回回退描述列表"""
+    baseline_by_key = {item['case']: item for item in baseline}
+    regressions = []
+    for item in results:
+        base = baseline_by_key.get(item['case'])
+        if not base:
+            continue
+        if item['rows_per_sec'] < base['rows_per_sec'] * (1 - tolerance):
+            regressions.append(f"{item['case']}: 行/秒 {base['rows_per_sec']:.0f} -> {item['rows_per_sec']:.0f}")
+        if base['peak_rss_mb'] and item['peak_rss_mb'] > base['peak_rss_mb'] * (1 + tolerance):
+            regressions.append(f"{item['case']}: 峰值内存 {base['peak_rss_mb']:.0f}MB -> {item['peak_rss_mb']:.0f}MB")
+    return regressions
+
+
+def _split_list(value):
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="拆分性能测试")
+    parser.add_argument('--rows', default='10000,100000', help="数据行数列表，逗号分隔（可到2000000）")
+    parser.add_argument('--shapes', default=','.join(SHAPES), help="表格宽度: narrow,wide")
+    parser.add_argument('--profiles', default=','.join(PROFILES), help="数据类型: numeric,text,date")
+    parser.add_argument('--engines', default='streaming,pandas', help="要测试的拆分引擎")
+    parser.add_argument('--writer', default=None, help="输出格式（默认openpyxl）")
+    parser.add_argument('--workers', type=int, default=1, help="并发写出分块的进程数")
+    parser.add_argument('--rows-per-file', type=int, default=50000, help="每个小文件的行数")
+    parser.add_argument('--data-dir', default=os.path.join(BENCH_DIR, '.data'), help="合成数据缓存目录")
+    parser.add_argument('--json', help="将结果保存为JSON文件")
+    parser.add_argument('--baseline', help="与之比较的基线JSON文件")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="允许的性能波动比例（默认0.2）")
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'测试':<36}{'引擎':<11}{'行/秒':>10}{'峰值内存(MB)':>14}{'首个文件(秒)':>14}")
+    for rows in [int(value) for value in _split_list(args.rows)]:
+        for shape in _split_list(args.shapes):
+            for profile in _split_list(args.profiles):
+                input_path = ensure_workbook(args.data_dir, rows, profile, shape)
+                for engine in _split_list(args.engines):
+                    measured = run_case(input_path, args.rows_per_file, engine, args.writer, args.workers)
+                    dataset = f"{profile}_{shape}_{rows}"
+                    measured.update(case=f"{dataset}/{engine}", dataset=dataset, engine=engine)
+                    results.append(measured)
+                    print(f"{dataset:<36}{engine:<11}{measured['rows_per_sec']:>10.0f}"
+                          f"{measured['peak_rss_mb']:>14.1f}{measured['first_file_seconds'] or 0:>14.2f}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"结果已保存: {args.json}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = find_regressions(results, json.load(f), args.tolerance)
+        if regressions:
+            print("发现性能回退:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("与基线相比没有性能回退")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+写出后端吞吐量对比
+生成合成数据，用每个可用的写出后端写出同样的分块，输出每秒行数和文件大小
+
+用法:
+    python benchmarks/bench_writers.py --rows 100000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from synthetic import synthetic_header, synthetic_rows  # noqa: E402
+from writers import available_writers, get_writer  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="写出后端吞吐量对比")
+    parser.add_argument('--rows', type=int, default=100000, help="每个后端写出的行数")
+    args = parser.parse_args()
+
+    header = synthetic_header(5)
+    rows = list(synthetic_rows(args.rows))
+
+    print(f"{'后端':<12}{'耗时(秒)':>10}{'行/秒':>12}{'文件大小(MB)':>14}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for name in available_writers():
+            writer = get_writer(name)
+            output_path = os.path.join(tmp_dir, f"bench{writer.extension}")
+            started = time.perf_counter()
+            writer.write(output_path, header, rows)
+            elapsed = time.perf_counter() - started
+            size_mb = os.path.getsize(output_path) / (1024 * 1024)
+            print(f"{name:<12}{elapsed:>10.2f}{args.rows / elapsed:>12.0f}{size_mb:>14.2f}")
+
+
+if __name__ == '__main__':
+    main()
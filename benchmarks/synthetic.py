@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+性能测试用的合成数据
+按行数、宽度（narrow / wide）和数据类型（numeric / text / date）生成工作簿，
+生成结果按参数缓存在数据目录中，重复运行时直接复用
+"""
+
+import datetime
+import os
+
+SHAPES = {'narrow': 5, 'wide': 50}
+PROFILES = ('numeric', 'text', 'date')
+
+_START = datetime.datetime(2020, 1, 1)
+
+
+def _cell(profile, row, column):
+    kind = (row + column) % 4
+    if profile == 'numeric':
+        return row * column if kind else (row + column) * 1.25
+    if profile == 'text':
+        return f"客户{(row * 31 + column) % 997:04d}" if kind else f"00{row}"
+    if profile == 'date':
+        return _START + datetime.timedelta(minutes=row + column) if kind else row
+    # 混合数据：整数、浮点、文本、日期各占一部分
+    return (row, row * 1.25, f"备注-{row}", _START + datetime.timedelta(minutes=row))[kind]
+
+
+def synthetic_rows(count, profile='mixed', columns=5):
+    """逐行生成合成数据"""
+    for row in range(count):
+        yield tuple(_cell(profile, row, column) for column in range(columns))
+
+
+def synthetic_header(columns):
+    return [f"列{column + 1}" for column in range(columns)]
+
+
+def make_workbook(path, rows, profile, columns):
+    """用xlsxwriter的constant_memory模式生成工作簿，生成百万行时内存占用也很小"""
+    import xlsxwriter
+
+    workbook = xlsxwriter.Workbook(path, {
+        'constant_memory': True,
+        'default_date_format': 'yyyy-mm-dd hh:mm:ss',
+    })
+    sheet = workbook.add_worksheet('Sheet1')
+    sheet.write_row(0, 0, synthetic_header(columns))
+    for index, row in enumerate(synthetic_rows(rows, profile, columns), start=1):
+        sheet.write_row(index, 0, row)
+    workbook.close()
+
+
+def ensure_workbook(data_dir, rows, profile, shape):
+    """返回指定参数的合成工作簿路径，不存在时生成"""
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, f"{profile}_{shape}_{rows}.xlsx")
+    if not os.path.exists(path):
+        make_workbook(path + '.tmp', rows, profile, SHAPES[shape])
+        os.replace(path + '.tmp', path)
+    return path
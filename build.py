@@ -4,12 +4,45 @@ Excel文件拆分工具构建脚本
 使用PyInstaller将应用打包成可执行文件
 """
 
+import argparse
 import os
 import sys
 import shutil
 import subprocess
 from pathlib import Path
 
+APP_NAME = 'Excel文件拆分工具'
+
+# 拆分用不到的pandas/numpy子模块和可选依赖，打包时排除以减小体积，单文件exe每次启动时解压得更快。
+# pandas.io.sql、pandas.io.html等在import pandas时就会导入，不能排除
+EXCLUDED_MODULES = [
+    'pandas.tests',
+    'pandas.plotting._matplotlib',
+    'pandas.io.formats.style',
+    'pandas.io.clipboard',
+    'numpy.tests',
+    'numpy.f2py',
+    'numpy.distutils',
+    'pyarrow.tests',
+    'matplotlib',
+    'scipy',
+    'IPython',
+    'jinja2',
+    'sqlalchemy',
+    'tables',
+    'numba',
+    'pytest',
+    'PIL',
+    'bs4',
+    'html5lib',
+]
+
+# 启动耗时报告中测量的导入：GUI窗口显示前的导入，以及窗口显示后在后台预先导入的依赖
+IMPORTTIME_TARGETS = [
+    ('GUI启动', 'import excel_splitter_gui'),
+    ('后台预导入', 'import split_engine; split_engine.prewarm_imports()'),
+]
+
 def clean_build():
     """清理之前的构建文件"""
     print("🧹 清理之前的构建文件...")
@@ -38,16 +71,20 @@ def clean_build():
                     print(f"  删除文件: {path}")
                     os.remove(path)
 
-def build_exe():
-    """构建可执行文件"""
+def build_exe(onedir=False, exclude=True):
+    """
+    构建可执行文件
+    onedir为True时打包为目录，启动时不需要解压，比单文件启动快；
+    exclude为True时排除EXCLUDED_MODULES中用不到的模块
+    """
     print("🔨 开始构建可执行文件...")
     
     # PyInstaller命令参数
     cmd = [
         sys.executable, '-m', 'PyInstaller',
-        '--onefile',                    # 打包成单个文件
+        '--onedir' if onedir else '--onefile',  # 打包成目录或单个文件
         '--windowed',                   # Windows下隐藏控制台窗口
-        '--name=Excel文件拆分工具',        # 可执行文件名称
+        f'--name={APP_NAME}',           # 可执行文件名称
         '--icon=assets/icon.ico',       # 图标文件（如果存在）
         '--add-data=src:src',           # 添加源代码目录
         '--hidden-import=pandas',       # 确保pandas被包含
@@ -56,8 +93,10 @@ def build_exe():
         '--hidden-import=xlsxwriter',   # 确保xlsxwriter被包含
         '--hidden-import=tkinter',      # 确保tkinter被包含
         '--clean',                      # 清理临时文件
-        'src/main.py'                   # 主入口文件
     ]
+    if exclude:
+        cmd += [f'--exclude-module={name}' for name in EXCLUDED_MODULES]
+    cmd.append('src/main.py')           # 主入口文件
     
     # 如果没有图标文件，移除图标参数
     if not os.path.exists('assets/icon.ico'):
@@ -72,7 +111,7 @@ def build_exe():
         print(result.stdout)
         
         # 检查生成的文件
-        exe_path = Path('dist/Excel文件拆分工具.exe')
+        exe_path = Path(f'dist/{APP_NAME}/{APP_NAME}.exe') if onedir else Path(f'dist/{APP_NAME}.exe')
         if exe_path.exists():
             file_size = exe_path.stat().st_size / (1024 * 1024)  # MB
             print(f"📦 生成的可执行文件: {exe_path}")
@@ -89,6 +128,49 @@ def build_exe():
     
     return True
 
+def measure_import_time(code):
+    """
+    用python -X importtime在src目录中执行code
+    返回 (总耗时秒, [(累计耗时秒, 模块名), ...], 导入过的所有模块名)，
+    列表为顶层模块直接导入的模块，按耗时从大到小排列
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                            cwd='src', capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "导入失败")
+
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # 每深一层缩进两个空格，第0层是import语句中的顶层模块
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        entries.append((depth, int(cumulative) / 1e6, name.strip()))
+
+    total = sum(seconds for depth, seconds, _ in entries if depth == 0)
+    direct = sorted(((seconds, name) for depth, seconds, name in entries if depth == 1), reverse=True)
+    return total, direct, {name for _, _, name in entries}
+
+
+def report_import_time(top=8):
+    """输出启动耗时报告：GUI窗口显示前的导入耗时，以及其中最慢的模块"""
+    print("⏱️  启动耗时（python -X importtime）:")
+    for label, code in IMPORTTIME_TARGETS:
+        try:
+            total, direct, modules = measure_import_time(code)
+        except RuntimeError as e:
+            print(f"  {label}: 测量失败 - {e}")
+            continue
+        print(f"  {label}: {total * 1000:.0f} ms")
+        for seconds, name in direct[:top]:
+            print(f"    {seconds * 1000:>8.1f} ms  {name}")
+        if label == IMPORTTIME_TARGETS[0][0]:
+            heavy = sorted(name for name in ('pandas', 'numpy', 'openpyxl', 'pyarrow') if name in modules)
+            if heavy:
+                print(f"  ⚠️  GUI启动时导入了 {', '.join(heavy)}，窗口会显示得更慢")
+
+
 def create_installer_script():
     """创建安装脚本"""
     print("📝 创建安装脚本...")
@@ -119,6 +201,13 @@ pause
 
 def main():
     """主函数"""
+    parser = argparse.ArgumentParser(description="Excel文件拆分工具构建脚本")
+    parser.add_argument('--onedir', action='store_true',
+                        help="打包为目录而不是单个文件，启动时不需要解压到临时目录")
+    parser.add_argument('--no-exclude', action='store_true', help="不排除用不到的pandas子模块和可选依赖")
+    parser.add_argument('--importtime', action='store_true', help="只输出启动耗时报告，不构建")
+    args = parser.parse_args()
+
     print("🚀 Excel文件拆分工具构建脚本")
     print("=" * 50)
     
@@ -126,17 +215,25 @@ def main():
     if not os.path.exists('src/main.py'):
         print("❌ 错误: 请在项目根目录运行此脚本")
         sys.exit(1)
+
+    if args.importtime:
+        report_import_time()
+        return
     
     # 清理构建文件
     clean_build()
     
     # 构建可执行文件
-    if build_exe():
+    if build_exe(onedir=args.onedir, exclude=not args.no_exclude):
         # 创建安装脚本
         create_installer_script()
+        report_import_time()
         
         print("\n🎉 构建完成！")
-        print("📁 可执行文件位置: dist/Excel文件拆分工具.exe")
+        if args.onedir:
+            print(f"📁 可执行文件位置: dist/{APP_NAME}/{APP_NAME}.exe")
+        else:
+            print(f"📁 可执行文件位置: dist/{APP_NAME}.exe")
         print("📁 安装脚本位置: dist/install.bat")
         print("\n使用说明:")
         print("1. 直接运行 dist/Excel文件拆分工具.exe")
@@ -0,0 +1,18 @@
+#!/usr/bin/env python3
+"""
+支持以 python -m src 的方式运行命令行模式
+"""
+
+import os
+import sys
+
+# src目录内的模块互相按顶层模块名导入，需要把src目录加入Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+if current_dir not in sys.path:
+    sys.path.insert(0, current_dir)
+
+from cli import main  # noqa: E402
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+批量拆分
+接受目录或通配符，把多个工作簿（或同一工作簿的多个工作表）分配到进程池中并发拆分：
+- 按文件大小从大到小调度，缩短整体完成时间
+- 所有进行中的文件共享一个内存预算，预估占用超出预算的文件会等待，
+  避免几个大文件同时解析导致内存耗尽
+- 输出文件名只取输入的文件名（不含扩展名），同名的输入（如a.xls和a.xlsx）各自输出到
+  <输出目录>/<文件名>_<扩展名> 子目录，不会互相覆盖
+"""
+
+import glob
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from cancel import (CANCEL_POLL_SECONDS, SplitCancelled, init_worker_cancel, process_cancel_event,
+                    worker_cancel_token)
+from csv_input import CSV_EXTENSIONS
+from split_engine import ENGINE_PANDAS, ENGINE_STREAMING, output_filename_for
+from splitter import Splitter
+
+
+EXCEL_EXTENSIONS = ('.xlsx', '.xls')
+INPUT_EXTENSIONS = EXCEL_EXTENSIONS + CSV_EXTENSIONS
+DEFAULT_MEMORY_BUDGET = 2 * 1024 * 1024 * 1024
+# pandas引擎要把整个工作表读入内存，xlsx解压并转换为DataFrame后通常是文件大小的数倍
+PANDAS_MEMORY_FACTOR = 10
+# 流式引擎只持有一个分块，按固定的上限估算
+STREAMING_MEMORY_ESTIMATE = 128 * 1024 * 1024
+
+
+def expand_inputs(pattern):
+    """将目录、通配符或单个文件展开为Excel和CSV文件列表，忽略Excel的临时文件（~$开头）"""
+    if os.path.isdir(pattern):
+        candidates = [os.path.join(pattern, name) for name in os.listdir(pattern)]
+    elif os.path.isfile(pattern):
+        candidates = [pattern]
+    else:
+        candidates = glob.glob(pattern)
+    return sorted(
+        path for path in candidates
+        if os.path.isfile(path)
+        and path.lower().endswith(INPUT_EXTENSIONS)
+        and not os.path.basename(path).startswith('~$')
+    )
+
+
+def estimate_memory(path, engine):
+    """预估拆分一个文件时的内存占用（字节）"""
+    # .xls即使用流式引擎，xlrd也会把整个工作表读入内存
+    if engine == ENGINE_PANDAS or path.lower().endswith('.xls'):
+        return os.path.getsize(path) * PANDAS_MEMORY_FACTOR
+    return STREAMING_MEMORY_ESTIMATE
+
+
+def _split_job(path, sheet_name, output_dir, rows_per_file, engine, writer, convert_xls, selection, resume):
+    """在工作进程中拆分一个文件（的一个工作表），返回Splitter.run()的结果"""
+    return Splitter(path, rows_per_file, output_dir=output_dir, engine=engine, writer=writer,
+                    sheet_name=sheet_name, resume=resume, cancel_token=worker_cancel_token(),
+                    convert_xls=convert_xls, selection=selection).run()
+
+
+def job_output_dirs(jobs, output_dir):
+    """
+    每个任务的输出目录：输出文件名相同（不区分大小写）的输入各自使用以文件名命名的子目录，如 out/a_xls；
+    子目录仍然冲突时（如同一工作簿中清理非法字符后同名的工作表）抛出ValueError
+    返回 {任务: 输出目录}
+    """
+    def key(job, directory):
+        path, sheet_name = job
+        return os.path.normcase(os.path.join(directory, output_filename_for(path, 0, '', sheet_name))).lower()
+
+    groups = {}
+    for job in jobs:
+        groups.setdefault(key(job, output_dir), []).append(job)
+    output_dirs = {}
+    for group in groups.values():
+        for job in group:
+            name = os.path.basename(job[0]).replace('.', '_')
+            output_dirs[job] = output_dir if len(group) == 1 else os.path.join(output_dir, name)
+
+    seen = {}
+    for job, directory in output_dirs.items():
+        other = seen.setdefault(key(job, directory), job)
+        if other != job:
+            raise ValueError(f"输出文件名冲突: {_job_label(other)} 和 {_job_label(job)}")
+    return output_dirs
+
+
+def _job_label(job):
+    path, sheet_name = job
+    return path if sheet_name is None else f"{path} [{sheet_name}]"
+
+
+def run_batch(paths, output_dir, rows_per_file, engine=ENGINE_STREAMING, writer=None,
+              workers=1, memory_budget=DEFAULT_MEMORY_BUDGET, status_callback=None, cancel_token=None,
+              convert_xls=False, selection=None, resume=False):
+    """
+    并发拆分多个文件（各自的第一个工作表）
+    status_callback(文件路径, 状态, 详情)，状态为 'running' / 'done' / 'failed' / 'cancelled'，
+    done的详情为 {'files', 'rows', 'elapsed'}，failed的详情为错误信息，
+    cancelled的详情为取消前已完成的输出文件数
+    cancel_token被取消时不再启动新的文件，正在拆分的文件在工作进程中停止
+    convert_xls为True时保存.xls的转换结果，重复拆分同一批文件时跳过BIFF解析
+    selection（row_filter.RowSelection）按各文件的表头解析，只输出保留的列和满足条件的行
+    输出文件名相同的输入各自输出到子目录，见job_output_dirs；done的详情中另有'output_dir'
+    resume为True时每个文件（工作表）各自跳过上次中断前已完成的分块，见checkpoint.Checkpoint
+    返回汇总 {'files', 'failed', 'cancelled', 'rows', 'elapsed', 'rows_per_sec'}
+    """
+    return run_jobs([(path, None) for path in paths], output_dir, rows_per_file, engine=engine,
+                    writer=writer, workers=workers, memory_budget=memory_budget,
+                    status_callback=status_callback, cancel_token=cancel_token, convert_xls=convert_xls,
+                    selection=selection, resume=resume)
+
+
+def split_sheets(path, sheet_names, output_dir, rows_per_file, engine=ENGINE_STREAMING, writer=None,
+                 workers=1, memory_budget=DEFAULT_MEMORY_BUDGET, status_callback=None, cancel_token=None,
+                 convert_xls=False, selection=None, resume=False):
+    """
+    并发拆分同一工作簿中的多个工作表，输出文件名为 <原文件名>_<工作表名>_001
+    status_callback的第一个参数为 "文件路径 [工作表名]"，其余同run_batch
+    """
+    return run_jobs([(path, name) for name in sheet_names], output_dir, rows_per_file,
+                    engine=engine, writer=writer, workers=workers, memory_budget=memory_budget,
+                    status_callback=status_callback, cancel_token=cancel_token, convert_xls=convert_xls,
+                    selection=selection, resume=resume)
+
+
+def run_jobs(jobs, output_dir, rows_per_file, engine=ENGINE_STREAMING, writer=None,
+             workers=1, memory_budget=DEFAULT_MEMORY_BUDGET, status_callback=None, cancel_token=None,
+             convert_xls=False, selection=None, resume=False):
+    """
+    并发执行拆分任务，jobs为 [(文件路径, 工作表名或None), ...]
+    参数和返回值同run_batch
+    """
+    output_dirs = job_output_dirs(jobs, output_dir)
+    # 大文件优先调度
+    queue = sorted(jobs, key=lambda job: os.path.getsize(job[0]), reverse=True)
+    estimates = {job: estimate_memory(job[0], engine) for job in queue}
+
+    summary = {'files': 0, 'failed': 0, 'cancelled': 0, 'rows': 0}
+    started = time.perf_counter()
+    running = {}
+    memory_in_use = 0
+
+    def notify(job, status, detail=None):
+        if status_callback:
+            status_callback(_job_label(job), status, detail)
+
+    cancel_event = process_cancel_event(cancel_token)
+    # 启用取消时定时醒来检查取消标记
+    timeout = CANCEL_POLL_SECONDS if cancel_token is not None else None
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker_cancel,
+                             initargs=(cancel_event,)) as executor:
+        while queue or running:
+            if cancel_token is not None and cancel_token.cancelled:
+                # 通知工作进程停止，尚未开始的文件不再启动
+                cancel_event.set()
+                summary['cancelled'] += len(queue)
+                queue.clear()
+            # 在进程数和内存预算允许的范围内，按从大到小的顺序提交能放得下的文件；
+            # 没有文件在运行时，即使超出预算也要提交最大的一个，保证能继续推进
+            index = 0
+            while index < len(queue) and len(running) < workers:
+                job = queue[index]
+                if running and memory_in_use + estimates[job] > memory_budget:
+                    index += 1
+                    continue
+                queue.pop(index)
+                memory_in_use += estimates[job]
+                future = executor.submit(_split_job, job[0], job[1], output_dirs[job], rows_per_file,
+                                         engine, writer, convert_xls, selection, resume)
+                running[future] = job
+                notify(job, 'running')
+
+            if not running:
+                continue
+            done, _ = wait(running, timeout, FIRST_COMPLETED)
+            for future in done:
+                job = running.pop(future)
+                memory_in_use -= estimates[job]
+                try:
+                    result = future.result()
+                except SplitCancelled as e:
+                    summary['cancelled'] += 1
+                    notify(job, 'cancelled', len(e.files))
+                    continue
+                except Exception as e:
+                    summary['failed'] += 1
+                    notify(job, 'failed', str(e))
+                    continue
+                summary['files'] += 1
+                summary['rows'] += result['rows']
+                notify(job, 'done', {'files': len(result['files']), 'rows': result['rows'],
+                                      'elapsed': result['elapsed'], 'output_dir': output_dirs[job]})
+
+    summary['elapsed'] = time.perf_counter() - started
+    summary['rows_per_sec'] = summary['rows'] / summary['elapsed'] if summary['elapsed'] > 0 else 0
+    return summary
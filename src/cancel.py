@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+协作式取消
+GUI的取消按钮或命令行的Ctrl+C调用CancelToken.cancel()，读取和写出循环每隔一定行数检查一次，
+发现已取消时抛出SplitCancelled，由拆分函数清理写了一半的分块。
+进程池中的工作进程无法共享线程事件，run_chunk_tasks和批量拆分在创建进程池时
+通过initializer传入一个multiprocessing.Event，取消时同时设置该事件，工作进程中的循环同样会停止。
+"""
+
+import multiprocessing
+import signal
+import threading
+
+
+# 每读取或写出这么多行检查一次是否已取消
+CANCEL_CHECK_ROWS = 256
+# 等待工作进程时检查取消的间隔（秒）
+CANCEL_POLL_SECONDS = 0.2
+
+
+class SplitCancelled(Exception):
+    """拆分被取消；files为取消前已完成的 [(输出文件名, 行数), ...]"""
+
+    def __init__(self, files=None):
+        super().__init__("拆分已取消")
+        self.files = list(files or [])
+
+    def __reduce__(self):
+        # 从工作进程传回时保留files
+        return SplitCancelled, (self.files,)
+
+
+class CancelToken:
+    """取消标记，可在任意线程调用cancel()"""
+
+    def __init__(self, event=None):
+        self._event = event if event is not None else threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def check(self):
+        if self._event.is_set():
+            raise SplitCancelled()
+
+
+def check_rows(rows, cancel_token):
+    """包装行迭代器，每CANCEL_CHECK_ROWS行检查一次是否已取消"""
+    if cancel_token is None:
+        yield from rows
+        return
+    for count, row in enumerate(rows):
+        if count % CANCEL_CHECK_ROWS == 0:
+            cancel_token.check()
+        yield row
+
+
+# 工作进程中的取消标记，由init_worker_cancel在进程启动时设置
+_worker_token = None
+
+
+def process_cancel_event(cancel_token):
+    """为进程池创建跨进程的取消事件；cancel_token为None时不需要"""
+    return multiprocessing.Event() if cancel_token is not None else None
+
+
+def init_worker_cancel(event):
+    """进程池的initializer：保存跨进程取消事件"""
+    global _worker_token
+    _worker_token = CancelToken(event) if event is not None else None
+    if event is not None:
+        # 终端的Ctrl+C会发给整个进程组，工作进程忽略它，由主进程通过取消事件通知
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def worker_cancel_token():
+    """当前工作进程的取消标记，主进程中或未启用取消时为None"""
+    return _worker_token
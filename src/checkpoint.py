@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+断点续拆
+按行数拆分时，每完成一个分块就在输出目录的清单文件中记录该分块的文件名、行范围、文件大小和修改时间；
+启用续拆时（Splitter的resume=True）另外记录SHA-256校验和，没有启用时不读取分块内容。
+清单为JSON Lines格式：第一行是版本和拆分参数，之后每完成一个分块追加一行并刷到磁盘，
+记录一个分块的开销与已完成的分块数无关；中途崩溃时最后一行可能只写了一半，读取时忽略。
+分块文件先写入临时文件，完成后才重命名为最终文件名。
+续拆时只有文件存在、大小和修改时间一致（记录了校验和时校验和也一致）的分块才会跳过，
+其余分块重新写出；没有启用续拆时不读取已有清单。拆分全部完成后删除清单。
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+from split_engine import _INVALID_FILENAME_CHARS
+
+
+MANIFEST_VERSION = 3
+
+
+def file_checksum(path):
+    """文件内容的SHA-256"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _json_line(record):
+    return json.dumps(record, ensure_ascii=False) + '\n'
+
+
+def atomic_write_lines(path, records):
+    """先写临时文件并刷到磁盘，再重命名替换，读到的清单总是完整的"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.writelines(_json_line(record) for record in records)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def append_line(path, record):
+    """在清单末尾追加一行并刷到磁盘"""
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(_json_line(record))
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def manifest_path(output_dir, input_file, sheet_name=None):
+    """清单文件路径：<输出目录>/.<原文件名>[_<工作表名>].split-manifest.json"""
+    stem = Path(input_file).stem
+    if sheet_name is not None:
+        stem = f"{stem}_{_INVALID_FILENAME_CHARS.sub('_', sheet_name)}"
+    return os.path.join(output_dir, f".{stem}.split-manifest.json")
+
+
+class Checkpoint:
+    """
+    一次按行数拆分的检查点
+    source记录输入文件（路径、大小、修改时间）和拆分参数（包括列选择和行筛选），任何一项变化后旧清单不再有效
+    """
+
+    def __init__(self, input_file, output_dir, rows_per_file, sheet_name=None, engine=None,
+                 writer=None, resume=False, selection=None):
+        stat = os.stat(input_file)
+        self.output_dir = output_dir
+        self.path = manifest_path(output_dir, input_file, sheet_name)
+        self.source = {
+            'input': os.path.abspath(input_file),
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'sheet': sheet_name,
+            'rows_per_file': rows_per_file,
+            'engine': engine,
+            'writer': writer,
+        }
+        if selection is not None:
+            self.source['selection'] = selection.describe()
+        # 分块序号 -> {'index', 'file', 'start_row', 'end_row', 'rows', 'size', 'mtime_ns'[, 'sha256']}
+        self.chunks = {}
+        # 启用续拆时才计算校验和
+        self.checksums = resume
+        # 第一次记录分块时重写清单，只保留续拆时校验通过的分块
+        self.started = False
+        if resume:
+            self._load()
+
+    def _load(self):
+        """读取已有清单，只保留文件未改变的分块"""
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                lines = f.read().splitlines()
+        except OSError:
+            return
+        try:
+            header = json.loads(lines[0])
+        except (IndexError, ValueError):
+            return
+        if header.get('version') != MANIFEST_VERSION or header.get('source') != self.source:
+            return
+        for line in lines[1:]:
+            try:
+                chunk = json.loads(line)
+            except ValueError:
+                # 崩溃时写了一半的最后一行
+                continue
+            if self._unchanged(chunk):
+                self.chunks[chunk['index']] = chunk
+
+    def _unchanged(self, chunk):
+        """分块文件存在，大小和修改时间与记录一致；记录了校验和时再比较校验和"""
+        output_path = os.path.join(self.output_dir, chunk['file'])
+        try:
+            stat = os.stat(output_path)
+        except OSError:
+            return False
+        if (stat.st_size, stat.st_mtime_ns) != (chunk['size'], chunk['mtime_ns']):
+            return False
+        return 'sha256' not in chunk or file_checksum(output_path) == chunk['sha256']
+
+    def is_complete(self, index):
+        return index in self.chunks
+
+    @property
+    def completed_rows(self):
+        return sum(chunk['rows'] for chunk in self.chunks.values())
+
+    def record(self, index, output_filename, start_row, row_count):
+        """记录一个已写完的分块并立即保存清单；start_row为从0开始的数据行序号"""
+        if index in self.chunks:
+            return
+        output_path = os.path.join(self.output_dir, output_filename)
+        stat = os.stat(output_path)
+        chunk = {
+            'index': index,
+            'file': output_filename,
+            'start_row': start_row,
+            'end_row': start_row + row_count,
+            'rows': row_count,
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+        }
+        if self.checksums:
+            chunk['sha256'] = file_checksum(output_path)
+        self.chunks[index] = chunk
+        if self.started:
+            append_line(self.path, chunk)
+            return
+        atomic_write_lines(self.path, [{'version': MANIFEST_VERSION, 'source': self.source}]
+                           + [self.chunks[i] for i in sorted(self.chunks)])
+        self.started = True
+
+    def remove(self):
+        """拆分全部完成后删除清单"""
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+"""
+Excel文件拆分工具的命令行入口
+不依赖tkinter，可用于定时任务和无图形界面的服务器：
+
+    python -m src split input.xlsx --rows 5000 --out dir --engine streaming --workers 8
+    python -m src split input.xlsx --by-column 地区 --out dir
+    python -m src split input.xlsx --max-mb 10 --out dir
+    python -m src split input.xlsx --rows 5000 --out dir --resume
+    python -m src split input.xlsx --rows 5000 --out dir --profile-json report.json --pstats split.pstats
+    python -m src split input.xlsx --rows 5000 --out dir --columns 订单号,金额 --where 地区=华东,华南
+    python -m src batch "exports/*.xlsx" --rows 5000 --out dir --workers 4
+    python -m src merge "out/data_*.xlsx" --out dir --name data_merged
+
+进度以JSON Lines格式逐行输出到标准输出，每行一个事件：
+    {"event": "start", ...}  {"event": "file", ...}  {"event": "done", ...}
+按列值拆分时，读取阶段另有 {"event": "progress", "rows_read": ...} 事件
+指定--profile时在done之前输出 {"event": "profile", ...}，内容为各阶段耗时和峰值内存
+batch子命令以file_start / file_done / file_failed事件汇报每个输入文件的状态，
+同名的输入（如a.xls和a.xlsx）各自输出到子目录，file_done中的output_dir为实际的输出目录；
+拆分多个工作表时以sheet_start / sheet_done / sheet_failed事件汇报每个工作表的状态
+merge子命令每读完一个输入输出一个input_done事件，每写完一个文件输出一个file事件
+失败时输出 {"event": "error", ...}
+第一次Ctrl+C取消拆分：删除写了一半的文件后输出 {"event": "cancelled", ...}；再按一次立即中断
+退出码：0 成功，1 拆分失败，2 参数错误，130 被取消或中断
+"""
+
+import argparse
+import json
+import os
+import signal
+import sys
+import time
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+EXIT_INTERRUPTED = 130
+
+
+def emit(event, **fields):
+    """输出一行JSON事件并立即刷新，便于管道另一端实时读取"""
+    fields = dict(event=event, **fields)
+    sys.stdout.write(json.dumps(fields, ensure_ascii=False) + "\n")
+    sys.stdout.flush()
+
+
+def install_cancel_handler():
+    """第一次Ctrl+C设置取消标记，之后恢复默认处理，再按一次直接中断"""
+    from cancel import CancelToken
+
+    cancel_token = CancelToken()
+
+    def on_interrupt(signum, frame):
+        cancel_token.cancel()
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+
+    signal.signal(signal.SIGINT, on_interrupt)
+    return cancel_token
+
+
+def add_selection_arguments(parser):
+    """列选择和行筛选参数，见row_filter"""
+    parser.add_argument('--columns', metavar='COLS',
+                        help="只输出这些列（逗号分隔的列名或从1开始的列号），按给出的顺序")
+    parser.add_argument('--where', action='append', metavar='COND',
+                        help="只输出满足条件的行：列=值、列=值1,值2 或 列=下限..上限；可重复指定，需全部满足")
+
+
+def selection_from(args):
+    """由--columns和--where创建RowSelection，都没有指定时返回None；格式错误时抛出ValueError"""
+    from row_filter import parse_selection
+
+    return parse_selection(args.columns, args.where or ())
+
+
+def build_parser():
+    from merge import DEFAULT_OUTPUT_NAME, DEFAULT_PREFETCH
+    from partition import DEFAULT_MAX_OPEN_WRITERS
+    from split_engine import ENGINES, ENGINE_STREAMING
+    from writers import DEFAULT_WRITER, WRITERS
+
+    parser = argparse.ArgumentParser(prog='python -m src', description="Excel文件拆分工具（命令行模式）")
+    subparsers = parser.add_subparsers(dest='command', metavar='command')
+    subparsers.required = True
+
+    split_parser = subparsers.add_parser('split', help="按行数拆分Excel文件")
+    split_parser.add_argument('input', help="要拆分的Excel或CSV/TSV文件")
+    split_parser.add_argument('--rows', type=int, default=50, help="每个小文件的行数（默认50）")
+    split_parser.add_argument('--out', help="输出目录（默认为输入文件所在目录）")
+    split_parser.add_argument('--engine', choices=ENGINES, default=ENGINE_STREAMING,
+                              help=f"拆分引擎（默认{ENGINE_STREAMING}）")
+    split_parser.add_argument('--workers', type=int, default=1, help="并发写出分块的进程数（默认1）")
+    split_parser.add_argument('--writer', choices=list(WRITERS), default=DEFAULT_WRITER,
+                              help=f"输出格式（默认{DEFAULT_WRITER}）")
+    sheet_group = split_parser.add_mutually_exclusive_group()
+    sheet_group.add_argument('--sheet', action='append', dest='sheets', metavar='NAME',
+                             help="要拆分的工作表，可重复指定；多个工作表时并发拆分（默认第一个工作表）")
+    sheet_group.add_argument('--all-sheets', action='store_true', help="拆分所有工作表")
+    split_parser.add_argument('--by-column', metavar='NAME',
+                              help="按该列的值拆分（列名或从1开始的列号），每个值一个文件，忽略--rows")
+    split_parser.add_argument('--max-mb', type=float, metavar='MB',
+                              help="按文件大小拆分，每个输出文件不超过该大小（MB），忽略--rows")
+    split_parser.add_argument('--cache-xls', action='store_true',
+                              help="保存.xls的转换结果，之后拆分同一文件时跳过BIFF解析（streaming引擎）")
+    split_parser.add_argument('--resume', action='store_true',
+                              help="按行数拆分时跳过上次中断前已完成（文件未改变）的分块")
+    split_parser.add_argument('--max-open-writers', type=int, default=DEFAULT_MAX_OPEN_WRITERS,
+                              help=f"按列值拆分时同时打开的输出文件数上限（默认{DEFAULT_MAX_OPEN_WRITERS}）")
+    split_parser.add_argument('--profile', action='store_true', help="记录各阶段耗时和峰值内存，输出profile事件")
+    split_parser.add_argument('--profile-json', metavar='PATH', help="把性能报告保存为JSON（隐含--profile）")
+    split_parser.add_argument('--pstats', metavar='PATH', help="用cProfile记录拆分过程并保存为pstats文件")
+    add_selection_arguments(split_parser)
+    split_parser.set_defaults(handler=run_split)
+
+    batch_parser = subparsers.add_parser('batch', help="并发拆分目录或通配符匹配的多个Excel文件")
+    batch_parser.add_argument('inputs', help="输入目录或通配符，如 exports/ 或 \"exports/*.xlsx\"")
+    batch_parser.add_argument('--rows', type=int, default=50, help="每个小文件的行数（默认50）")
+    batch_parser.add_argument('--out', required=True, help="输出目录")
+    batch_parser.add_argument('--engine', choices=ENGINES, default=ENGINE_STREAMING,
+                              help=f"拆分引擎（默认{ENGINE_STREAMING}）")
+    batch_parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                              help="同时拆分的文件数（默认为CPU核数）")
+    batch_parser.add_argument('--writer', choices=list(WRITERS), default=DEFAULT_WRITER,
+                              help=f"输出格式（默认{DEFAULT_WRITER}）")
+    batch_parser.add_argument('--cache-xls', action='store_true',
+                              help="保存.xls的转换结果，之后拆分同一文件时跳过BIFF解析（streaming引擎）")
+    batch_parser.add_argument('--resume', action='store_true',
+                              help="每个文件各自跳过上次中断前已完成（文件未改变）的分块")
+    batch_parser.add_argument('--memory-mb', type=int, default=2048,
+                              help="所有进行中文件共享的内存预算，单位MB（默认2048）")
+    add_selection_arguments(batch_parser)
+    batch_parser.set_defaults(handler=run_batch_command)
+
+    merge_parser = subparsers.add_parser('merge', help="按顺序合并多个表头相同的文件")
+    merge_parser.add_argument('inputs', nargs='+',
+                              help="要合并的文件、目录或通配符；同一目录或通配符中的文件按文件名中的序号排列")
+    merge_parser.add_argument('--out', required=True, help="输出目录")
+    merge_parser.add_argument('--name', default=DEFAULT_OUTPUT_NAME,
+                              help=f"输出文件名（不含扩展名，默认{DEFAULT_OUTPUT_NAME}）")
+    merge_parser.add_argument('--rows', type=int, help="每个输出文件的行数（默认全部合并为一个文件）")
+    merge_parser.add_argument('--writer', choices=list(WRITERS), default=DEFAULT_WRITER,
+                              help=f"输出格式（默认{DEFAULT_WRITER}）")
+    merge_parser.add_argument('--sheet', metavar='NAME', help="合并每个输入的该工作表（默认第一个工作表）")
+    merge_parser.add_argument('--prefetch', type=int, default=DEFAULT_PREFETCH,
+                              help=f"后台预读的输入文件数（默认{DEFAULT_PREFETCH}）")
+    merge_parser.set_defaults(handler=run_merge)
+    return parser
+
+
+def run_split(args):
+    """执行split子命令，返回退出码"""
+    from cancel import SplitCancelled
+    from splitter import Splitter
+
+    if not os.path.isfile(args.input):
+        emit('error', message=f"输入文件不存在: {args.input}")
+        return EXIT_USAGE
+    if args.rows <= 0 or args.workers <= 0 or args.max_open_writers <= 0:
+        emit('error', message="行数、进程数和打开文件数上限必须为正整数")
+        return EXIT_USAGE
+    if args.max_mb is not None and args.max_mb <= 0:
+        emit('error', message="文件大小上限必须大于0")
+        return EXIT_USAGE
+    if args.max_mb is not None and args.by_column:
+        emit('error', message="--by-column和--max-mb不能同时使用")
+        return EXIT_USAGE
+    try:
+        selection = selection_from(args)
+    except ValueError as e:
+        emit('error', message=str(e))
+        return EXIT_USAGE
+
+    sheet_names = args.sheets
+    if args.all_sheets:
+        from file_inspector import inspect_file
+        sheet_names = [sheet['name'] for sheet in inspect_file(args.input)['sheets']]
+    if sheet_names and len(sheet_names) > 1:
+        if args.by_column or args.max_mb is not None:
+            emit('error', message="按列值或按文件大小拆分一次只能处理一个工作表")
+            return EXIT_USAGE
+        if args.profile or args.profile_json or args.pstats:
+            emit('error', message="性能分析一次只能处理一个工作表")
+            return EXIT_USAGE
+        return run_split_sheets(args, sheet_names, selection)
+
+    started = time.perf_counter()
+
+    def on_progress(done, total, output_filename, row_count):
+        if output_filename is None:
+            # 按列值拆分的读取阶段
+            emit('progress', rows_read=done, estimated_rows=total,
+                 elapsed=round(time.perf_counter() - started, 3))
+            return
+        emit('file', index=done, total=total, file=output_filename, rows=row_count,
+             elapsed=round(time.perf_counter() - started, 3))
+
+    splitter = Splitter(args.input, args.rows, output_dir=args.out, engine=args.engine,
+                        writer=args.writer, workers=args.workers, progress_callback=on_progress,
+                        sheet_name=sheet_names[0] if sheet_names else None,
+                        by_column=args.by_column, max_open_writers=args.max_open_writers,
+                        max_bytes=int(args.max_mb * 1024 * 1024) if args.max_mb is not None else None,
+                        resume=args.resume, cancel_token=install_cancel_handler(),
+                        convert_xls=args.cache_xls, profile=args.profile or bool(args.profile_json),
+                        pstats_path=args.pstats, selection=selection)
+    emit('start', input=args.input, output_dir=splitter.output_dir, rows_per_file=args.rows,
+         engine=args.engine, workers=args.workers, writer=args.writer, sheet=splitter.sheet_name,
+         by_column=args.by_column, max_mb=args.max_mb, resume=args.resume,
+         columns=args.columns, where=args.where)
+    try:
+        result = splitter.run()
+    except SplitCancelled as e:
+        emit('cancelled', files=len(e.files), rows=sum(rows for _, rows in e.files),
+             elapsed=round(time.perf_counter() - started, 3))
+        return EXIT_INTERRUPTED
+    except Exception as e:
+        emit('error', message=str(e), elapsed=round(time.perf_counter() - started, 3))
+        return EXIT_FAILED
+
+    if 'profile' in result:
+        emit('profile', **result['profile'])
+        if args.profile_json:
+            from profiling import save_report
+            save_report(args.profile_json, result['profile'])
+    emit('done', files=len(result['files']), rows=result['rows'], elapsed=round(result['elapsed'], 3),
+         first_file_seconds=round(result['first_file_seconds'] or 0, 3),
+         rows_per_sec=round(result['rows_per_sec'], 1))
+    return EXIT_OK
+
+
+def run_split_sheets(args, sheet_names, selection=None):
+    """并发拆分同一文件的多个工作表，返回退出码"""
+    from batch import split_sheets
+
+    output_dir = args.out or os.path.dirname(os.path.abspath(args.input))
+
+    def on_status(label, status, detail):
+        if status == 'done':
+            emit('sheet_done', sheet=label, files=detail['files'], rows=detail['rows'],
+                 elapsed=round(detail['elapsed'], 3), output_dir=detail['output_dir'])
+        elif status == 'failed':
+            emit('sheet_failed', sheet=label, message=detail)
+        elif status == 'cancelled':
+            emit('sheet_cancelled', sheet=label, files=detail)
+        else:
+            emit('sheet_start', sheet=label)
+
+    emit('start', input=args.input, output_dir=output_dir, rows_per_file=args.rows,
+         engine=args.engine, workers=args.workers, writer=args.writer, sheets=sheet_names,
+         resume=args.resume, columns=args.columns, where=args.where)
+    cancel_token = install_cancel_handler()
+    try:
+        summary = split_sheets(args.input, sheet_names, output_dir, args.rows, engine=args.engine,
+                               writer=args.writer, workers=args.workers, status_callback=on_status,
+                               cancel_token=cancel_token, convert_xls=args.cache_xls, selection=selection,
+                               resume=args.resume)
+    except ValueError as e:
+        emit('error', message=str(e))
+        return EXIT_USAGE
+    emit('cancelled' if cancel_token.cancelled else 'done', sheets=summary['files'],
+         failed=summary['failed'], cancelled=summary['cancelled'], rows=summary['rows'],
+         elapsed=round(summary['elapsed'], 3), rows_per_sec=round(summary['rows_per_sec'], 1))
+    if cancel_token.cancelled:
+        return EXIT_INTERRUPTED
+    return EXIT_FAILED if summary['failed'] else EXIT_OK
+
+
+def run_batch_command(args):
+    """执行batch子命令，返回退出码"""
+    from batch import expand_inputs, run_batch
+
+    paths = expand_inputs(args.inputs)
+    if not paths:
+        emit('error', message=f"没有找到Excel文件: {args.inputs}")
+        return EXIT_USAGE
+    if args.rows <= 0 or args.workers <= 0 or args.memory_mb <= 0:
+        emit('error', message="行数、进程数和内存预算必须为正整数")
+        return EXIT_USAGE
+    try:
+        selection = selection_from(args)
+    except ValueError as e:
+        emit('error', message=str(e))
+        return EXIT_USAGE
+
+    def on_status(path, status, detail):
+        if status == 'done':
+            emit('file_done', input=path, files=detail['files'], rows=detail['rows'],
+                 elapsed=round(detail['elapsed'], 3), output_dir=detail['output_dir'])
+        elif status == 'failed':
+            emit('file_failed', input=path, message=detail)
+        elif status == 'cancelled':
+            emit('file_cancelled', input=path, files=detail)
+        else:
+            emit('file_start', input=path)
+
+    emit('start', inputs=len(paths), output_dir=args.out, rows_per_file=args.rows,
+         engine=args.engine, workers=args.workers, writer=args.writer, resume=args.resume,
+         columns=args.columns, where=args.where)
+    cancel_token = install_cancel_handler()
+    try:
+        summary = run_batch(paths, args.out, args.rows, engine=args.engine, writer=args.writer,
+                            workers=args.workers, memory_budget=args.memory_mb * 1024 * 1024,
+                            status_callback=on_status, cancel_token=cancel_token,
+                            convert_xls=args.cache_xls, selection=selection, resume=args.resume)
+    except ValueError as e:
+        emit('error', message=str(e))
+        return EXIT_USAGE
+    emit('cancelled' if cancel_token.cancelled else 'done', files=summary['files'],
+         failed=summary['failed'], cancelled=summary['cancelled'], rows=summary['rows'],
+         elapsed=round(summary['elapsed'], 3), rows_per_sec=round(summary['rows_per_sec'], 1))
+    if cancel_token.cancelled:
+        return EXIT_INTERRUPTED
+    return EXIT_FAILED if summary['failed'] else EXIT_OK
+
+
+def run_merge(args):
+    """执行merge子命令，返回退出码"""
+    from cancel import SplitCancelled
+    from merge import expand_merge_inputs, merge_files
+
+    paths = expand_merge_inputs(args.inputs)
+    if not paths:
+        emit('error', message=f"没有找到要合并的文件: {' '.join(args.inputs)}")
+        return EXIT_USAGE
+    if (args.rows is not None and args.rows <= 0) or args.prefetch < 0:
+        emit('error', message="行数必须为正整数，预读文件数不能为负数")
+        return EXIT_USAGE
+
+    started = time.perf_counter()
+
+    def on_input(done, total, path, row_count):
+        emit('input_done', index=done, total=total, input=path, rows=row_count,
+             elapsed=round(time.perf_counter() - started, 3))
+
+    def on_progress(done, total, output_filename, row_count):
+        emit('file', index=done, file=output_filename, rows=row_count,
+             elapsed=round(time.perf_counter() - started, 3))
+
+    emit('start', inputs=len(paths), output_dir=args.out, rows_per_file=args.rows, writer=args.writer,
+         sheet=args.sheet, prefetch=args.prefetch)
+    try:
+        result = merge_files(paths, args.out, rows_per_file=args.rows, writer=args.writer,
+                             sheet_name=args.sheet, output_name=args.name, prefetch=args.prefetch,
+                             progress_callback=on_progress, input_callback=on_input,
+                             cancel_token=install_cancel_handler())
+    except SplitCancelled as e:
+        emit('cancelled', files=len(e.files), rows=sum(rows for _, rows in e.files),
+             elapsed=round(time.perf_counter() - started, 3))
+        return EXIT_INTERRUPTED
+    except Exception as e:
+        emit('error', message=str(e), elapsed=round(time.perf_counter() - started, 3))
+        return EXIT_FAILED
+
+    emit('done', inputs=result['inputs'], files=len(result['files']), rows=result['rows'],
+         elapsed=round(result['elapsed'], 3), rows_per_sec=round(result['rows_per_sec'], 1))
+    return EXIT_OK
+
+
+def main(argv=None):
+    """命令行主函数，返回退出码"""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    try:
+        return args.handler(args)
+    except KeyboardInterrupt:
+        emit('error', message="已中断")
+        return EXIT_INTERRUPTED
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,426 @@
+#!/usr/bin/env python3
+"""
+CSV / TSV输入
+- 编码检测：有UTF-8 BOM时为utf-8-sig；从第一个非ASCII字节开始的一段能按UTF-8解码时为utf-8，
+  否则按GB18030（GBK的超集）读取；全部为ASCII时为utf-8。开头很长一段都是ASCII（如先是编号和金额列，
+  后面才出现中文）时也能检测出GBK。之后的内容无法按检测到的编码解码（混合编码的文件）时报错，不用替换字符
+- iter_csv_rows: 用csv模块逐行读取，内存占用与文件大小无关，可用于所有拆分方式和输出格式
+- split_csv_bytes: 逗号分隔的CSV按行数拆分为CSV时，不解析字段，直接按字节范围复制：
+  1. 把文件分成workers段，各进程统计每段中的换行数（同时按引号的奇偶性区分字段内的换行）
+  2. 根据各段的行数算出每个分块起始行的字节偏移
+  3. 每个分块是一段连续的字节，各进程并发复制（只转码为带BOM的UTF-8），并加上表头
+  多GB的文件也只占用很少的内存，并能利用多个CPU核
+"""
+
+import codecs
+import csv
+import functools
+import itertools
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from cancel import SplitCancelled, worker_cancel_token
+
+
+CSV_EXTENSIONS = ('.csv', '.tsv')
+_SAMPLE_BYTES = 64 * 1024
+_SCAN_BLOCK = 1024 * 1024
+_NEWLINE_RE = re.compile(rb'\n')
+_TOKEN_RE = re.compile(rb'["\n]')
+_NON_ASCII_RE = re.compile(rb'[\x80-\xff]')
+# 只把规范写法的数字转为数值：没有多余的前导零，整数部分不超过15位（身份证号、订单号等保持为文本）
+_NUMBER_RE = re.compile(r'-?(?:0|[1-9]\d{0,14})(?:\.\d+)?(?:[eE][-+]?\d+)?')
+# 输出编码与writers.CsvWriter一致
+OUTPUT_ENCODING = 'utf-8-sig'
+# csv模块默认单个字段不超过128KB，导出的长文本可能超过；取C long在各平台都能表示的上限
+csv.field_size_limit(2 ** 31 - 1)
+
+
+def is_csv(path):
+    return path.lower().endswith(CSV_EXTENSIONS)
+
+
+def _read_head(path):
+    with open(path, 'rb') as f:
+        return f.read(_SAMPLE_BYTES)
+
+
+def _decode_head(data, encoding):
+    """解码开头的一段；末尾可能截断了一个多字节字符，final=False时不会因此报错"""
+    return codecs.getincrementaldecoder(encoding)().decode(data, final=False)
+
+
+def _non_ascii_sample(path):
+    """从第一个非ASCII字节开始的一段（最多_SAMPLE_BYTES字节），全部为ASCII时为b''"""
+    with open(path, 'rb') as f:
+        position = 0
+        while True:
+            block = f.read(_SCAN_BLOCK)
+            if not block:
+                return b''
+            match = _NON_ASCII_RE.search(block)
+            if match is not None:
+                f.seek(position + match.start())
+                return f.read(_SAMPLE_BYTES)
+            position += len(block)
+
+
+@functools.lru_cache(maxsize=64)
+def _detect_encoding(path, size, mtime_ns):
+    if _read_head(path).startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    try:
+        # 样本从非ASCII字节开始，之前都是ASCII，起点不会落在多字节字符中间
+        _decode_head(_non_ascii_sample(path), 'utf-8')
+        return 'utf-8'
+    except UnicodeDecodeError:
+        return 'gb18030'
+
+
+def detect_encoding(path):
+    """检测CSV文件的编码：utf-8-sig、utf-8或gb18030；按路径、大小和修改时间缓存检测结果"""
+    stat = os.stat(path)
+    return _detect_encoding(os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+
+
+def detect_delimiter(path, encoding=None):
+    """.tsv为制表符；其余文件从开头的完整行中推断分隔符，无法推断时为逗号"""
+    if path.lower().endswith('.tsv'):
+        return '\t'
+    sample = _decode_head(_read_head(path), encoding or detect_encoding(path))
+    sample = sample[:sample.rfind('\n') + 1] or sample
+    try:
+        return csv.Sniffer().sniff(sample, delimiters=',\t;|').delimiter
+    except csv.Error:
+        return ','
+
+
+def _check_sheet(path, sheet_name):
+    # CSV只有一个“工作表”，名称为文件名
+    if sheet_name is not None and sheet_name != Path(path).stem:
+        raise ValueError(f"CSV文件没有工作表: {sheet_name}")
+
+
+def _csv_value(text):
+    """空字段为None，规范写法的数字转为int或float，其余保持文本"""
+    if text == '':
+        return None
+    if text[0] in '-0123456789' and _NUMBER_RE.fullmatch(text):
+        if '.' in text or 'e' in text or 'E' in text:
+            return float(text)
+        return int(text)
+    return text
+
+
+def _estimate_rows(path, encoding, delimiter):
+    """按开头一段的平均行长估算数据行数；文件不超过样本大小时逐行计数，为精确值"""
+    head = _read_head(path)
+    if os.path.getsize(path) <= len(head):
+        with open(path, newline='', encoding=encoding) as f:
+            return max(sum(1 for values in csv.reader(f, delimiter=delimiter) if values) - 1, 0), True
+    lines = head.count(b'\n')
+    if not lines:
+        return None, False
+    return max(int(os.path.getsize(path) / (len(head) / lines)) - 1, 0), False
+
+
+def iter_csv_rows(path, sheet_name=None, selection=None):
+    """
+    逐行读取CSV，返回值同split_engine.iter_sheet_rows
+    与pandas.read_csv一致：跳过空行，表头为空时为"Unnamed: n"，重复列名追加".n"
+    selection不为None时只转换需要的列，见row_filter
+    """
+    from split_engine import _normalize_header, _trim_row
+
+    _check_sheet(path, sheet_name)
+    encoding = detect_encoding(path)
+    delimiter = detect_delimiter(path, encoding)
+    estimated_rows, _ = _estimate_rows(path, encoding, delimiter)
+
+    f = open(path, newline='', encoding=encoding)
+    reader = csv.reader(f, delimiter=delimiter)
+    header = []
+    try:
+        for values in reader:
+            header = _trim_row(tuple(value if value != '' else None for value in values))
+            if header:
+                break
+    except BaseException:
+        f.close()
+        raise
+
+    header = _normalize_header(header)
+    if selection is not None:
+        needed = selection.bind(header).needed
+
+        def selected_rows():
+            try:
+                for values in reader:
+                    if not values:
+                        continue
+                    width = len(values)
+                    row = selection.pick({column: _csv_value(values[column])
+                                          for column in needed if column < width})
+                    if row is not None:
+                        yield _trim_row(row)
+            finally:
+                f.close()
+
+        return selection.header, selected_rows(), None if selection.filters else estimated_rows
+
+    def data_rows():
+        try:
+            for values in reader:
+                if not values:
+                    continue
+                yield _trim_row(tuple(map(_csv_value, values)))
+        finally:
+            f.close()
+
+    return header, data_rows(), estimated_rows
+
+
+def inspect_csv(path):
+    """返回与file_inspector.inspect_xlsx相同格式的工作表信息（只有一个）"""
+    encoding = detect_encoding(path)
+    delimiter = detect_delimiter(path, encoding)
+    with open(path, newline='', encoding=encoding) as f:
+        header = next((values for values in csv.reader(f, delimiter=delimiter) if any(values)), [])
+    total_rows, exact = _estimate_rows(path, encoding, delimiter)
+    return [{
+        'name': Path(path).stem,
+        'total_rows': total_rows or 0,
+        'columns': len(header),
+        'exact': exact,
+    }]
+
+
+def read_csv_dataframe(path, sheet_name=None):
+    """pandas引擎读取CSV，编码和分隔符与流式读取一致"""
+    import pandas as pd
+
+    _check_sheet(path, sheet_name)
+    encoding = detect_encoding(path)
+    return pd.read_csv(path, encoding=encoding, sep=detect_delimiter(path, encoding))
+
+
+def _header_end(path):
+    """返回 (表头记录的字节, 数据起始偏移)；表头中的引号字段可以包含换行"""
+    in_quotes = False
+    with open(path, 'rb') as f:
+        data = b''
+        while True:
+            block = f.read(_SAMPLE_BYTES)
+            if not block:
+                return data, len(data)
+            start = len(data)
+            data += block
+            for match in _TOKEN_RE.finditer(data, start):
+                if match.group() == b'"':
+                    in_quotes = not in_quotes
+                elif not in_quotes:
+                    return data[:match.end()], match.end()
+
+
+def _scan_range(path, start, end):
+    """
+    统计[start, end)中的换行数
+    返回 (起点在引号外时的行结束数, 起点在引号内时的行结束数, 引号数是否为奇数)
+    """
+    counts = [0, 0]
+    parity = 0
+    with open(path, 'rb') as f:
+        f.seek(start)
+        remaining = end - start
+        while remaining > 0:
+            block = f.read(min(_SCAN_BLOCK, remaining))
+            if not block:
+                break
+            remaining -= len(block)
+            if b'"' not in block:
+                counts[parity] += block.count(b'\n')
+                continue
+            for match in _TOKEN_RE.finditer(block):
+                if match.group() == b'"':
+                    parity ^= 1
+                else:
+                    counts[parity] += 1
+    return counts[0], counts[1], parity
+
+
+def _chunk_offsets(path, start, end, in_quotes, breaks_before, rows_per_file):
+    """
+    返回[start, end)中所有分块起始行的字节偏移
+    breaks_before为start之前的行结束数，第k个行结束之后是第k个数据行（从0开始）
+    """
+    offsets = []
+    breaks = breaks_before
+    parity = 1 if in_quotes else 0
+    with open(path, 'rb') as f:
+        f.seek(start)
+        position = start
+        while position < end:
+            block = f.read(min(_SCAN_BLOCK, end - position))
+            if not block:
+                break
+            if b'"' not in block:
+                if parity == 0:
+                    # 不含引号的块：先整体计数，只有跨过分块边界时才逐个定位换行
+                    remaining = block.count(b'\n')
+                    matches = _NEWLINE_RE.finditer(block)
+                    while remaining >= rows_per_file - breaks % rows_per_file:
+                        need = rows_per_file - breaks % rows_per_file
+                        match = next(itertools.islice(matches, need - 1, None))
+                        offsets.append(position + match.end())
+                        breaks += need
+                        remaining -= need
+                    breaks += remaining
+            else:
+                for match in _TOKEN_RE.finditer(block):
+                    if match.group() == b'"':
+                        parity ^= 1
+                    elif parity == 0:
+                        breaks += 1
+                        if breaks % rows_per_file == 0:
+                            offsets.append(position + match.end())
+            position += len(block)
+    return offsets
+
+
+def _copy_csv_chunk(path, start, end, header, encoding, output_path, cancel_token=None):
+    """
+    复制[start, end)的字节作为一个CSV分块，转码为OUTPUT_ENCODING并加上表头；
+    UTF-8的输入不转码，但同样逐块解码检查，无法解码时抛出UnicodeDecodeError
+    返回 {'write': 秒, 'fsync': 秒}，同split_engine._write_rows_chunk
+    """
+    from split_engine import commit_partial, partial_path, remove_partial
+
+    cancel_token = cancel_token or worker_cancel_token()
+    started = time.perf_counter()
+    decoder = codecs.getincrementaldecoder(encoding)()
+    try:
+        with open(path, 'rb') as src, open(partial_path(output_path), 'wb') as dst:
+            dst.write(codecs.BOM_UTF8)
+            dst.write(header.decode(encoding).encode('utf-8'))
+            src.seek(start)
+            remaining = end - start
+            while remaining > 0:
+                if cancel_token is not None:
+                    cancel_token.check()
+                block = src.read(min(_SCAN_BLOCK, remaining))
+                if not block:
+                    break
+                remaining -= len(block)
+                text = decoder.decode(block)
+                if encoding in ('utf-8', 'utf-8-sig'):
+                    dst.write(block)
+                else:
+                    dst.write(text.encode('utf-8'))
+            dst.write(decoder.decode(b'', final=True).encode('utf-8'))
+    except BaseException:
+        remove_partial(output_path)
+        raise
+    written = time.perf_counter() - started
+    return {'write': written, 'fsync': commit_partial(output_path)}
+
+
+def can_split_bytes(path, writer_name):
+    """逗号分隔的CSV拆分为CSV时可以按字节范围复制"""
+    return is_csv(path) and writer_name == 'csv' and detect_delimiter(path) == ','
+
+
+def split_csv_bytes(input_file, output_dir, rows_per_file, progress_callback=None, workers=1,
+                    sheet_name=None, checkpoint=None, cancel_token=None, stage_times=None):
+    """
+    按字节范围把CSV拆分为CSV，参数和返回值同split_engine.split_streaming
+    原样复制每一行的字节（只转码），空行也计为一行
+    stage_times不为None时，统计换行和定位分块计入parse，复制分块计入write
+    """
+    # split_engine导入了本模块，在函数内导入以避免循环导入
+    from split_engine import _checkpointed, output_filename_for, run_chunk_tasks
+
+    _check_sheet(input_file, sheet_name)
+    started = time.perf_counter()
+    encoding = detect_encoding(input_file)
+    header, data_start = _header_end(input_file)
+    if encoding == 'utf-8-sig':
+        header = header[len(codecs.BOM_UTF8):]
+        encoding = 'utf-8'
+    size = os.path.getsize(input_file)
+
+    # 第一遍：各段的换行数和引号奇偶性
+    step = max((size - data_start + workers - 1) // workers, 1)
+    ranges = [(start, min(start + step, size)) for start in range(data_start, size, step)]
+    if workers > 1 and len(ranges) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            scans = list(executor.map(_scan_range, itertools.repeat(input_file),
+                                      *zip(*ranges)))
+    else:
+        scans = [_scan_range(input_file, start, end) for start, end in ranges]
+    if cancel_token is not None:
+        cancel_token.check()
+
+    # 第二遍：各段内分块起始行的偏移
+    arguments = []
+    in_quotes = False
+    breaks = 0
+    for (start, end), (outside, inside, odd) in zip(ranges, scans):
+        arguments.append((input_file, start, end, in_quotes, breaks, rows_per_file))
+        breaks += inside if in_quotes else outside
+        in_quotes = in_quotes != bool(odd)
+    if workers > 1 and len(arguments) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            found = list(executor.map(_chunk_offsets, *zip(*arguments)))
+    else:
+        found = [_chunk_offsets(*args) for args in arguments]
+    if cancel_token is not None:
+        cancel_token.check()
+
+    # 文件以换行结尾时，最后一个换行之后没有数据行
+    offsets = [data_start] + [offset for part in found for offset in part if offset < size]
+    if data_start >= size:
+        offsets = []
+    total_rows = breaks + (1 if data_start < size and not _ends_with_newline(input_file) else 0)
+    num_files = len(offsets)
+    if stage_times is not None:
+        stage_times.add('parse', time.perf_counter() - started)
+
+    os.makedirs(output_dir, exist_ok=True)
+    progress_callback = _checkpointed(progress_callback, checkpoint, rows_per_file, stage_times)
+
+    def tasks():
+        for i, start in enumerate(offsets):
+            end = offsets[i + 1] if i + 1 < num_files else size
+            row_count = min(rows_per_file, total_rows - i * rows_per_file)
+            output_filename = output_filename_for(input_file, i, '.csv', sheet_name)
+            if checkpoint is not None and checkpoint.is_complete(i):
+                yield output_filename, row_count, None, None
+                continue
+            yield (output_filename, row_count, _copy_csv_chunk,
+                   (input_file, start, end, header, encoding, os.path.join(output_dir, output_filename)))
+
+    if workers > 1:
+        return run_chunk_tasks(tasks(), workers, num_files, progress_callback, cancel_token, stage_times)
+
+    results = []
+    for output_filename, row_count, func, args in tasks():
+        if func is not None:
+            try:
+                timings = func(*args, cancel_token=cancel_token)
+            except SplitCancelled:
+                raise SplitCancelled(results)
+            if stage_times is not None:
+                stage_times.merge(timings)
+        results.append((output_filename, row_count))
+        if progress_callback:
+            progress_callback(len(results), num_files, output_filename, row_count)
+    return results
+
+
+def _ends_with_newline(path):
+    with open(path, 'rb') as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b'\n'
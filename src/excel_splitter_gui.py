@@ -6,21 +6,39 @@ Excel拆分GUI工具
 
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
-import pandas as pd
 import os
-from pathlib import Path
+import queue
 import threading
 import subprocess
 import platform
 
+from batch import expand_inputs, run_batch, split_sheets
+from cancel import CancelToken, SplitCancelled
+from file_inspector import inspect_file
+from merge import merge_files, natural_key
+from parse_cache import WorkbookCache
+from profiling import format_report, save_report
+from row_filter import parse_selection
+from split_engine import ENGINES, ENGINE_PANDAS, ENGINE_STREAMING, prewarm_imports, read_excel_dataframe
+from splitter import Splitter
+from writers import DEFAULT_WRITER, available_writers
+
+
+# 界面刷新间隔（毫秒），后台线程的消息按这个频率批量显示
+UI_REFRESH_MS = 50
+# 信息区域最多保留的行数，超出后丢弃最早的内容
+MAX_INFO_LINES = 2000
+# 窗口显示后等待这么久（毫秒）再在后台预先导入pandas等依赖
+PREWARM_DELAY_MS = 300
+
 
 class ExcelSplitterGUI:
     def __init__(self, root):
         self.root = root
         self.root.title("Excel文件拆分工具")
-        self.root.geometry("800x650")
+        self.root.geometry("800x720")
         self.root.resizable(True, True)
-        self.root.minsize(750, 600)
+        self.root.minsize(750, 660)
         
         # 设置样式
         self.style = ttk.Style()
@@ -53,11 +71,38 @@ class ExcelSplitterGUI:
         self.input_file_path = tk.StringVar()
         self.rows_per_file = tk.StringVar(value="50")
         self.output_dir = tk.StringVar()
+        self.engine = tk.StringVar(value=ENGINE_STREAMING)
+        self.workers = tk.StringVar(value="1")
+        self.writer = tk.StringVar(value=DEFAULT_WRITER)
+        # 填写列名时按该列的值拆分，忽略每个文件行数
+        self.by_column = tk.StringVar()
+        # 填写大小上限（MB）时按文件大小拆分
+        self.max_mb = tk.StringVar()
+        # 断点续拆：跳过上次中断前已完成的分块
+        self.resume = tk.BooleanVar(value=False)
+        # 性能分析：拆分后输出各阶段耗时，并把报告保存到输出目录
+        self.profile = tk.BooleanVar(value=False)
+        # 保存.xls的转换结果，再次拆分同一文件时跳过BIFF解析（同命令行的--cache-xls）
+        self.convert_xls = tk.BooleanVar(value=False)
+        # 保留的列（逗号分隔的列名或列号）和筛选条件（分号分隔，如 地区=华东,华南;金额=100..）
+        self.columns = tk.StringVar()
+        self.where = tk.StringVar()
         
         # 存储文件信息
         self.current_file_info = None
+        # 已解析工作簿缓存，分析和拆分共用
+        self.workbook_cache = WorkbookCache()
+        
+        # 后台线程不直接操作Tk控件，而是把消息放入队列，由主线程定时批量处理
+        self.ui_queue = queue.Queue()
+        # 进行中任务（拆分、批量拆分或合并）的取消标记，由取消按钮设置；没有任务在进行时为None，
+        # 同一时间只能有一个任务，见begin_run和end_run
+        self.cancel_token = None
         
         self.setup_ui()
+        self.root.after(UI_REFRESH_MS, self.drain_ui_queue)
+        # 拆分相关的模块只在用到时才导入pandas和openpyxl，窗口可以立即显示；显示后再在后台预先导入
+        self.root.after(PREWARM_DELAY_MS, self.start_prewarm)
         
     def setup_ui(self):
         """设置用户界面"""
@@ -69,7 +114,7 @@ class ExcelSplitterGUI:
         self.root.columnconfigure(0, weight=1)
         self.root.rowconfigure(0, weight=1)
         main_frame.columnconfigure(1, weight=1)
-        main_frame.rowconfigure(4, weight=1)  # 让文件信息区域可以扩展
+        main_frame.rowconfigure(7, weight=1)  # 让文件信息区域可以扩展
         
         # 标题
         title_label = ttk.Label(main_frame, text="Excel文件拆分工具", 
@@ -92,21 +137,93 @@ class ExcelSplitterGUI:
                               width=25, font=('Arial', 10))
         rows_entry.grid(row=2, column=1, sticky=tk.W, padx=(15, 0), pady=(0, 10))
         
+        # 按列值拆分：填写列名后忽略行数，每个值一个文件
+        column_frame = ttk.Frame(main_frame)
+        column_frame.grid(row=2, column=1, sticky=tk.E, pady=(0, 10))
+        ttk.Label(column_frame, text="或按列值拆分:", style='Heading.TLabel').pack(
+            side=tk.LEFT, padx=(0, 10))
+        ttk.Entry(column_frame, textvariable=self.by_column, width=12,
+                  font=('Arial', 10)).pack(side=tk.LEFT)
+        # 按文件大小拆分：填写上限后忽略行数
+        ttk.Label(column_frame, text="或每个文件不超过(MB):", style='Heading.TLabel').pack(
+            side=tk.LEFT, padx=(15, 10))
+        ttk.Entry(column_frame, textvariable=self.max_mb, width=6,
+                  font=('Arial', 10)).pack(side=tk.LEFT)
+        
         # 绑定行数输入框的变化事件
         self.rows_per_file.trace_add('write', self.on_rows_changed)
         
+        # 拆分引擎选择
+        ttk.Label(main_frame, text="拆分引擎:", style='Heading.TLabel').grid(
+            row=3, column=0, sticky=tk.W, pady=(0, 10))
+        engine_frame = ttk.Frame(main_frame)
+        engine_frame.grid(row=3, column=1, sticky=tk.W, padx=(15, 0), pady=(0, 10))
+        engine_combo = ttk.Combobox(engine_frame, textvariable=self.engine, values=ENGINES,
+                                    state='readonly', width=22, font=('Arial', 10))
+        engine_combo.pack(side=tk.LEFT)
+        
+        # 并发写出分块的进程数
+        ttk.Label(engine_frame, text="并行进程数:", style='Heading.TLabel').pack(
+            side=tk.LEFT, padx=(20, 10))
+        workers_spinbox = ttk.Spinbox(engine_frame, textvariable=self.workers, from_=1,
+                                      to=os.cpu_count() or 1, width=6, font=('Arial', 10))
+        workers_spinbox.pack(side=tk.LEFT)
+        
+        # 输出格式（写出后端）
+        ttk.Label(engine_frame, text="输出格式:", style='Heading.TLabel').pack(
+            side=tk.LEFT, padx=(20, 10))
+        writer_combo = ttk.Combobox(engine_frame, textvariable=self.writer,
+                                    values=available_writers(), state='readonly', width=12,
+                                    font=('Arial', 10))
+        writer_combo.pack(side=tk.LEFT)
+        
+        # 断点续拆（仅按行数拆分时有效，多个工作表和批量拆分时每个工作表、文件各自续拆）
+        ttk.Checkbutton(engine_frame, text="断点续拆", variable=self.resume).pack(
+            side=tk.LEFT, padx=(20, 0))
+        ttk.Checkbutton(engine_frame, text="性能分析", variable=self.profile).pack(
+            side=tk.LEFT, padx=(10, 0))
+        ttk.Checkbutton(engine_frame, text="缓存.xls转换结果", variable=self.convert_xls).pack(
+            side=tk.LEFT, padx=(10, 0))
+        
+        # 列选择和行筛选：留空表示输出所有列和所有行，见row_filter
+        ttk.Label(main_frame, text="保留列:", style='Heading.TLabel').grid(
+            row=4, column=0, sticky=tk.W, pady=(0, 10))
+        selection_frame = ttk.Frame(main_frame)
+        selection_frame.grid(row=4, column=1, sticky=(tk.W, tk.E), padx=(15, 10), pady=(0, 10))
+        ttk.Entry(selection_frame, textvariable=self.columns, width=25,
+                  font=('Arial', 10)).pack(side=tk.LEFT)
+        ttk.Label(selection_frame, text="筛选条件:", style='Heading.TLabel').pack(
+            side=tk.LEFT, padx=(20, 10))
+        ttk.Entry(selection_frame, textvariable=self.where,
+                  font=('Arial', 10)).pack(side=tk.LEFT, fill=tk.X, expand=True)
+        
+        # 工作表选择（可多选），分析文件后列出所有工作表
+        ttk.Label(main_frame, text="拆分工作表:", style='Heading.TLabel').grid(
+            row=5, column=0, sticky=(tk.W, tk.N), pady=(0, 10))
+        sheet_frame = ttk.Frame(main_frame)
+        sheet_frame.grid(row=5, column=1, sticky=(tk.W, tk.E), padx=(15, 10), pady=(0, 10))
+        sheet_frame.columnconfigure(0, weight=1)
+        self.sheet_listbox = tk.Listbox(sheet_frame, selectmode=tk.MULTIPLE, height=3,
+                                        exportselection=False, font=('Arial', 10))
+        sheet_scrollbar = ttk.Scrollbar(sheet_frame, orient=tk.VERTICAL,
+                                        command=self.sheet_listbox.yview)
+        self.sheet_listbox.configure(yscrollcommand=sheet_scrollbar.set)
+        self.sheet_listbox.grid(row=0, column=0, sticky=(tk.W, tk.E))
+        self.sheet_listbox.bind('<<ListboxSelect>>', lambda event: self.prefetch_selected_sheet())
+        sheet_scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S))
+        
         # 输出目录选择
         ttk.Label(main_frame, text="输出目录:", style='Heading.TLabel').grid(
-            row=3, column=0, sticky=tk.W, pady=(0, 15))
+            row=6, column=0, sticky=tk.W, pady=(0, 15))
         output_entry = ttk.Entry(main_frame, textvariable=self.output_dir, 
                                 width=60, font=('Arial', 10))
-        output_entry.grid(row=3, column=1, sticky=(tk.W, tk.E), padx=(15, 10), pady=(0, 15))
+        output_entry.grid(row=6, column=1, sticky=(tk.W, tk.E), padx=(15, 10), pady=(0, 15))
         ttk.Button(main_frame, text="浏览", command=self.browse_output_dir,
-                  style='Secondary.TButton').grid(row=3, column=2, pady=(0, 15))
+                  style='Secondary.TButton').grid(row=6, column=2, pady=(0, 15))
         
         # 文件信息显示区域
         info_frame = ttk.LabelFrame(main_frame, text="文件信息", padding="15")
-        info_frame.grid(row=4, column=0, columnspan=3, sticky=(tk.W, tk.E, tk.N, tk.S), pady=(0, 20))
+        info_frame.grid(row=7, column=0, columnspan=3, sticky=(tk.W, tk.E, tk.N, tk.S), pady=(0, 20))
         info_frame.columnconfigure(0, weight=1)
         info_frame.rowconfigure(0, weight=1)
         
@@ -123,17 +240,35 @@ class ExcelSplitterGUI:
         self.progress_var = tk.DoubleVar()
         self.progress_bar = ttk.Progressbar(main_frame, variable=self.progress_var, 
                                           maximum=100, length=500)
-        self.progress_bar.grid(row=5, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=(0, 20))
+        self.progress_bar.grid(row=8, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=(0, 20))
         
         # 按钮区域
         button_frame = ttk.Frame(main_frame)
-        button_frame.grid(row=6, column=0, columnspan=3, pady=(0, 10))
+        button_frame.grid(row=9, column=0, columnspan=3, pady=(0, 10))
         
         self.split_button = ttk.Button(button_frame, text="开始拆分", 
                                      command=self.start_split, style='Accent.TButton',
                                      width=15)
         self.split_button.pack(side=tk.LEFT, padx=(0, 15))
         
+        self.batch_button = ttk.Button(button_frame, text="批量拆分目录",
+                                       command=self.start_batch_split, style='Secondary.TButton',
+                                       width=15)
+        self.batch_button.pack(side=tk.LEFT, padx=(0, 15))
+        
+        self.merge_button = ttk.Button(button_frame, text="合并文件",
+                                       command=self.start_merge, style='Secondary.TButton',
+                                       width=12)
+        self.merge_button.pack(side=tk.LEFT, padx=(0, 15))
+        
+        self.cancel_button = ttk.Button(button_frame, text="取消", command=self.cancel_split,
+                                        style='Secondary.TButton', width=10)
+        self.cancel_button.pack(side=tk.LEFT, padx=(0, 15))
+        # 只有拆分进行中才能取消
+        self.cancel_button.config(state='disabled')
+        # 开始任务的按钮，任务进行中全部禁用
+        self.run_buttons = (self.split_button, self.batch_button, self.merge_button)
+        
         clear_button = ttk.Button(button_frame, text="清空信息", command=self.clear_info,
                                  style='Secondary.TButton', width=12)
         clear_button.pack(side=tk.LEFT, padx=(0, 15))
@@ -153,7 +288,7 @@ class ExcelSplitterGUI:
         """浏览输入文件"""
         file_path = filedialog.askopenfilename(
             title="选择Excel文件",
-            filetypes=[("Excel文件", "*.xlsx *.xls"), ("所有文件", "*.*")]
+            filetypes=[("Excel文件", "*.xlsx *.xls"), ("CSV文件", "*.csv *.tsv"), ("所有文件", "*.*")]
         )
         if file_path:
             self.input_file_path.set(file_path)
@@ -172,44 +307,116 @@ class ExcelSplitterGUI:
             self.open_folder_button.config(state='normal')
     
     def analyze_file(self):
-        """分析选中的Excel文件"""
+        """在后台线程中分析选中的文件，完成后在主线程显示结果"""
+        file_path = self.input_file_path.get()
+        if not file_path:
+            return
+        thread = threading.Thread(target=self.inspect_in_background, args=(file_path,))
+        thread.daemon = True
+        thread.start()
+    
+    def inspect_in_background(self, file_path):
+        """
+        后台线程：只读取元数据分析文件规模，不解析整个工作表；
+        xlsx的dimension缺失或不可信时要扫描整个工作表XML，因此不在主线程中进行
+        """
         try:
-            file_path = self.input_file_path.get()
-            if not file_path:
-                return
-                
-            # 读取Excel文件信息
-            if file_path.lower().endswith('.xlsx'):
-                df = pd.read_excel(file_path, engine='openpyxl')
-            elif file_path.lower().endswith('.xls'):
-                # .xls 文件使用 xlrd 引擎
-                df = pd.read_excel(file_path, engine='xlrd')
-            else:
-                df = pd.read_excel(file_path)
-            
-            total_rows = len(df)
-            columns = len(df.columns)
-            
-            # 存储文件信息
-            self.current_file_info = {
-                'path': file_path,
-                'total_rows': total_rows,
-                'columns': columns
-            }
-            
-            self.add_info(f"文件分析完成:")
-            self.add_info(f"  文件路径: {file_path}")
-            self.add_info(f"  总行数: {total_rows}")
-            self.add_info(f"  列数: {columns}")
-            
-            # 计算拆分信息
-            self.update_split_info()
-                
+            info = inspect_file(file_path)
         except Exception as e:
             self.add_info(f"文件分析失败: {str(e)}")
             if "xlrd" in str(e).lower():
                 self.add_info("提示: 如果是.xls文件，请确保已安装xlrd包")
                 self.add_info("可以运行: pip install xlrd>=2.0.1")
+            return
+        self.call_in_ui(self.show_file_info, info)
+    
+    def show_file_info(self, info):
+        """在主线程中显示分析结果并列出工作表"""
+        file_path = info['path']
+        # 分析期间又选择了其他文件
+        if file_path != self.input_file_path.get():
+            return
+        
+        cached_df = self.workbook_cache.peek(file_path, self.cache_sheet_name(info, 0))
+        if cached_df is not None:
+            # 缓存中已有解析结果，直接使用精确值
+            info.update(total_rows=len(cached_df), columns=len(cached_df.columns), exact=True)
+        total_rows = info['total_rows']
+        columns = info['columns']
+        marker = "精确" if info['exact'] else "估算"
+        
+        # 存储文件信息
+        self.current_file_info = info
+        
+        self.add_info(f"文件分析完成:")
+        self.add_info(f"  文件路径: {file_path}")
+        self.add_info(f"  总行数: {total_rows}（{marker}）")
+        self.add_info(f"  列数: {columns}")
+        
+        # 列出所有工作表，默认全部选中
+        self.sheet_listbox.delete(0, tk.END)
+        for sheet in info['sheets']:
+            sheet_marker = "精确" if sheet['exact'] else "估算"
+            self.sheet_listbox.insert(
+                tk.END, f"{sheet['name']}（{sheet['total_rows']}行，{sheet_marker}）")
+        self.sheet_listbox.select_set(0, tk.END)
+        if len(info['sheets']) > 1:
+            self.add_info(f"  工作表: 共{len(info['sheets'])}个，可在上方选择要拆分的工作表")
+            for sheet in info['sheets']:
+                self.add_info(f"    {sheet['name']}: {sheet['total_rows']}行, {sheet['columns']}列")
+        
+        # 计算拆分信息
+        self.update_split_info()
+        self.prefetch_selected_sheet()
+    
+    def start_prewarm(self):
+        """在后台线程中预先导入较重的依赖"""
+        thread = threading.Thread(target=prewarm_imports)
+        thread.daemon = True
+        thread.start()
+
+    @staticmethod
+    def cache_sheet_name(info, index):
+        """
+        拆分第index个工作表时split_excel_file使用的工作表名，也是解析缓存的键：
+        只有一个工作表时为None（保持原有的文件命名），否则为工作表名
+        """
+        return None if len(info['sheets']) <= 1 else info['sheets'][index]['name']
+    
+    def prefetch_selected_sheet(self):
+        """
+        pandas引擎需要完整解析：只选中一个工作表时在后台预先解析该工作表并放入缓存，开始拆分时直接复用
+        选中多个工作表时在工作进程中拆分，不使用这里的缓存，不预先解析
+        """
+        info = self.current_file_info
+        if self.engine.get() != ENGINE_PANDAS or not info or info['path'] != self.input_file_path.get():
+            return
+        selected = self.sheet_listbox.curselection()
+        if len(selected) != 1:
+            return
+        sheet_name = self.cache_sheet_name(info, selected[0])
+        if self.workbook_cache.peek(info['path'], sheet_name) is not None:
+            return
+        thread = threading.Thread(target=self.prefetch_workbook, args=(info['path'], sheet_name))
+        thread.daemon = True
+        thread.start()
+    
+    def prefetch_workbook(self, file_path, sheet_name=None):
+        """后台解析工作簿中的工作表sheet_name并放入缓存"""
+        try:
+            df = self.workbook_cache.get(file_path, lambda path: read_excel_dataframe(path, sheet_name),
+                                         sheet_name)
+            self.add_info(f"后台预解析完成: 精确行数 {len(df)}")
+            self.show_cache_stats()
+        except Exception as e:
+            self.add_info(f"后台预解析失败: {str(e)}")
+    
+    def show_cache_stats(self):
+        """在信息区域显示缓存命中情况和占用内存"""
+        stats = self.workbook_cache.stats()
+        self.add_info(f"  解析缓存: 命中{stats['hits'] + stats['spill_hits']}次"
+                      f"（其中落盘{stats['spill_hits']}次）, 未命中{stats['misses']}次, "
+                      f"占用{stats['bytes_held'] / (1024 * 1024):.1f} MB")
     
     def update_split_info(self):
         """更新拆分信息显示"""
@@ -232,10 +439,47 @@ class ExcelSplitterGUI:
             self.update_split_info()
     
     def add_info(self, message):
-        """添加信息到信息显示区域"""
-        self.info_text.insert(tk.END, message + "\n")
-        self.info_text.see(tk.END)
-        self.root.update_idletasks()
+        """添加信息到信息显示区域（可在任意线程调用）"""
+        self.ui_queue.put(('info', message))
+    
+    def set_progress(self, value):
+        """设置进度条（可在任意线程调用），一次刷新内只保留最后一个值"""
+        self.ui_queue.put(('progress', value))
+    
+    def call_in_ui(self, func, *args, **kwargs):
+        """在主线程中执行func，用于后台线程弹出对话框、修改按钮状态等"""
+        self.ui_queue.put(('call', (func, args, kwargs)))
+    
+    def drain_ui_queue(self):
+        """主线程定时处理队列中的消息：合并信息一次插入，进度只取最新值"""
+        lines = []
+        progress = None
+        calls = []
+        while True:
+            try:
+                kind, payload = self.ui_queue.get_nowait()
+            except queue.Empty:
+                break
+            if kind == 'info':
+                lines.append(payload)
+            elif kind == 'progress':
+                progress = payload
+            else:
+                calls.append(payload)
+        
+        if lines:
+            # 只插入最后MAX_INFO_LINES行，并删除超出上限的旧内容
+            self.info_text.insert(tk.END, "\n".join(lines[-MAX_INFO_LINES:]) + "\n")
+            line_count = int(self.info_text.index('end-1c').split('.')[0]) - 1
+            if line_count > MAX_INFO_LINES:
+                self.info_text.delete('1.0', f'{line_count - MAX_INFO_LINES + 1}.0')
+            self.info_text.see(tk.END)
+        if progress is not None:
+            self.progress_var.set(progress)
+        for func, args, kwargs in calls:
+            func(*args, **kwargs)
+        
+        self.root.after(UI_REFRESH_MS, self.drain_ui_queue)
     
     def clear_info(self):
         """清空信息显示"""
@@ -244,6 +488,47 @@ class ExcelSplitterGUI:
         if not self.output_dir.get():
             self.open_folder_button.config(state='disabled')
     
+    def read_options(self):
+        """
+        读取界面上的设置（只能在主线程调用）；后台线程只使用返回的值，不访问Tk变量
+        行数、进程数等需要校验的值由各start_*方法校验后加入
+        """
+        return {
+            'input_file': self.input_file_path.get(),
+            'output_dir': self.output_dir.get(),
+            'engine': self.engine.get(),
+            'writer': self.writer.get(),
+            'resume': self.resume.get(),
+            'profile': self.profile.get(),
+            'convert_xls': self.convert_xls.get(),
+        }
+    
+    def read_selection(self):
+        """由保留列和筛选条件创建RowSelection，都为空时返回None；格式错误时抛出ValueError"""
+        return parse_selection(self.columns.get(), self.where.get().split(';'))
+    
+    def begin_run(self, options):
+        """
+        开始一个任务（只能在主线程调用）：禁用所有开始任务的按钮并创建取消标记，放入options['cancel_token']
+        已有任务在进行时返回False
+        """
+        if self.cancel_token is not None:
+            return False
+        for button in self.run_buttons:
+            button.config(state='disabled')
+        self.cancel_token = options['cancel_token'] = CancelToken()
+        self.cancel_button.config(state='normal')
+        return True
+    
+    def end_run(self, cancel_token):
+        """任务结束（由后台线程通过call_in_ui调用）：清除取消标记，重新启用按钮"""
+        if self.cancel_token is not cancel_token:
+            return
+        self.cancel_token = None
+        for button in self.run_buttons:
+            button.config(state='normal')
+        self.cancel_button.config(state='disabled')
+    
     def start_split(self):
         """开始拆分文件"""
         # 验证输入
@@ -255,86 +540,362 @@ class ExcelSplitterGUI:
             messagebox.showerror("错误", "请选择输出目录")
             return
         
+        by_column = self.by_column.get().strip()
+        max_mb = self.max_mb.get().strip()
+        if by_column and max_mb:
+            messagebox.showerror("错误", "按列值拆分和按文件大小拆分只能选择一种")
+            return
+        if max_mb:
+            try:
+                if float(max_mb) <= 0:
+                    raise ValueError("大小上限必须大于0")
+            except ValueError:
+                messagebox.showerror("错误", "请输入有效的文件大小上限（MB，正数）")
+                return
+        rows_per_file = None
+        if not by_column and not max_mb:
+            try:
+                rows_per_file = int(self.rows_per_file.get())
+                if rows_per_file <= 0:
+                    raise ValueError("行数必须大于0")
+            except ValueError:
+                messagebox.showerror("错误", "请输入有效的行数（正整数）")
+                return
+        
         try:
-            rows_per_file = int(self.rows_per_file.get())
-            if rows_per_file <= 0:
-                raise ValueError("行数必须大于0")
+            workers = int(self.workers.get())
+            if workers <= 0:
+                raise ValueError("进程数必须大于0")
         except ValueError:
-            messagebox.showerror("错误", "请输入有效的行数（正整数）")
+            messagebox.showerror("错误", "请输入有效的并行进程数（正整数）")
             return
         
+        try:
+            selection = self.read_selection()
+        except ValueError as e:
+            messagebox.showerror("错误", str(e))
+            return
+        
+        # 工作簿有多个工作表时按选择拆分；只有一个工作表时保持原有的文件命名
+        sheet_names = None
+        info = self.current_file_info
+        if info and info['path'] == self.input_file_path.get() and len(info['sheets']) > 1:
+            sheet_names = [info['sheets'][i]['name'] for i in self.sheet_listbox.curselection()]
+            if not sheet_names:
+                messagebox.showerror("错误", "请至少选择一个工作表")
+                return
+            if (by_column or max_mb) and len(sheet_names) > 1:
+                messagebox.showerror("错误", "按列值或按文件大小拆分一次只能选择一个工作表")
+                return
+        
+        options = self.read_options()
+        options.update(rows_per_file=rows_per_file, workers=workers, by_column=by_column or None,
+                       max_mb=max_mb, file_info=info)
+        
         # 在新线程中执行拆分操作
-        self.split_button.config(state='disabled')
-        thread = threading.Thread(target=self.split_excel_file)
+        if not self.begin_run(options):
+            return
+        if sheet_names and len(sheet_names) > 1:
+            thread = threading.Thread(target=self.split_selected_sheets,
+                                      args=(options, sheet_names, selection))
+        else:
+            thread = threading.Thread(target=self.split_excel_file,
+                                      args=(options, sheet_names[0] if sheet_names else None, selection))
         thread.daemon = True
         thread.start()
     
-    def split_excel_file(self):
-        """拆分Excel文件的核心逻辑"""
+    def split_excel_file(self, options, sheet_name=None, selection=None):
+        """
+        拆分Excel文件的核心逻辑（后台线程），options见read_options和start_split；
+        sheet_name为None时拆分第一个工作表；selection见read_selection
+        """
         try:
-            input_file = self.input_file_path.get()
-            output_dir = self.output_dir.get()
-            rows_per_file = int(self.rows_per_file.get())
+            input_file = options['input_file']
+            output_dir = options['output_dir']
+            by_column = options['by_column']
+            max_mb = options['max_mb']
+            max_bytes = int(float(max_mb) * 1024 * 1024) if max_mb else None
+            rows_per_file = options['rows_per_file']
+            engine = options['engine']
+            workers = options['workers']
+            writer = options['writer']
+            file_info = options['file_info']
             
-            self.add_info("开始拆分文件...")
-            self.progress_var.set(0)
-            
-            # 读取Excel文件
-            if input_file.lower().endswith('.xlsx'):
-                df = pd.read_excel(input_file, engine='openpyxl')
-            elif input_file.lower().endswith('.xls'):
-                # .xls 文件使用 xlrd 引擎
-                df = pd.read_excel(input_file, engine='xlrd')
+            if by_column:
+                self.add_info(f"开始按列“{by_column}”的值拆分文件（输出格式: {writer}）...")
+            elif max_bytes:
+                self.add_info(f"开始按文件大小拆分，每个文件不超过{max_mb}MB（输出格式: {writer}）...")
             else:
-                df = pd.read_excel(input_file)
+                self.add_info(f"开始拆分文件（引擎: {engine}，并行进程数: {workers}，输出格式: {writer}）...")
+            self.log_selection(selection)
+            self.set_progress(0)
+            
+            # 有筛选条件时无法预先知道行数
+            if rows_per_file and not (selection and selection.filters) and file_info and file_info['path'] == input_file:
+                sheet_info = file_info
+                for sheet in file_info['sheets']:
+                    if sheet['name'] == sheet_name:
+                        sheet_info = sheet
+                total_rows = sheet_info['total_rows']
+                num_files = (total_rows + rows_per_file - 1) // rows_per_file
+                marker = "" if sheet_info['exact'] else "约"
+                self.add_info(f"总共{marker}{total_rows}行数据，将拆分为{marker}{num_files}个文件")
             
-            total_rows = len(df)
+            def on_progress(done, total, output_filename, row_count):
+                # 流式引擎的文件总数为预估值，进度不超过100%
+                if total:
+                    self.set_progress(min(done / total, 1.0) * 100)
+                # 按列值拆分的读取阶段只更新进度
+                if output_filename is not None:
+                    self.add_info(f"已生成: {output_filename} ({row_count}行)")
             
-            # 获取原文件名（不含扩展名）
-            input_filename = Path(input_file).stem
-            file_extension = Path(input_file).suffix
+            splitter = Splitter(input_file, rows_per_file, output_dir=output_dir, engine=engine,
+                                writer=writer, workers=workers, progress_callback=on_progress,
+                                cache=self.workbook_cache, sheet_name=sheet_name, by_column=by_column,
+                                max_bytes=max_bytes, resume=options['resume'],
+                                cancel_token=options['cancel_token'], convert_xls=options['convert_xls'],
+                                profile=options['profile'], selection=selection)
+            result = splitter.run()
+            num_files = len(result['files'])
+            if engine == ENGINE_PANDAS:
+                self.show_cache_stats()
             
-            # 计算需要生成的文件数量
-            num_files = (total_rows + rows_per_file - 1) // rows_per_file
+            self.add_info("拆分完成！")
+            self.add_info(f"共{result['rows']}行, 耗时{result['elapsed']:.1f}秒, "
+                          f"平均{result['rows_per_sec']:.0f}行/秒")
+            if 'profile' in result:
+                for line in format_report(result['profile']):
+                    self.add_info(line)
+                stem = os.path.splitext(os.path.basename(input_file))[0]
+                report_path = os.path.join(splitter.output_dir, f"{stem}.profile.json")
+                save_report(report_path, result['profile'])
+                self.add_info(f"性能报告: {report_path}")
+            self.add_info(f"输出目录: {output_dir}")
+            self.call_in_ui(messagebox.showinfo, "完成", f"文件拆分完成！\n共生成{num_files}个文件")
+            
+        except SplitCancelled as e:
+            self.add_info(f"拆分已取消，已完成{len(e.files)}个文件，未完成的文件已删除")
+            self.call_in_ui(messagebox.showinfo, "已取消", f"拆分已取消\n已完成{len(e.files)}个文件")
+        
+        except Exception as e:
+            error_msg = f"拆分失败: {str(e)}"
+            self.add_info(error_msg)
+            self.call_in_ui(messagebox.showerror, "错误", error_msg)
+        
+        finally:
+            self.call_in_ui(self.end_run, options['cancel_token'])
+            self.set_progress(0)
+    
+    def log_selection(self, selection):
+        """在信息区域显示列选择和筛选条件"""
+        if selection is None:
+            return
+        if selection.columns:
+            self.add_info(f"保留列: {', '.join(selection.columns)}")
+        for row_filter in selection.filters:
+            self.add_info(f"筛选条件: {row_filter.describe()}")
+    
+    def split_selected_sheets(self, options, sheet_names, selection=None):
+        """并发拆分选中的多个工作表（后台线程），每个工作表输出为 <原文件名>_<工作表名>_001 等文件"""
+        try:
+            input_file = options['input_file']
+            output_dir = options['output_dir']
+            rows_per_file = options['rows_per_file']
+            workers = options['workers']
             
-            self.add_info(f"总共{total_rows}行数据，将拆分为{num_files}个文件")
+            self.add_info(f"开始并发拆分{len(sheet_names)}个工作表（同时处理{workers}个）...")
+            self.log_selection(selection)
+            self.set_progress(0)
+            finished = [0]
             
-            # 创建输出目录（如果不存在）
-            os.makedirs(output_dir, exist_ok=True)
+            def on_status(label, status, detail):
+                if status == 'running':
+                    return
+                finished[0] += 1
+                self.set_progress(finished[0] / len(sheet_names) * 100)
+                if status == 'done':
+                    self.add_info(f"  完成: {label} -> {detail['files']}个文件, {detail['rows']}行")
+                elif status == 'cancelled':
+                    self.add_info(f"  已取消: {label}（已完成{detail}个文件）")
+                else:
+                    self.add_info(f"  失败: {label}: {detail}")
             
-            # 拆分文件
-            for i in range(num_files):
-                start_row = i * rows_per_file
-                end_row = min((i + 1) * rows_per_file, total_rows)
-                
-                # 提取数据
-                chunk_df = df.iloc[start_row:end_row]
-                
-                # 生成输出文件名 - 统一输出为xlsx格式
-                output_filename = f"{input_filename}_{i+1:03d}.xlsx"
-                output_path = os.path.join(output_dir, output_filename)
-                
-                # 保存文件 - 统一使用openpyxl引擎保存为xlsx格式
-                chunk_df.to_excel(output_path, index=False, engine='openpyxl')
-                
-                # 更新进度
-                progress = ((i + 1) / num_files) * 100
-                self.progress_var.set(progress)
-                
-                self.add_info(f"已生成: {output_filename} ({end_row - start_row}行)")
+            summary = split_sheets(input_file, sheet_names, output_dir, rows_per_file,
+                                   engine=options['engine'], writer=options['writer'],
+                                   workers=workers, status_callback=on_status,
+                                   cancel_token=options['cancel_token'], convert_xls=options['convert_xls'],
+                                   selection=selection, resume=options['resume'])
             
-            self.add_info("拆分完成！")
+            self.add_info(f"拆分完成！成功{summary['files']}个工作表, 失败{summary['failed']}个, "
+                          f"取消{summary['cancelled']}个, "
+                          f"共{summary['rows']}行, 耗时{summary['elapsed']:.1f}秒")
             self.add_info(f"输出目录: {output_dir}")
-            messagebox.showinfo("完成", f"文件拆分完成！\n共生成{num_files}个文件")
+            self.call_in_ui(messagebox.showinfo, "完成",
+                            f"工作表拆分完成！\n成功{summary['files']}个，失败{summary['failed']}个")
             
         except Exception as e:
             error_msg = f"拆分失败: {str(e)}"
             self.add_info(error_msg)
-            messagebox.showerror("错误", error_msg)
+            self.call_in_ui(messagebox.showerror, "错误", error_msg)
+        
+        finally:
+            self.call_in_ui(self.end_run, options['cancel_token'])
+            self.set_progress(0)
+    
+    def start_batch_split(self):
+        """选择目录，批量拆分其中的所有Excel文件"""
+        input_dir = filedialog.askdirectory(title="选择包含Excel文件的目录")
+        if not input_dir:
+            return
+        
+        paths = expand_inputs(input_dir)
+        if not paths:
+            messagebox.showerror("错误", "所选目录中没有Excel文件")
+            return
+        
+        try:
+            rows_per_file = int(self.rows_per_file.get())
+            workers = int(self.workers.get())
+            if rows_per_file <= 0 or workers <= 0:
+                raise ValueError("行数和进程数必须大于0")
+        except ValueError:
+            messagebox.showerror("错误", "请输入有效的行数和并行进程数（正整数）")
+            return
+        
+        try:
+            selection = self.read_selection()
+        except ValueError as e:
+            messagebox.showerror("错误", str(e))
+            return
+        
+        if not self.output_dir.get():
+            self.output_dir.set(input_dir)
+            self.open_folder_button.config(state='normal')
+        
+        options = self.read_options()
+        options.update(rows_per_file=rows_per_file, workers=workers)
+        
+        if not self.begin_run(options):
+            return
+        thread = threading.Thread(target=self.batch_split_files, args=(options, paths, selection))
+        thread.daemon = True
+        thread.start()
+    
+    def batch_split_files(self, options, paths, selection=None):
+        """批量拆分的后台线程，options见read_options和start_batch_split"""
+        try:
+            output_dir = options['output_dir']
+            workers = options['workers']
+            self.add_info(f"开始批量拆分{len(paths)}个文件（同时处理{workers}个）...")
+            self.log_selection(selection)
+            self.set_progress(0)
+            finished = [0]
+            
+            def on_status(path, status, detail):
+                name = os.path.basename(path)
+                if status == 'running':
+                    self.add_info(f"  处理中: {name}")
+                    return
+                finished[0] += 1
+                self.set_progress(finished[0] / len(paths) * 100)
+                if status == 'done':
+                    self.add_info(f"  完成: {name} -> {detail['files']}个文件, {detail['rows']}行, "
+                                  f"{detail['elapsed']:.1f}秒")
+                    if detail['output_dir'] != output_dir:
+                        # 同名的输入输出到各自的子目录
+                        self.add_info(f"    输出到: {detail['output_dir']}")
+                elif status == 'cancelled':
+                    self.add_info(f"  已取消: {name}（已完成{detail}个文件）")
+                else:
+                    self.add_info(f"  失败: {name}: {detail}")
+            
+            summary = run_batch(paths, output_dir, options['rows_per_file'], engine=options['engine'],
+                                writer=options['writer'], workers=workers,
+                                status_callback=on_status, cancel_token=options['cancel_token'],
+                                convert_xls=options['convert_xls'], selection=selection,
+                                resume=options['resume'])
+            
+            self.add_info(f"批量拆分完成: 成功{summary['files']}个, 失败{summary['failed']}个, "
+                          f"取消{summary['cancelled']}个, "
+                          f"共{summary['rows']}行, 耗时{summary['elapsed']:.1f}秒, "
+                          f"平均{summary['rows_per_sec']:.0f}行/秒")
+            self.add_info(f"输出目录: {output_dir}")
+            self.call_in_ui(messagebox.showinfo, "完成", f"批量拆分完成！\n成功{summary['files']}个，失败{summary['failed']}个")
+            
+        except Exception as e:
+            error_msg = f"批量拆分失败: {str(e)}"
+            self.add_info(error_msg)
+            self.call_in_ui(messagebox.showerror, "错误", error_msg)
+        
+        finally:
+            self.call_in_ui(self.end_run, options['cancel_token'])
+            self.set_progress(0)
+    
+    def start_merge(self):
+        """选择多个表头相同的文件，按文件名顺序合并为一个文件"""
+        paths = filedialog.askopenfilenames(
+            title="选择要合并的文件（表头需相同）",
+            filetypes=[("Excel文件", "*.xlsx *.xls"), ("CSV文件", "*.csv *.tsv"), ("所有文件", "*.*")]
+        )
+        if not paths:
+            return
+        # 对话框返回的顺序不固定，按文件名中的序号排列
+        paths = sorted(paths, key=natural_key)
+        
+        if not self.output_dir.get():
+            self.output_dir.set(os.path.dirname(paths[0]))
+            self.open_folder_button.config(state='normal')
+        
+        options = self.read_options()
+        if not self.begin_run(options):
+            return
+        thread = threading.Thread(target=self.merge_selected_files, args=(options, paths))
+        thread.daemon = True
+        thread.start()
+    
+    def merge_selected_files(self, options, paths):
+        """合并文件的后台线程，options见read_options"""
+        try:
+            output_dir = options['output_dir']
+            writer = options['writer']
+            self.add_info(f"开始合并{len(paths)}个文件（输出格式: {writer}）...")
+            self.set_progress(0)
+            
+            def on_input(done, total, path, row_count):
+                self.set_progress(done / total * 100)
+                self.add_info(f"  已读取: {os.path.basename(path)} ({row_count}行)")
+            
+            def on_progress(done, total, output_filename, row_count):
+                self.add_info(f"已生成: {output_filename} ({row_count}行)")
+            
+            result = merge_files(paths, output_dir, writer=writer, progress_callback=on_progress,
+                                 input_callback=on_input, cancel_token=options['cancel_token'])
+            
+            self.add_info(f"合并完成！共{result['rows']}行, 耗时{result['elapsed']:.1f}秒, "
+                          f"平均{result['rows_per_sec']:.0f}行/秒")
+            self.add_info(f"输出目录: {output_dir}")
+            self.call_in_ui(messagebox.showinfo, "完成",
+                            f"合并完成！\n{len(paths)}个文件合并为{len(result['files'])}个文件")
+            
+        except SplitCancelled:
+            self.add_info("合并已取消，未完成的文件已删除")
+            self.call_in_ui(messagebox.showinfo, "已取消", "合并已取消")
+        
+        except Exception as e:
+            error_msg = f"合并失败: {str(e)}"
+            self.add_info(error_msg)
+            self.call_in_ui(messagebox.showerror, "错误", error_msg)
         
         finally:
-            self.split_button.config(state='normal')
-            self.progress_var.set(0)
+            self.call_in_ui(self.end_run, options['cancel_token'])
+            self.set_progress(0)
+    
+    def cancel_split(self):
+        """取消进行中的拆分：后台线程和工作进程在下一次检查时停止，并删除写了一半的文件"""
+        if self.cancel_token is not None:
+            self.cancel_token.cancel()
+            self.cancel_button.config(state='disabled')
+            self.add_info("正在取消...")
     
     def open_output_folder(self):
         """打开输出文件夹"""
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Excel文件快速分析
+只读取元数据得到每个工作表的行数和列数，不解析单元格数据：
+- .xlsx: 读取工作表XML开头的<dimension ref>，缺失或明显不可信时退回流式扫描<row>元素
+- .xls: 读取BIFF流中工作表的DIMENSIONS记录，读取失败时退回xlrd的行数
+- .csv/.tsv: 按开头一段的平均行长估算行数，见csv_input.inspect_csv
+结果中的exact标记行数是精确值还是估算值
+"""
+
+import posixpath
+import re
+import struct
+import xml.etree.ElementTree as ET
+import zipfile
+
+from csv_input import inspect_csv, is_csv
+
+
+_NS_MAIN = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+_NS_REL = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+_NS_PKG_REL = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+
+_DIMENSION_RE = re.compile(rb'<(?:\w+:)?dimension\s+ref="([A-Z]+)(\d+)(?::([A-Z]+)(\d+))?"')
+_ROW_RE = re.compile(rb'<(?:\w+:)?row\b([^>]*?)(/?)>')
+_ROW_NUMBER_RE = re.compile(rb'\br="(\d+)"')
+_CELL_REF_RE = re.compile(rb'<(?:\w+:)?c\b[^>]*?\br="([A-Z]+)\d+"')
+_CELL_VALUE_RE = re.compile(rb'<(?:\w+:)?(?:v|is)\b')
+
+# dimension只在工作表XML开头，读取这么多字节足够找到它
+_HEAD_BYTES = 64 * 1024
+_SCAN_BLOCK = 1024 * 1024
+# dimension只有一行，但工作表XML超过这个大小时，认为dimension不可信
+_SUSPICIOUS_PART_SIZE = 16 * 1024
+
+_BIFF_DIMENSIONS = 0x0200
+_BIFF_EOF = 0x000A
+
+
+def column_index(letters):
+    """将列字母转换为从1开始的列号，如 A -> 1, AA -> 27"""
+    index = 0
+    for ch in letters:
+        index = index * 26 + (ord(ch) - 64)
+    return index
+
+
+def list_xlsx_sheet_parts(zf):
+    """按工作簿顺序返回 [(工作表名, 工作表XML在压缩包中的路径), ...]"""
+    workbook = ET.fromstring(zf.read('xl/workbook.xml'))
+    rels = ET.fromstring(zf.read('xl/_rels/workbook.xml.rels'))
+    targets = {rel.get('Id'): rel.get('Target') for rel in rels.iter(f'{_NS_PKG_REL}Relationship')}
+
+    parts = []
+    for sheet in workbook.iter(f'{_NS_MAIN}sheet'):
+        target = targets.get(sheet.get(f'{_NS_REL}id'))
+        if not target:
+            continue
+        if target.startswith('/'):
+            part = target.lstrip('/')
+        else:
+            part = posixpath.normpath(posixpath.join('xl', target))
+        parts.append((sheet.get('name'), part))
+    return parts
+
+
+def _read_dimension(zf, part):
+    """读取工作表XML开头的dimension，返回 (首行, 末行, 首列, 末列) 或None"""
+    with zf.open(part) as f:
+        head = f.read(_HEAD_BYTES)
+    match = _DIMENSION_RE.search(head)
+    if not match:
+        return None
+    first_col, first_row, last_col, last_row = match.groups()
+    if last_col is None:
+        last_col, last_row = first_col, first_row
+    return int(first_row), int(last_row), column_index(first_col.decode()), column_index(last_col.decode())
+
+
+def _scan_xlsx_rows(zf, part):
+    """
+    流式扫描工作表XML中的<row>元素，返回 (首个非空行号, 最后非空行号, 表头列数)
+    不含任何单元格值（<v>或<is>）的行视为空行
+    """
+    first_row = last_row = None
+    header_columns = 0
+    current_row = 0
+    leftover = b''
+    with zf.open(part) as f:
+        while True:
+            block = f.read(_SCAN_BLOCK)
+            data = leftover + block
+            # 只处理到最后一个完整的行（或标签），剩余部分并入下一块
+            if block:
+                cut = data.rfind(b'</row>')
+                cut = cut + len(b'</row>') if cut >= 0 else data.rfind(b'>') + 1
+            else:
+                cut = len(data)
+            leftover = data[cut:]
+            data = data[:cut]
+
+            matches = list(_ROW_RE.finditer(data))
+            for i, match in enumerate(matches):
+                number = _ROW_NUMBER_RE.search(match.group(1))
+                current_row = int(number.group(1)) if number else current_row + 1
+                if match.group(2):
+                    continue
+                end = matches[i + 1].start() if i + 1 < len(matches) else len(data)
+                if not _CELL_VALUE_RE.search(data, match.end(), end):
+                    continue
+                if first_row is None:
+                    # 表头行：用最后一个单元格的列号作为列数
+                    refs = _CELL_REF_RE.findall(data, match.end(), end)
+                    header_columns = column_index(refs[-1].decode()) if refs else 0
+                    first_row = current_row
+                last_row = current_row
+            if not block:
+                break
+    return first_row, last_row, header_columns
+
+
+def _inspect_xlsx_part(zf, part):
+    """分析.xlsx中的一个工作表"""
+    dimension = _read_dimension(zf, part)
+    if dimension is not None:
+        first_row, last_row, first_col, last_col = dimension
+        suspicious = last_row <= first_row and zf.getinfo(part).file_size > _SUSPICIOUS_PART_SIZE
+        if not suspicious:
+            return {
+                'total_rows': max(last_row - first_row, 0),
+                'columns': last_col - first_col + 1,
+                'exact': False,
+            }
+
+    first_row, last_row, columns = _scan_xlsx_rows(zf, part)
+    if first_row is None:
+        return {'total_rows': 0, 'columns': 0, 'exact': True}
+    return {'total_rows': last_row - first_row, 'columns': columns, 'exact': True}
+
+
+def inspect_xlsx(file_path):
+    """分析.xlsx文件的所有工作表，返回每个工作表的信息列表"""
+    with zipfile.ZipFile(file_path) as zf:
+        sheets = []
+        for name, part in list_xlsx_sheet_parts(zf):
+            info = _inspect_xlsx_part(zf, part)
+            info['name'] = name
+            sheets.append(info)
+        return sheets
+
+
+def _read_biff_dimensions(book, sheet_index):
+    """从工作表的BIFF子流中读取DIMENSIONS记录，返回 (首行, 末行+1, 首列, 末列+1) 或None"""
+    data = book.mem
+    pos = book._sh_abs_posn[sheet_index]
+    while pos + 4 <= len(data):
+        code, length = struct.unpack('<HH', data[pos:pos + 4])
+        pos += 4
+        if code == _BIFF_DIMENSIONS:
+            if length >= 14:
+                return struct.unpack('<IIHH', data[pos:pos + 12])
+            # BIFF5及更早版本的行号为16位
+            return struct.unpack('<HHHH', data[pos:pos + 8])
+        if code == _BIFF_EOF:
+            return None
+        pos += length
+    return None
+
+
+def inspect_xls(file_path):
+    """分析.xls文件的所有工作表，返回每个工作表的信息列表"""
+    import xlrd
+
+    book = xlrd.open_workbook(file_path, on_demand=True)
+    try:
+        sheets = []
+        for index, name in enumerate(book.sheet_names()):
+            try:
+                dimensions = _read_biff_dimensions(book, index)
+            except (AttributeError, IndexError, struct.error):
+                dimensions = None
+            if dimensions is not None:
+                first_row, end_row, first_col, end_col = dimensions
+                info = {
+                    'total_rows': max(end_row - first_row - 1, 0),
+                    'columns': end_col - first_col,
+                    'exact': False,
+                }
+            else:
+                sheet = book.sheet_by_index(index)
+                info = {'total_rows': max(sheet.nrows - 1, 0), 'columns': sheet.ncols, 'exact': True}
+                book.unload_sheet(index)
+            info['name'] = name
+            sheets.append(info)
+        return sheets
+    finally:
+        book.release_resources()
+
+
+def inspect_file(file_path):
+    """
+    快速分析Excel文件中各工作表的规模
+    返回 {'path', 'sheets': [{'name', 'total_rows', 'columns', 'exact'}, ...],
+          以及第一个工作表的 'total_rows'(不含表头的数据行数), 'columns', 'exact'(行数是否精确)}
+    """
+    if file_path.lower().endswith('.xls'):
+        sheets = inspect_xls(file_path)
+    elif is_csv(file_path):
+        sheets = inspect_csv(file_path)
+    else:
+        sheets = inspect_xlsx(file_path)
+    first = sheets[0] if sheets else {'total_rows': 0, 'columns': 0, 'exact': True}
+    return {
+        'path': file_path,
+        'sheets': sheets,
+        'total_rows': first['total_rows'],
+        'columns': first['columns'],
+        'exact': first['exact'],
+    }
@@ -6,6 +6,7 @@ Excel文件拆分工具的主入口
 
 import sys
 import os
+import multiprocessing
 
 # 检测是否在PyInstaller打包环境中运行
 def is_frozen():
@@ -31,15 +32,21 @@ else:
     if current_dir not in sys.path:
         sys.path.insert(0, current_dir)
 
-from excel_splitter_gui import main as gui_main
-
 
 def main():
     """Main entry point for the application."""
+    # 带命令行参数时进入命令行模式，不导入tkinter
+    if len(sys.argv) > 1:
+        from cli import main as cli_main
+        sys.exit(cli_main())
+
+    from excel_splitter_gui import main as gui_main
     print("启动Excel文件拆分工具...")
     gui_main()
 
 
 if __name__ == "__main__":
+    # 打包为可执行文件后，进程池的子进程需要通过freeze_support启动
+    multiprocessing.freeze_support()
     main()
 
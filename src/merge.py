@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+合并
+把多个工作簿（如拆分得到的<原文件名>_001.xlsx…，或表头相同的多个文件）按顺序合并为一个文件，
+或每rows_per_file行一个文件：
+- 读取和写出复用拆分引擎的open_rows和写出后端，逐行流式处理，内存占用与输入文件数和总行数无关
+- 每个输入的表头必须与第一个输入一致，写出之前先检查所有输入的表头，只写出一次表头；
+  数据中与表头完全相同的行（如拼接CSV时重复的表头）也会丢弃
+- 后台线程按顺序预读后面的prefetch个输入，每个输入最多缓存PREFETCH_BATCHES批数据行，
+  读取、解压和解析与写出重叠
+- xlsx每个工作表最多1048576行，输出为xlsx时每个文件最多EXCEL_MAX_ROWS行数据，超出后换到下一个文件
+"""
+
+import itertools
+import os
+import queue
+import re
+import threading
+import time
+from collections import deque
+
+from batch import expand_inputs
+from cancel import CANCEL_POLL_SECONDS, SplitCancelled, check_rows
+from profiling import timed_sink
+from split_engine import (commit_partial, open_rows, output_filename_for, partial_path, remove_partial,
+                          writer_for)
+
+
+DEFAULT_OUTPUT_NAME = 'merged'
+DEFAULT_PREFETCH = 2
+# 预读线程每批读取的行数和每个输入最多缓存的批数
+PREFETCH_BATCH_ROWS = 1000
+PREFETCH_BATCHES = 4
+# xlsx工作表的行数上限减去表头
+EXCEL_MAX_ROWS = 1048576 - 1
+
+_DIGITS = re.compile(r'(\d+)')
+
+
+def natural_key(path):
+    """按文件名中的数字大小排序，<名称>_1000.xlsx排在<名称>_999.xlsx之后"""
+    return [int(part) if part.isdigit() else part.lower() for part in _DIGITS.split(os.path.basename(path))]
+
+
+def expand_merge_inputs(patterns):
+    """依次展开每个目录、通配符或文件，同一个目录或通配符中的文件按自然顺序排列，保持参数之间的顺序"""
+    paths = []
+    for pattern in patterns:
+        for path in sorted(expand_inputs(pattern), key=natural_key):
+            if path not in paths:
+                paths.append(path)
+    return paths
+
+
+class _Prefetcher:
+    """在后台线程中读取一个输入，表头和分批的数据行放入有界队列"""
+
+    def __init__(self, path, sheet_name, stop):
+        self.path = path
+        self.sheet_name = sheet_name
+        self.stop = stop
+        self.queue = queue.Queue(maxsize=PREFETCH_BATCHES)
+        # 已从队列中取出的表头
+        self.header = None
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _put(self, item):
+        """放入队列，合并结束（完成、失败或取消）后放弃；返回是否已放入"""
+        while not self.stop.is_set():
+            try:
+                self.queue.put(item, timeout=CANCEL_POLL_SECONDS)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _run(self):
+        rows = None
+        try:
+            header, rows, _ = open_rows(self.path, self.sheet_name)
+            if not self._put(('header', header)):
+                return
+            for batch in iter(lambda: list(itertools.islice(rows, PREFETCH_BATCH_ROWS)), []):
+                if not self._put(('rows', batch)):
+                    return
+            self._put(('end', None))
+        except Exception as e:
+            self._put(('error', e))
+        finally:
+            # 提前结束时关闭生成器，释放打开的工作簿
+            if rows is not None and hasattr(rows, 'close'):
+                rows.close()
+
+    def get(self):
+        return self.queue.get()
+
+
+def _read_header(path, sheet_name):
+    """只读取表头，随即关闭输入"""
+    header, rows, _ = open_rows(path, sheet_name)
+    if hasattr(rows, 'close'):
+        rows.close()
+    return header
+
+
+def _read_inputs(paths, sheet_name, prefetch, stop, wait_times, check_header):
+    """
+    按顺序逐个读取输入，生成 (路径, 表头, 数据行迭代器)；读取当前输入的同时预读后面的prefetch个输入
+    生成第一个输入之前先对每个输入调用check_header(路径, 表头)：
+    正在预读的输入使用预读得到的表头，其余输入只打开读取表头
+    主线程等待预读数据的时间累加到wait_times[0]
+    """
+    pending = deque()
+    remaining = iter(paths)
+
+    def fill(count):
+        while len(pending) < count:
+            path = next(remaining, None)
+            if path is None:
+                return
+            pending.append(_Prefetcher(path, sheet_name, stop))
+
+    def take(prefetcher):
+        started = time.perf_counter()
+        kind, value = prefetcher.get()
+        wait_times[0] += time.perf_counter() - started
+        if kind == 'error':
+            raise value
+        return kind, value
+
+    fill(prefetch + 1)
+    for prefetcher in pending:
+        _, prefetcher.header = take(prefetcher)
+        check_header(prefetcher.path, prefetcher.header)
+    for path in paths[len(pending):]:
+        check_header(path, _read_header(path, sheet_name))
+
+    while True:
+        # 当前输入和之后的prefetch个输入
+        fill(prefetch + 1)
+        if not pending:
+            return
+        prefetcher = pending.popleft()
+        header = prefetcher.header
+        if header is None:
+            _, header = take(prefetcher)
+
+        def data_rows(prefetcher=prefetcher):
+            while True:
+                kind, batch = take(prefetcher)
+                if kind == 'end':
+                    return
+                yield from batch
+
+        yield prefetcher.path, header, data_rows()
+
+
+def merge_files(paths, output_dir, rows_per_file=None, writer=None, sheet_name=None,
+                output_name=DEFAULT_OUTPUT_NAME, prefetch=DEFAULT_PREFETCH, progress_callback=None,
+                input_callback=None, cancel_token=None, stage_times=None):
+    """
+    按顺序合并paths中的文件（各自的sheet_name工作表，None表示第一个工作表）
+    rows_per_file为None时输出<output_name>.xlsx一个文件（xlsx超出行数上限时另有<output_name>_002.xlsx…），
+    否则每rows_per_file行一个文件，文件名为<output_name>_001.xlsx…；扩展名由写出后端决定
+    写出之前先检查所有输入的表头，与第一个输入不一致时抛出ValueError，不写出任何文件
+    progress_callback(已完成文件数, None, 输出文件名, 该文件行数)，与拆分的进度回调相同
+    input_callback(已读完的输入数, 输入总数, 输入路径, 该输入的数据行数)
+    cancel_token和stage_times同Splitter；stage_times中的parse为主线程等待预读数据的时间
+    返回 {'files': [(输出文件名, 行数), ...], 'inputs', 'rows', 'elapsed', 'rows_per_sec'}
+    """
+    if not paths:
+        raise ValueError("没有要合并的文件")
+    started = time.perf_counter()
+    chunk_writer = writer_for(writer, paths[0], sheet_name)
+    limit = rows_per_file
+    if chunk_writer.extension == '.xlsx':
+        limit = min(limit or EXCEL_MAX_ROWS, EXCEL_MAX_ROWS)
+
+    def filename_for(index):
+        if rows_per_file is None and index == 0:
+            return f"{output_name}{chunk_writer.extension}"
+        return output_filename_for(output_name, index, chunk_writer.extension)
+
+    os.makedirs(output_dir, exist_ok=True)
+    first_output = os.path.abspath(os.path.join(output_dir, filename_for(0)))
+    if any(os.path.abspath(path) == first_output for path in paths):
+        raise ValueError(f"输出文件不能是输入文件之一: {first_output}")
+
+    stop = threading.Event()
+    wait_times = [0.0]
+    results = []
+    sink = None
+    output_path = None
+    reference = None
+
+    def check_header(path, header):
+        nonlocal reference
+        if reference is None:
+            reference = header
+        elif [str(name) for name in header] != [str(name) for name in reference]:
+            raise ValueError(f"表头与第一个文件不一致: {path}\n"
+                             f"第一个文件: {list(reference)}\n该文件: {list(header)}")
+
+    def merged_rows():
+        for done, (path, header, rows) in enumerate(_read_inputs(paths, sheet_name, prefetch, stop,
+                                                                  wait_times, check_header), 1):
+            first = header[0] if header else None
+            count = 0
+            for row in rows:
+                # 数据中重复的表头行
+                if row and row[0] == first and list(row) == list(header):
+                    continue
+                count += 1
+                yield row
+            if input_callback:
+                input_callback(done, len(paths), path, count)
+
+    try:
+        for row in check_rows(merged_rows(), cancel_token):
+            if sink is None:
+                output_filename = filename_for(len(results))
+                output_path = os.path.join(output_dir, output_filename)
+                sink = timed_sink(chunk_writer.open(partial_path(output_path), reference), stage_times)
+                sink_rows = 0
+            sink.append(row)
+            sink_rows += 1
+            if limit is not None and sink_rows >= limit:
+                sink.close()
+                commit_partial(output_path, stage_times)
+                sink = None
+                results.append((output_filename, sink_rows))
+                if progress_callback:
+                    progress_callback(len(results), None, output_filename, sink_rows)
+        if sink is None and not results and reference is not None:
+            # 所有输入都只有表头时也输出一个只有表头的文件
+            output_filename = filename_for(0)
+            output_path = os.path.join(output_dir, output_filename)
+            sink = timed_sink(chunk_writer.open(partial_path(output_path), reference), stage_times)
+            sink_rows = 0
+        if sink is not None:
+            sink.close()
+            sink = None
+            commit_partial(output_path, stage_times)
+            results.append((output_filename, sink_rows))
+            if progress_callback:
+                progress_callback(len(results), len(results), output_filename, sink_rows)
+    except BaseException as e:
+        if sink is not None:
+            sink.close()
+            remove_partial(output_path)
+        if isinstance(e, SplitCancelled):
+            raise SplitCancelled(results)
+        raise
+    finally:
+        # 通知预读线程停止
+        stop.set()
+
+    if stage_times is not None:
+        stage_times.add('parse', wait_times[0])
+    elapsed = time.perf_counter() - started
+    rows = sum(row_count for _, row_count in results)
+    return {
+        'files': results,
+        'inputs': len(paths),
+        'rows': rows,
+        'elapsed': elapsed,
+        'rows_per_sec': rows / elapsed if elapsed > 0 else 0,
+    }
@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""
+已解析工作簿缓存
+以 (路径, 文件大小, 修改时间, 工作表) 为键缓存解析得到的DataFrame，
+分析文件和拆分文件、以及使用不同行数重复拆分时都复用同一份解析结果。
+内存占用超过预算时按LRU淘汰；安装了pyarrow时，被淘汰的条目会落盘为Parquet文件，
+再次命中时从本地Parquet读取，避免重新解析Excel。
+
+.xls文件还可以保存一份按列存储的转换结果（save_converted / load_converted），
+以文件路径、大小和修改时间为键，之后拆分同一文件时直接读取，跳过BIFF解析。
+转换结果保存为JSON，日期和时间带类型标记，日期、整数、文本混在同一列中也能原样还原；
+读取时只解析数据，不会执行文件中的任何内容。总大小超过上限时删除最久未使用的转换结果。
+
+落盘的Parquet和转换结果都放在当前用户的缓存目录中（见user_cache_dir），目录权限为0700，
+不放在多个用户共用的临时目录，其他用户无法放入或替换缓存文件。
+落盘的Parquet只在当前进程内有效：每个进程写入各自的子目录，进程退出时删除；
+异常退出留下的子目录在下次落盘时按修改时间清理（见STALE_SPILL_SECONDS）。
+"""
+
+import atexit
+import datetime
+import hashlib
+import importlib.util
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+# 只检查pyarrow是否已安装，不在导入本模块时加载它（导入pyarrow要数百毫秒）
+HAS_PARQUET = importlib.util.find_spec('pyarrow') is not None
+
+
+def user_cache_dir(name):
+    """当前用户的缓存目录：Windows为%LOCALAPPDATA%，macOS为~/Library/Caches，其余为$XDG_CACHE_HOME或~/.cache"""
+    if os.name == 'nt':
+        base = os.environ.get('LOCALAPPDATA') or os.path.expanduser(os.path.join('~', 'AppData', 'Local'))
+    elif sys.platform == 'darwin':
+        base = os.path.expanduser(os.path.join('~', 'Library', 'Caches'))
+    else:
+        base = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser(os.path.join('~', '.cache'))
+    return os.path.join(base, 'excel_splitter', name)
+
+
+DEFAULT_MEMORY_BUDGET = 512 * 1024 * 1024
+DEFAULT_SPILL_DIR = user_cache_dir('spill')
+DEFAULT_CONVERTED_DIR = user_cache_dir('converted')
+# 转换结果的总大小上限，超出后按最后使用时间删除最旧的
+DEFAULT_CONVERTED_BUDGET = 1024 * 1024 * 1024
+CONVERTED_VERSION = 2
+# 落盘目录中超过这么久没有写入的子目录（异常退出的进程留下的）在下次落盘时删除
+STALE_SPILL_SECONDS = 24 * 3600
+
+
+def private_dir(path):
+    """
+    创建（或检查）只有当前用户可以访问的目录并返回path；
+    POSIX上目录属于其他用户时抛出PermissionError，组或其他用户有权限时收回
+    """
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    if os.name == 'posix':
+        stat = os.stat(path)
+        if stat.st_uid != os.getuid():
+            raise PermissionError(f"缓存目录属于其他用户: {path}")
+        if stat.st_mode & 0o077:
+            os.chmod(path, 0o700)
+    return path
+
+
+def _is_private(path):
+    """目录存在且只有当前用户可以访问"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return False
+    if os.name != 'posix':
+        return True
+    return stat.st_uid == os.getuid() and not stat.st_mode & 0o077
+
+
+def cache_key(path, sheet_name=None):
+    """缓存键：文件内容变化（大小或修改时间改变）后自动失效"""
+    stat = os.stat(path)
+    return os.path.abspath(path), stat.st_size, stat.st_mtime_ns, sheet_name
+
+
+def converted_path(path, sheet_name=None, cache_dir=DEFAULT_CONVERTED_DIR):
+    """转换结果的保存路径，文件内容变化后路径随之改变"""
+    name = hashlib.sha1(repr(cache_key(path, sheet_name)).encode('utf-8')).hexdigest()
+    return os.path.join(cache_dir, f"{name}.json")
+
+
+# JSON没有的类型：{标记: ISO格式文本}
+_TYPE_TAGS = (('$datetime', datetime.datetime), ('$date', datetime.date), ('$time', datetime.time))
+_PARSERS = {
+    '$datetime': datetime.datetime.fromisoformat,
+    '$date': datetime.date.fromisoformat,
+    '$time': datetime.time.fromisoformat,
+}
+
+
+def _encode_value(value):
+    for tag, value_type in _TYPE_TAGS:
+        if isinstance(value, value_type):
+            return {tag: value.isoformat()}
+    raise TypeError(f"无法保存的单元格类型: {type(value).__name__}")
+
+
+def _decode_value(obj):
+    if len(obj) == 1:
+        tag, text = next(iter(obj.items()))
+        parser = _PARSERS.get(tag)
+        if parser is not None:
+            return parser(text)
+    return obj
+
+
+def _evict_converted(cache_dir, budget, keep):
+    """总大小超过budget时按最后使用时间从旧到新删除转换结果，keep（刚保存的文件）不删除"""
+    entries = []
+    for entry in os.scandir(cache_dir):
+        if entry.name.endswith('.json') and entry.is_file():
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, entry_path in sorted(entries):
+        if total <= budget:
+            break
+        if entry_path == keep:
+            continue
+        try:
+            os.remove(entry_path)
+        except OSError:
+            continue
+        total -= size
+
+
+def save_converted(path, sheet_name, header, rows, cache_dir=DEFAULT_CONVERTED_DIR,
+                   budget=DEFAULT_CONVERTED_BUDGET):
+    """
+    按列保存工作表的表头和数据行（先写临时文件再重命名），保存失败时忽略
+    保存后转换结果的总大小超过budget时删除最久未使用的
+    """
+    width = max((len(row) for row in rows), default=0)
+    columns = [[] for _ in range(width)]
+    for row in rows:
+        for i in range(width):
+            columns[i].append(row[i] if i < len(row) else None)
+    try:
+        target = converted_path(path, sheet_name, private_dir(cache_dir))
+        with open(f"{target}.tmp", 'w', encoding='utf-8') as f:
+            json.dump({'version': CONVERTED_VERSION, 'header': header, 'rows': len(rows),
+                       'columns': columns}, f, ensure_ascii=False, default=_encode_value)
+        os.replace(f"{target}.tmp", target)
+        _evict_converted(cache_dir, budget, target)
+    except (OSError, TypeError, ValueError):
+        pass
+
+
+def load_converted(path, sheet_name=None, cache_dir=DEFAULT_CONVERTED_DIR):
+    """读取转换结果，返回 (表头, 数据行迭代器, 行数)；没有可用的转换结果时返回None"""
+    if not _is_private(cache_dir):
+        return None
+    target = converted_path(path, sheet_name, cache_dir)
+    try:
+        with open(target, encoding='utf-8') as f:
+            data = json.load(f, object_hook=_decode_value)
+        # 记录最后使用时间，超出总大小上限时先删除最久未使用的
+        os.utime(target)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(data, dict) or data.get('version') != CONVERTED_VERSION:
+        return None
+
+    def rows():
+        columns = data['columns']
+        if not columns:
+            for _ in range(data['rows']):
+                yield ()
+            return
+        for row in zip(*columns):
+            # 补齐时加上的行尾空值去掉，还原为保存前的行
+            end = len(row)
+            while end and row[end - 1] is None:
+                end -= 1
+            yield row[:end]
+
+    return data['header'], rows(), data['rows']
+
+
+def remove_stale_spills(spill_dir, max_age=STALE_SPILL_SECONDS):
+    """删除落盘目录中超过max_age秒没有写入的子目录和旧版本直接放在其中的Parquet文件"""
+    deadline = time.time() - max_age
+    for entry in os.scandir(spill_dir):
+        try:
+            if entry.is_dir(follow_symlinks=False):
+                if entry.stat(follow_symlinks=False).st_mtime < deadline:
+                    shutil.rmtree(entry.path, ignore_errors=True)
+            elif entry.name.endswith('.parquet'):
+                os.remove(entry.path)
+        except OSError:
+            pass
+
+
+class WorkbookCache:
+    """带内存预算和LRU淘汰的DataFrame缓存，线程安全"""
+
+    def __init__(self, memory_budget=DEFAULT_MEMORY_BUDGET, spill_dir=DEFAULT_SPILL_DIR):
+        self.memory_budget = memory_budget
+        # spill_dir为None或未安装pyarrow时，淘汰的条目直接丢弃
+        self.spill_dir = spill_dir if HAS_PARQUET else None
+        self.hits = 0
+        self.spill_hits = 0
+        self.misses = 0
+        self.bytes_held = 0
+        self._entries = OrderedDict()  # key -> (DataFrame, 字节数)
+        self._spilled = {}  # key -> Parquet文件路径
+        self._spill_path = None  # 本进程的落盘子目录，第一次落盘时创建
+        self._loading = {}  # key -> threading.Event，同一文件同时只解析一次
+        self._lock = threading.Lock()
+
+    def peek(self, path, sheet_name=None):
+        """只查询内存中的条目，不计入命中统计，也不触发解析"""
+        key = cache_key(path, sheet_name)
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry[0] if entry else None
+
+    def get(self, path, loader, sheet_name=None):
+        """
+        获取path中工作表sheet_name（None表示第一个工作表）对应的DataFrame；
+        未命中时调用loader(path)解析并放入缓存
+        """
+        key = cache_key(path, sheet_name)
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[0]
+                loading = self._loading.get(key)
+                if loading is None:
+                    self._loading[key] = threading.Event()
+                    spill_path = self._spilled.get(key)
+                    break
+            # 其他线程正在解析同一文件，等待其完成后复用结果
+            loading.wait()
+
+        try:
+            if spill_path and os.path.exists(spill_path):
+                import pandas as pd
+                df = pd.read_parquet(spill_path)
+                with self._lock:
+                    self.spill_hits += 1
+            else:
+                df = loader(path)
+                with self._lock:
+                    self.misses += 1
+            self._put(key, df)
+            return df
+        finally:
+            with self._lock:
+                self._loading.pop(key).set()
+
+    def _put(self, key, df):
+        size = int(df.memory_usage(deep=True).sum())
+        evicted = []
+        with self._lock:
+            # 同一路径的旧版本（大小或修改时间不同）已经失效
+            for old_key in [k for k in self._entries if k[0] == key[0] and k[1:3] != key[1:3]]:
+                self.bytes_held -= self._entries.pop(old_key)[1]
+            self._entries[key] = (df, size)
+            self.bytes_held += size
+            while self.bytes_held > self.memory_budget and self._entries:
+                old_key, (old_df, old_size) = self._entries.popitem(last=False)
+                self.bytes_held -= old_size
+                evicted.append((old_key, old_df))
+        for old_key, old_df in evicted:
+            self._spill(old_key, old_df)
+
+    def _spill(self, key, df):
+        """将淘汰的条目写入本地Parquet文件"""
+        if not self.spill_dir or key in self._spilled:
+            return
+        try:
+            name = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+            spill_path = os.path.join(self._spill_dir(), f"{name}.parquet")
+            df.to_parquet(spill_path, index=False)
+        except Exception:
+            # 写入失败（如包含混合类型的列）时放弃落盘
+            return
+        with self._lock:
+            self._spilled[key] = spill_path
+
+    def _spill_dir(self):
+        """本进程的落盘子目录；第一次调用时清理过期的子目录，并在进程退出时删除本进程的子目录"""
+        with self._lock:
+            # 长时间没有落盘时子目录可能已被其他进程当作过期目录删除，重新创建
+            if self._spill_path is None or not os.path.isdir(self._spill_path):
+                root = private_dir(self.spill_dir)
+                remove_stale_spills(root)
+                if self._spill_path is None:
+                    atexit.register(self.clear)
+                self._spill_path = tempfile.mkdtemp(prefix=f"{os.getpid()}-", dir=root)
+            return self._spill_path
+
+    def clear(self):
+        """清空内存条目并删除本进程的落盘子目录，进程退出时自动调用"""
+        with self._lock:
+            self._entries.clear()
+            self.bytes_held = 0
+            self._spilled.clear()
+            spill_path, self._spill_path = self._spill_path, None
+        if spill_path is not None:
+            atexit.unregister(self.clear)
+            shutil.rmtree(spill_path, ignore_errors=True)
+
+    def stats(self):
+        """返回缓存统计信息"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'spill_hits': self.spill_hits,
+                'misses': self.misses,
+                'entries': len(self._entries),
+                'spilled': len(self._spilled),
+                'bytes_held': self.bytes_held,
+            }
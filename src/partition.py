@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+按列值拆分
+只读取一遍输入，把每一行按指定列的值分发到对应的输出文件（每个值一个文件）。
+同时打开的写入器数量有上限：
+- 前max_open_writers个值直接写入最终输出文件
+- 之后出现的值先追加到临时溢出文件，溢出文件的句柄按LRU关闭和重新打开（追加模式），
+  读取结束后再逐个把溢出文件转换为最终输出
+因此即使有成千上万个不同的值，也只需一遍读取，内存和打开的文件数都有上限
+"""
+
+import os
+import pickle
+import shutil
+import tempfile
+from collections import OrderedDict
+from pathlib import Path
+
+from cancel import SplitCancelled, check_rows
+from profiling import timed, timed_rows, timed_sink
+from row_filter import resolve_column
+from split_engine import (_INVALID_FILENAME_CHARS, _write_rows_chunk, commit_partial, open_rows,
+                          partial_path, remove_partial, writer_for)
+
+
+DEFAULT_MAX_OPEN_WRITERS = 64
+# 读取阶段每读取这么多行回调一次进度
+PROGRESS_INTERVAL = 10000
+EMPTY_KEY_NAME = '空值'
+
+
+class _SpillFiles:
+    """溢出文件：每个值一个追加写入的pickle流，打开的句柄数不超过上限，按LRU关闭"""
+
+    def __init__(self, spill_dir, max_open):
+        self.spill_dir = spill_dir
+        self.max_open = max_open
+        self.paths = OrderedDict()  # key -> 溢出文件路径，按首次出现的顺序
+        self.handles = OrderedDict()  # key -> 打开的文件，按最近使用排序
+
+    def append(self, key, row):
+        handle = self.handles.get(key)
+        if handle is None:
+            if len(self.handles) >= self.max_open:
+                _, oldest = self.handles.popitem(last=False)
+                oldest.close()
+            path = self.paths.get(key)
+            if path is None:
+                path = self.paths[key] = os.path.join(self.spill_dir, f"{len(self.paths)}.spill")
+            handle = self.handles[key] = open(path, 'ab')
+        else:
+            self.handles.move_to_end(key)
+        pickle.dump(row, handle, pickle.HIGHEST_PROTOCOL)
+
+    def close(self):
+        for handle in self.handles.values():
+            handle.close()
+        self.handles.clear()
+
+    @staticmethod
+    def read(path):
+        with open(path, 'rb') as f:
+            while True:
+                try:
+                    yield pickle.load(f)
+                except EOFError:
+                    return
+
+
+def partition_file(input_file, output_dir, column, writer=None, sheet_name=None,
+                   max_open_writers=DEFAULT_MAX_OPEN_WRITERS, progress_callback=None, cache=None,
+                   cancel_token=None, convert_xls=False, stage_times=None, selection=None):
+    """
+    按column列的值拆分文件，每个值输出一个文件：<原文件名>[_<工作表名>]_<值>
+    progress_callback签名与按行数拆分相同：(done, total, output_filename, row_count)
+    - 读取阶段: (已读取行数, 预估总行数或None, None, None)
+    - 每个输出文件完成后: (已完成文件数, 文件总数, 输出文件名, 行数)
+    输出先写入临时文件，完成后才重命名；cancel_token被取消时删除未完成的输出，
+    抛出SplitCancelled，其files为已完成的文件
+    stage_times（profiling.StageTimes）不为None时记录各阶段耗时，写入溢出文件计入序列化
+    selection（row_filter.RowSelection）只输出保留的列和满足条件的行，column按保留后的列查找
+    返回 [(输出文件名, 行数), ...]，按值首次出现的顺序
+    """
+    if max_open_writers <= 0:
+        raise ValueError("同时打开的写入器数量必须大于0")
+
+    with timed(stage_times, 'open'):
+        header, rows, estimated_rows = open_rows(input_file, sheet_name, cache, convert_xls, selection)
+        chunk_writer = writer_for(writer, input_file, sheet_name, selection)
+    rows = timed_rows(check_rows(rows, cancel_token), stage_times)
+    key_index = resolve_column(header, column)
+
+    stem = Path(input_file).stem
+    if sheet_name is not None:
+        stem = f"{stem}_{_INVALID_FILENAME_CHARS.sub('_', sheet_name)}"
+
+    os.makedirs(output_dir, exist_ok=True)
+
+    filenames = OrderedDict()  # key -> 输出文件名
+    used_names = set()
+    counts = {}
+    sinks = {}  # 直接写入最终文件（的临时文件）的写入器
+    completed = []
+    spill_dir = tempfile.mkdtemp(prefix='excel_partition_')
+    spills = _SpillFiles(spill_dir, max_open_writers)
+
+    def filename_for(key):
+        name = EMPTY_KEY_NAME if key is None or key == '' else _INVALID_FILENAME_CHARS.sub('_', str(key))
+        # 不同的值清理后可能同名（Windows下文件名不区分大小写），追加序号区分
+        candidate = f"{stem}_{name}{chunk_writer.extension}"
+        suffix = 2
+        while candidate.lower() in used_names:
+            candidate = f"{stem}_{name}_{suffix}{chunk_writer.extension}"
+            suffix += 1
+        used_names.add(candidate.lower())
+        return candidate
+
+    try:
+        rows_read = 0
+        for row in rows:
+            key = row[key_index] if key_index < len(row) else None
+            if key not in filenames:
+                filenames[key] = filename_for(key)
+                counts[key] = 0
+                if len(sinks) < max_open_writers:
+                    output_path = os.path.join(output_dir, filenames[key])
+                    sink = chunk_writer.open(partial_path(output_path), header)
+                    sinks[key] = timed_sink(sink, stage_times)
+            sink = sinks.get(key)
+            if sink is not None:
+                sink.append(row)
+            elif stage_times is None:
+                spills.append(key, row)
+            else:
+                with stage_times.timed('serialize'):
+                    spills.append(key, row)
+            counts[key] += 1
+
+            rows_read += 1
+            if progress_callback and rows_read % PROGRESS_INTERVAL == 0:
+                progress_callback(rows_read, estimated_rows, None, None)
+
+        for key, sink in list(sinks.items()):
+            sink.close()
+            del sinks[key]
+            output_path = os.path.join(output_dir, filenames[key])
+            commit_partial(output_path, stage_times)
+            completed.append((filenames[key], counts[key]))
+            if progress_callback:
+                progress_callback(len(completed), len(filenames), filenames[key], counts[key])
+        spills.close()
+
+        # 把溢出文件逐个转换为最终输出，同一时刻只打开一个写入器
+        for key, spill_path in spills.paths.items():
+            output_path = os.path.join(output_dir, filenames[key])
+            timings = _write_rows_chunk(chunk_writer, output_path, header, _SpillFiles.read(spill_path),
+                                        cancel_token)
+            if stage_times is not None:
+                stage_times.merge(timings)
+            os.remove(spill_path)
+            completed.append((filenames[key], counts[key]))
+            if progress_callback:
+                progress_callback(len(completed), len(filenames), filenames[key], counts[key])
+    except SplitCancelled:
+        raise SplitCancelled(completed)
+    finally:
+        # 取消或失败时丢弃尚未完成的输出
+        for key, sink in sinks.items():
+            sink.close()
+            remove_partial(os.path.join(output_dir, filenames[key]))
+        spills.close()
+        shutil.rmtree(spill_dir, ignore_errors=True)
+
+    return [(filenames[key], counts[key]) for key in filenames]
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+性能分析
+拆分时可选地记录各阶段的耗时，拆分结束后汇总为报告（可保存为JSON）：
+- open: 打开输入文件并读取表头
+- parse: 逐行读取和解析单元格（pandas引擎为整表读取）
+- slice: pandas引擎按行切片并转换为数据行
+- serialize: 写出后端把数据行序列化为输出格式
+- write: 完成输出文件（压缩、写入磁盘）
+- fsync: 把输出文件刷到磁盘，再从临时文件名重命名为最终文件名
+- checkpoint: 记录检查点（写清单并fsync，续拆时还计算校验和）
+进程池中写出的分块在工作进程中计时，结果汇总到主进程，因此各阶段之和可能超过总耗时。
+另外可以用cProfile记录整个拆分过程，保存为pstats文件。
+"""
+
+import json
+import sys
+import time
+from contextlib import contextmanager, nullcontext
+
+
+STAGES = ('open', 'parse', 'slice', 'serialize', 'write', 'fsync', 'checkpoint')
+STAGE_LABELS = {
+    'open': '打开文件',
+    'parse': '读取解析',
+    'slice': '切片转换',
+    'serialize': '序列化',
+    'write': '写入磁盘',
+    'fsync': '刷盘',
+    'checkpoint': '检查点',
+}
+
+
+def peak_rss_bytes(children=False):
+    """
+    当前进程的峰值RSS（字节），无法获取时返回None
+    children为True时返回已结束的子进程（如进程池的工作进程）中最大的峰值RSS
+    """
+    try:
+        import resource
+    except ImportError:
+        # Windows没有resource模块，安装了psutil时使用峰值工作集
+        if children:
+            return None
+        try:
+            import psutil
+            return psutil.Process().memory_info().peak_wset
+        except (ImportError, AttributeError):
+            return None
+    who = resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF
+    peak = resource.getrusage(who).ru_maxrss
+    # Linux下单位为KB，macOS下为字节
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class StageTimes:
+    """各阶段累计耗时（秒）"""
+
+    def __init__(self):
+        self.seconds = dict.fromkeys(STAGES, 0.0)
+
+    def add(self, stage, seconds):
+        self.seconds[stage] = self.seconds.get(stage, 0.0) + seconds
+
+    def merge(self, timings):
+        """合并工作进程返回的 {阶段: 秒}；timings为None时忽略"""
+        for stage, seconds in (timings or {}).items():
+            self.add(stage, seconds)
+
+    @contextmanager
+    def timed(self, stage):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - started)
+
+
+def timed(stage_times, stage):
+    """stage_times不为None时把代码块的耗时计入stage，否则什么也不做"""
+    return nullcontext() if stage_times is None else stage_times.timed(stage)
+
+
+def timed_rows(rows, stage_times, stage='parse'):
+    """包装行迭代器，把取下一行所用的时间计入stage；stage_times为None时原样返回"""
+    if stage_times is None:
+        return rows
+
+    def generate():
+        clock = time.perf_counter
+        spent = 0.0
+        iterator = iter(rows)
+        try:
+            while True:
+                started = clock()
+                try:
+                    row = next(iterator)
+                except StopIteration:
+                    return
+                finally:
+                    spent += clock() - started
+                yield row
+        finally:
+            stage_times.add(stage, spent)
+
+    return generate()
+
+
+class _TimedSink:
+    """包装写入器：append计入序列化，close计入写入磁盘"""
+
+    def __init__(self, sink, stage_times):
+        self.sink = sink
+        self.stage_times = stage_times
+        self.serialize = 0.0
+
+    def append(self, row):
+        started = time.perf_counter()
+        self.sink.append(row)
+        self.serialize += time.perf_counter() - started
+
+    def close(self):
+        self.stage_times.add('serialize', self.serialize)
+        self.serialize = 0.0
+        with self.stage_times.timed('write'):
+            self.sink.close()
+
+
+def timed_sink(sink, stage_times):
+    """stage_times不为None时为写入器计时，否则原样返回"""
+    return sink if stage_times is None else _TimedSink(sink, stage_times)
+
+
+@contextmanager
+def cprofile_to(path):
+    """path不为None时用cProfile记录代码块，结束（包括取消或失败）后保存为pstats文件"""
+    if path is None:
+        yield
+        return
+    import cProfile
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
+
+
+def build_report(stage_times, result, **context):
+    """汇总一次拆分的性能报告；context为引擎、输出格式等附加信息"""
+    report = dict(context)
+    report.update({
+        'rows': result['rows'],
+        'files': len(result['files']),
+        'elapsed': round(result['elapsed'], 4),
+        'rows_per_sec': round(result['rows_per_sec'], 1),
+        'stages': {stage: round(seconds, 4) for stage, seconds in stage_times.seconds.items()},
+        'peak_rss_bytes': peak_rss_bytes(),
+        'peak_rss_children_bytes': peak_rss_bytes(children=True),
+    })
+    return report
+
+
+def format_report(report):
+    """把性能报告格式化为几行文字，用于信息区域和命令行"""
+    lines = [f"性能分析: 共{report['rows']}行, 耗时{report['elapsed']:.2f}秒, "
+             f"{report['rows_per_sec']:.0f}行/秒"]
+    elapsed = report['elapsed'] or 1
+    for stage, seconds in report['stages'].items():
+        if seconds:
+            lines.append(f"  {STAGE_LABELS.get(stage, stage)}: {seconds:.3f}秒 ({seconds / elapsed:.0%})")
+    memory = [f"主进程 {report['peak_rss_bytes'] / (1024 * 1024):.0f}MB"] if report['peak_rss_bytes'] else []
+    if report['peak_rss_children_bytes']:
+        memory.append(f"工作进程 {report['peak_rss_children_bytes'] / (1024 * 1024):.0f}MB")
+    if memory:
+        lines.append(f"  峰值内存: {', '.join(memory)}")
+    return lines
+
+
+def save_report(path, report):
+    """把性能报告保存为JSON"""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+列选择与行筛选
+拆分时只保留指定的列和满足条件的行，条件在读取时逐行判断，不先读入整个工作表：
+- 列: 列名或从1开始的列号，按指定的顺序输出
+- 条件: 列=值（等于）、列=值1,值2（其中之一）、列=下限..上限（闭区间，任一端可以省略）
+  值按单元格的类型比较：100匹配数字100、100.0和文本"100"，2024-01-01匹配日期，true/false匹配布尔值；
+  区间的两端都是数字时只匹配数字，都是日期时只匹配日期，否则按文本比较；
+  日期时间比较时忽略时区（条件和单元格的值都去掉时区）
+读取时只转换需要的列（保留的列和条件用到的列）：.xlsx跳过其余单元格的共享字符串查找、数字和日期转换，
+.xls和CSV同样只转换需要的列，见split_engine.open_rows
+"""
+
+import datetime
+
+
+def resolve_column(header, column):
+    """按列名查找列序号；找不到列名时，整数或数字字符串视为从1开始的列号（按列值拆分也用它查找拆分列）"""
+    for index, name in enumerate(header):
+        if str(name) == str(column):
+            return index
+    if isinstance(column, int) or str(column).isdigit():
+        index = int(column) - 1
+        if 0 <= index < len(header):
+            return index
+    raise ValueError(f"找不到列: {column}")
+
+
+def _parse_number(text):
+    try:
+        return int(text)
+    except ValueError:
+        pass
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+def _parse_datetime(text):
+    """解析ISO格式的日期时间；带时区时去掉时区，与单元格的值（比较前同样去掉时区）一致"""
+    try:
+        return datetime.datetime.fromisoformat(text).replace(tzinfo=None)
+    except ValueError:
+        return None
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+class RowFilter:
+    """一个筛选条件：等于、其中之一或区间"""
+
+    def __init__(self, column, values=None, low=None, high=None):
+        self.column = column
+        # 等于和其中之一：原文列表；区间：low/high为原文，None表示不限
+        self.values = values
+        self.low = low
+        self.high = high
+        self.index = None
+        if values is not None:
+            self._compile_values()
+        else:
+            self._compile_range()
+
+    def _compile_values(self):
+        # 值可能匹配的各种类型，判断时只需一次集合查找；
+        # 布尔值单独存放：True == 1，放在同一个集合中时1会匹配True，true会匹配1和1.0
+        forms = set()
+        bool_forms = set()
+        for text in self.values:
+            forms.add(text)
+            if text.lower() in ('true', 'false'):
+                bool_forms.add(text.lower() == 'true')
+            number = _parse_number(text)
+            if number is not None:
+                forms.add(number)
+            moment = _parse_datetime(text)
+            if moment is not None:
+                forms.add(moment)
+                if moment.time() == datetime.time():
+                    forms.add(moment.date())
+        self.forms = frozenset(forms)
+        self.bool_forms = frozenset(bool_forms)
+
+    def _compile_range(self):
+        ends = [text for text in (self.low, self.high) if text is not None]
+        if not ends:
+            raise ValueError(f"筛选区间至少需要一端: {self.column}")
+        if all(_parse_number(text) is not None for text in ends):
+            self.kind = 'number'
+            convert = _parse_number
+        elif all(_parse_datetime(text) is not None for text in ends):
+            self.kind = 'datetime'
+            convert = _parse_datetime
+        else:
+            self.kind = 'text'
+            convert = str
+        self.bounds = (None if self.low is None else convert(self.low),
+                       None if self.high is None else convert(self.high))
+
+    def matches(self, value):
+        if self.values is not None:
+            return self._matches_value(value)
+        return self._matches_range(value)
+
+    def _matches_value(self, value):
+        if isinstance(value, bool):
+            return value in self.bool_forms
+        if isinstance(value, datetime.datetime):
+            value = value.replace(tzinfo=None)
+        try:
+            return value in self.forms
+        except TypeError:
+            return False
+
+    def _matches_range(self, value):
+        if value is None:
+            return False
+        if self.kind == 'number':
+            if not _is_number(value):
+                return False
+        elif self.kind == 'datetime':
+            if isinstance(value, datetime.datetime):
+                value = value.replace(tzinfo=None)
+            elif isinstance(value, datetime.date):
+                value = datetime.datetime.combine(value, datetime.time())
+            else:
+                return False
+        else:
+            value = str(value)
+        low, high = self.bounds
+        return (low is None or value >= low) and (high is None or value <= high)
+
+    def describe(self):
+        if self.values is not None:
+            return f"{self.column}={','.join(self.values)}"
+        return f"{self.column}={self.low or ''}..{self.high or ''}"
+
+
+def parse_filter(text):
+    """解析“列=值”、“列=值1,值2”或“列=下限..上限”"""
+    column, sep, value = text.partition('=')
+    column, value = column.strip(), value.strip()
+    if not sep or not column:
+        raise ValueError(f"筛选条件格式应为 列=值、列=值1,值2 或 列=下限..上限: {text}")
+    if '..' in value:
+        low, _, high = value.partition('..')
+        return RowFilter(column, low=low.strip() or None, high=high.strip() or None)
+    return RowFilter(column, values=[item.strip() for item in value.split(',')])
+
+
+class RowSelection:
+    """
+    要保留的列和行
+    bind(表头)之后：header为输出的表头，indexes为输出各列在输入中的序号，
+    needed为读取时需要转换的列序号（保留的列和条件用到的列）
+    """
+
+    def __init__(self, columns=None, filters=()):
+        # 列名或从1开始的列号，None表示保留所有列
+        self.columns = list(columns) if columns else None
+        self.filters = list(filters)
+        self.header = None
+        self.indexes = None
+        self.needed = None
+
+    def bind(self, header):
+        """按输入的表头解析列名，返回self"""
+        if self.columns is None:
+            self.indexes = list(range(len(header)))
+        else:
+            self.indexes = [resolve_column(header, column) for column in self.columns]
+        for row_filter in self.filters:
+            row_filter.index = resolve_column(header, row_filter.column)
+        self.needed = frozenset(self.indexes) | {row_filter.index for row_filter in self.filters}
+        self.header = [header[index] for index in self.indexes]
+        return self
+
+    def pick(self, values):
+        """values为 {列序号: 值}（至少包含needed中有值的列）；不满足条件时返回None，否则返回保留的列"""
+        for row_filter in self.filters:
+            if not row_filter.matches(values.get(row_filter.index)):
+                return None
+        return tuple(values.get(index) for index in self.indexes)
+
+    def apply(self, rows):
+        """筛选已经完整转换的数据行（缓存的DataFrame、.xls转换结果等）"""
+        for row in rows:
+            width = len(row)
+            if all(row_filter.matches(row[row_filter.index] if row_filter.index < width else None)
+                   for row_filter in self.filters):
+                yield tuple(row[index] if index < width else None for index in self.indexes)
+
+    def apply_frame(self, df):
+        """筛选DataFrame（pandas引擎），返回新的DataFrame"""
+        self.bind(list(df.columns))
+        if self.filters:
+            mask = None
+            for row_filter in self.filters:
+                column = df.iloc[:, row_filter.index].astype(object)
+                matched = column.where(column.notna(), None).map(row_filter.matches).astype(bool)
+                mask = matched if mask is None else mask & matched
+            df = df[mask.to_numpy()]
+        return df.iloc[:, self.indexes]
+
+    def select(self, values):
+        """按输出的列重新排列按输入列排列的列表（如各列的数字格式），None原样返回"""
+        if values is None:
+            return None
+        return [values[index] if index < len(values) else None for index in self.indexes]
+
+    def describe(self):
+        """用于检查点：参数变化后旧的清单不再有效"""
+        return {'columns': self.columns, 'filters': [row_filter.describe() for row_filter in self.filters]}
+
+
+def parse_selection(columns=None, filters=()):
+    """
+    由界面或命令行的输入创建RowSelection：columns为逗号分隔的列名或列号，filters为筛选条件列表
+    两者都为空时返回None
+    """
+    names = [name.strip() for name in (columns or '').split(',') if name.strip()]
+    parsed = [parse_filter(text) for text in filters if text and text.strip()]
+    if not names and not parsed:
+        return None
+    return RowSelection(names or None, parsed)
@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+"""
+模板输出
+从输入工作表读取一次表头样式、数据列样式、列宽、表头行高和冻结窗格，
+预先编译为一个xlsx骨架：除工作表数据外的所有部件（样式表、工作簿、关系等）都已序列化好，
+工作表XML只差<sheetData>中的数据行。写出每个分块时原样写入这些部件，
+再把表头和数据行直接拼成XML流式写入，不再为每个文件创建工作簿、重建样式和列宽。
+字符串以内联字符串写出，不需要共享字符串表；以“=”开头的文本也按文本写出，不作为公式。
+骨架可以pickle，进程池中的工作进程直接使用主进程编译好的骨架。
+"""
+
+import datetime
+import io
+import itertools
+import math
+import re
+import zipfile
+from xml.etree.ElementTree import iterparse
+from xml.sax.saxutils import escape
+
+# 读取数据列样式时检查的数据行数，与split_engine.FORMAT_SAMPLE_ROWS一致
+SAMPLE_ROWS = 20
+
+# 没有列格式时日期和时间使用的数字格式，与openpyxl的默认格式一致
+DEFAULT_DATETIME_FORMAT = 'yyyy-mm-dd h:mm:ss'
+DEFAULT_DATE_FORMAT = 'yyyy-mm-dd'
+DEFAULT_TIME_FORMAT = 'h:mm:ss'
+
+SHEET_PART = 'xl/worksheets/sheet1.xml'
+
+# 每攒够这么多行编码一次写入压缩流
+_FLUSH_ROWS = 1000
+
+# XML 1.0不允许的控制字符，openpyxl写出时也会拒绝
+_ILLEGAL_XML_CHARS = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+class SheetStyle:
+    """从输入工作表读取的外观，只包含能在分块中复用的部分"""
+
+    def __init__(self):
+        # 按列排列的表头单元格样式，None表示默认样式
+        self.header_styles = []
+        # 按列排列的数据单元格样式
+        self.data_styles = []
+        # {列号(从0开始): (列宽, 是否隐藏)}
+        self.columns = {}
+        self.header_height = None
+        # 冻结的 (行数, 列数)，行数从表头所在行算起
+        self.freeze = None
+
+    def select(self, indexes):
+        """只保留indexes（输入中的列序号，按输出顺序）对应的列，返回新的SheetStyle"""
+        def pick(styles):
+            return [styles[index] if index < len(styles) else None for index in indexes]
+
+        selected = SheetStyle()
+        selected.header_styles = pick(self.header_styles)
+        selected.data_styles = pick(self.data_styles)
+        selected.columns = {column: self.columns[index] for column, index in enumerate(indexes)
+                            if index in self.columns}
+        selected.header_height = self.header_height
+        if self.freeze is not None:
+            rows, columns = self.freeze
+            # 冻结的列只保留输出开头连续来自原冻结区域的列
+            kept = len(list(itertools.takewhile(lambda index: index < columns, indexes)))
+            selected.freeze = (rows, kept) if rows or kept else None
+        return selected
+
+
+def _cell_style(cell):
+    """单元格的样式，默认样式返回None"""
+    if not getattr(cell, 'has_style', False):
+        return None
+    return {
+        'font': cell.font,
+        'fill': cell.fill,
+        'border': cell.border,
+        'alignment': cell.alignment,
+        'protection': cell.protection,
+        'number_format': cell.number_format,
+    }
+
+
+def _local_name(tag):
+    return tag.rsplit('}', 1)[-1]
+
+
+def _read_layout(sheet, style, header_row):
+    """只解析工作表XML中<sheetData>之前的部分和表头行，读取列宽、冻结窗格和表头行高"""
+    with sheet._get_source() as source:
+        for event, element in iterparse(source, events=('start', 'end')):
+            name = _local_name(element.tag)
+            if event == 'start':
+                if name != 'row':
+                    continue
+                row_number = int(element.get('r', 0))
+                if row_number > header_row:
+                    break
+                if row_number == header_row and element.get('customHeight') in ('1', 'true'):
+                    style.header_height = float(element.get('ht'))
+            elif name == 'col' and element.get('width') is not None:
+                hidden = element.get('hidden') in ('1', 'true')
+                for column in range(int(element.get('min')), int(element.get('max')) + 1):
+                    style.columns[column - 1] = (float(element.get('width')), hidden)
+            elif name == 'pane' and element.get('state') in ('frozen', 'frozenSplit'):
+                rows = int(float(element.get('ySplit', 0))) - (header_row - 1)
+                columns = int(float(element.get('xSplit', 0)))
+                if rows > 0 or columns > 0:
+                    style.freeze = (max(rows, 0), columns)
+            elif name == 'sheetData':
+                break
+
+
+def read_sheet_style(input_file, sheet_name=None, sample_rows=SAMPLE_ROWS):
+    """
+    读取.xlsx工作表的表头样式、数据列样式、列宽、表头行高和冻结窗格，不是.xlsx时返回None
+    表头为第一个非空行（与split_engine.iter_sheet_rows一致）；
+    数据列样式取表头之后前sample_rows行中每列第一个有值的单元格，
+    数字格式取其中第一个非常规格式（与split_engine.read_number_formats一致）
+    """
+    if not input_file.lower().endswith('.xlsx'):
+        return None
+    from openpyxl import load_workbook
+
+    style = SheetStyle()
+    workbook = load_workbook(input_file, read_only=True)
+    try:
+        sheet = workbook.worksheets[0] if sheet_name is None else workbook[sheet_name]
+        header_row = None
+        data_styles = {}
+        for row_number, row in enumerate(sheet.iter_rows(), 1):
+            if header_row is None:
+                if any(cell.value is not None for cell in row):
+                    header_row = row_number
+                    style.header_styles = [_cell_style(cell) for cell in row]
+                continue
+            for column, cell in enumerate(row):
+                if cell.value is None:
+                    continue
+                if column not in data_styles:
+                    data_styles[column] = _cell_style(cell)
+                current = data_styles[column]
+                if cell.number_format != 'General' and (current is None or current['number_format'] == 'General'):
+                    data_styles[column] = dict(current or _cell_style(cell) or {}, number_format=cell.number_format)
+            sample_rows -= 1
+            if sample_rows <= 0:
+                break
+        if data_styles:
+            style.data_styles = [data_styles.get(column) for column in range(max(data_styles) + 1)]
+        if header_row is not None:
+            _read_layout(sheet, style, header_row)
+    finally:
+        workbook.close()
+    return style
+
+
+class SheetTemplate:
+    """编译好的xlsx骨架"""
+
+    def __init__(self, parts, sheet_head, sheet_tail, header_styles, header_height, data_styles, date_styles):
+        # [(部件名, 内容bytes), ...]，不含工作表
+        self.parts = parts
+        # 工作表XML在数据行之前和之后的部分
+        self.sheet_head = sheet_head
+        self.sheet_tail = sheet_tail
+        # 按列排列的样式编号，0为默认样式
+        self.header_styles = header_styles
+        self.header_height = header_height
+        self.data_styles = data_styles
+        # {(列号, 值类型): 样式编号}，日期和时间使用的样式；列号-1用于超出data_styles的列
+        self.date_styles = date_styles
+
+
+def _apply_style(cell, style):
+    for name, value in style.items():
+        setattr(cell, name, value)
+
+
+def compile_template(style=None, formats=None):
+    """
+    把读取到的外观编译为SheetTemplate；style为None时（如.xls和CSV输入）只使用formats
+    formats为各列的数字格式（见split_engine.read_number_formats），style中已有数据列样式时忽略
+    """
+    from openpyxl import Workbook
+    from openpyxl.utils import get_column_letter
+
+    style = style or SheetStyle()
+    data_styles = style.data_styles
+    if not data_styles and formats:
+        data_styles = [None if number_format is None else {'number_format': number_format}
+                       for number_format in formats]
+
+    workbook = Workbook()
+    sheet = workbook.active
+    # 与其他写出后端的工作表名保持一致
+    sheet.title = 'Sheet1'
+    for column, (width, hidden) in style.columns.items():
+        dimension = sheet.column_dimensions[get_column_letter(column + 1)]
+        dimension.width = width
+        dimension.hidden = hidden
+    if style.freeze:
+        rows, columns = style.freeze
+        sheet.freeze_panes = f"{get_column_letter(columns + 1)}{rows + 1}"
+
+    # 在临时工作表中登记样式，得到样式表中的编号后删除，骨架的工作表中不留单元格
+    probe = workbook.create_sheet('probe')
+    probe_rows = itertools.count(1)
+
+    def style_id(cell_style):
+        if not cell_style:
+            return 0
+        cell = probe.cell(row=next(probe_rows), column=1)
+        _apply_style(cell, cell_style)
+        return cell.style_id
+
+    header_ids = [style_id(cell_style) for cell_style in style.header_styles]
+    data_ids = [style_id(cell_style) for cell_style in data_styles]
+    # 列格式为常规时日期和时间使用默认格式（保留列的其他样式），否则沿用列样式
+    date_styles = {}
+    for column in range(-1, len(data_styles)):
+        cell_style = data_styles[column] if column >= 0 else None
+        for kind, number_format in ((datetime.datetime, DEFAULT_DATETIME_FORMAT),
+                                    (datetime.date, DEFAULT_DATE_FORMAT),
+                                    (datetime.time, DEFAULT_TIME_FORMAT)):
+            if cell_style and cell_style.get('number_format', 'General') != 'General':
+                date_styles[column, kind] = data_ids[column]
+            else:
+                date_styles[column, kind] = style_id(dict(cell_style or {}, number_format=number_format))
+    workbook.remove(probe)
+
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    parts = []
+    with zipfile.ZipFile(buffer) as package:
+        for name in package.namelist():
+            if name == SHEET_PART:
+                sheet_xml = package.read(name).decode('utf-8')
+            else:
+                parts.append((name, package.read(name)))
+    # 数据行数每个分块不同，去掉dimension（可选元素）
+    sheet_xml = re.sub(r'<dimension [^>]*/>', '', sheet_xml)
+    sheet_xml = re.sub(r'<sheetData\s*/>', '<sheetData></sheetData>', sheet_xml)
+    head, tail = sheet_xml.split('</sheetData>', 1)
+    return SheetTemplate(parts, head.encode('utf-8'), ('</sheetData>' + tail).encode('utf-8'),
+                         header_ids, style.header_height, data_ids, date_styles)
+
+
+def _column_letters(count):
+    from openpyxl.utils import get_column_letter
+
+    return [get_column_letter(column + 1) for column in range(count)]
+
+
+def _text(value):
+    text = escape(_ILLEGAL_XML_CHARS.sub('', value))
+    if text[:1].isspace() or text[-1:].isspace():
+        return f'<is><t xml:space="preserve">{text}</t></is>'
+    return f'<is><t>{text}</t></is>'
+
+
+def _style_attributes(style_ids):
+    return [f' s="{style}"' if style else '' for style in style_ids]
+
+
+class TemplateSink:
+    """按骨架写出一个分块，append逐行拼接XML并分批写入压缩流"""
+
+    def __init__(self, output_path, header, template):
+        from openpyxl.utils.datetime import to_excel
+
+        self.to_excel = to_excel
+        self.data_styles = _style_attributes(template.data_styles)
+        self.date_styles = {key: _style_attributes([style])[0] for key, style in template.date_styles.items()}
+        self.sheet_tail = template.sheet_tail
+        self.package = zipfile.ZipFile(output_path, 'w', zipfile.ZIP_DEFLATED)
+        try:
+            for name, data in template.parts:
+                self.package.writestr(name, data)
+            self.stream = self.package.open(SHEET_PART, 'w')
+        except BaseException:
+            self.package.close()
+            raise
+        self.stream.write(template.sheet_head)
+        self.letters = _column_letters(max(len(header), len(template.data_styles)))
+        self.pending = []
+        self.next_row = 1
+        height = template.header_height
+        self._append(header, _style_attributes(template.header_styles),
+                     f' ht="{height}" customHeight="1"' if height else '')
+
+    def _cell(self, reference, value, style, column):
+        if value is None:
+            return f'<c r="{reference}"{style}/>' if style else ''
+        if isinstance(value, str):
+            return f'<c r="{reference}"{style} t="inlineStr">{_text(value)}</c>'
+        if isinstance(value, bool):
+            return f'<c r="{reference}"{style} t="b"><v>{int(value)}</v></c>'
+        if isinstance(value, int):
+            return f'<c r="{reference}"{style}><v>{value}</v></c>'
+        if isinstance(value, float):
+            if math.isnan(value) or math.isinf(value):
+                return f'<c r="{reference}"{style}/>' if style else ''
+            return f'<c r="{reference}"{style}><v>{value!r}</v></c>'
+        if isinstance(value, (datetime.date, datetime.time)):
+            kind = (datetime.datetime if isinstance(value, datetime.datetime)
+                    else datetime.date if isinstance(value, datetime.date) else datetime.time)
+            style = self.date_styles.get((column, kind), self.date_styles[-1, kind])
+            if getattr(value, 'tzinfo', None) is not None:
+                value = value.replace(tzinfo=None)
+            return f'<c r="{reference}"{style}><v>{self.to_excel(value)!r}</v></c>'
+        if isinstance(value, datetime.timedelta):
+            return f'<c r="{reference}"{style}><v>{self.to_excel(value)!r}</v></c>'
+        return self._cell(reference, str(value), style, column)
+
+    def _append(self, row, styles, attributes=''):
+        row_number = self.next_row
+        self.next_row += 1
+        letters = self.letters
+        if len(row) > len(letters):
+            self.letters = letters = _column_letters(len(row))
+        cells = []
+        for column, value in enumerate(row):
+            cell = self._cell(f'{letters[column]}{row_number}', value,
+                              styles[column] if column < len(styles) else '', column)
+            if cell:
+                cells.append(cell)
+        self.pending.append(f'<row r="{row_number}"{attributes}>{"".join(cells)}</row>')
+        if len(self.pending) >= _FLUSH_ROWS:
+            self._flush()
+
+    def append(self, row):
+        self._append(row, self.data_styles)
+
+    def _flush(self):
+        self.stream.write(''.join(self.pending).encode('utf-8'))
+        self.pending = []
+
+    def close(self):
+        try:
+            self._flush()
+            self.stream.write(self.sheet_tail)
+            self.stream.close()
+        finally:
+            self.package.close()
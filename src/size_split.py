@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+按文件大小拆分
+给定每个输出文件的大小上限，只读取一遍输入：
+- 先写出表头和前SAMPLE_ROWS行样本，测出固定开销和每行压缩后的字节数
+- 每个分块按当前估算决定行数，写出后用实际文件大小修正估算
+- 写出的文件超过上限时用更少的行重写，多出的行顺延到下一个文件
+分块写出时保留写出的行供重写使用：前MEMORY_ROWS行保存在内存中，超出的行才追加到临时文件，
+不需要在内存中保留整个大分块
+"""
+
+import itertools
+import os
+import shutil
+import tempfile
+from collections import deque
+
+from cancel import SplitCancelled, check_rows
+from partition import _SpillFiles
+from profiling import timed, timed_rows, timed_sink
+from split_engine import (commit_partial, open_rows, output_filename_for, partial_path, remove_partial,
+                          writer_for)
+
+
+# 用于估算每行字节数的样本行数
+SAMPLE_ROWS = 1000
+# 按上限的这个比例确定分块行数，留出余量以减少重写
+SIZE_HEADROOM = 0.95
+# 每个分块在内存中保留的行数，超出的行写入临时文件
+MEMORY_ROWS = 20000
+
+
+class SizeEstimator:
+    """根据实际写出的文件大小在线估算每个输出文件能容纳的行数"""
+
+    def __init__(self, overhead, bytes_per_row):
+        self.overhead = overhead
+        self.bytes_per_row = bytes_per_row
+
+    @classmethod
+    def from_sample(cls, chunk_writer, header, sample, work_dir):
+        """写出只有表头的文件和包含样本行的文件，得到固定开销和每行字节数的初始估算"""
+        path = os.path.join(work_dir, f"sample{chunk_writer.extension}")
+        chunk_writer.write(path, header, [])
+        overhead = os.path.getsize(path)
+        bytes_per_row = 1
+        if sample:
+            chunk_writer.write(path, header, sample)
+            bytes_per_row = max(os.path.getsize(path) - overhead, 1) / len(sample)
+        os.remove(path)
+        return cls(overhead, bytes_per_row)
+
+    def rows_for(self, max_bytes):
+        """一个不超过max_bytes的文件预计可容纳的行数，至少为1"""
+        return max(int((max_bytes * SIZE_HEADROOM - self.overhead) / self.bytes_per_row), 1)
+
+    def update(self, rows, size):
+        """用一个实际写出的文件修正估算；与旧估算各占一半，避免单个分块的波动"""
+        measured = max(size - self.overhead, 1) / rows
+        self.bytes_per_row = (self.bytes_per_row + measured) / 2
+
+
+class _ChunkRows:
+    """一个分块已写出的行，可重复迭代；前MEMORY_ROWS行在内存中，其余追加到spill中以index为键的临时文件"""
+
+    def __init__(self, spill, index):
+        self.spill = spill
+        self.index = index
+        self.rows = []
+
+    def append(self, row):
+        if len(self.rows) < MEMORY_ROWS:
+            self.rows.append(row)
+        else:
+            self.spill.append(self.index, row)
+
+    def __iter__(self):
+        yield from self.rows
+        path = self.spill.paths.get(self.index)
+        if path is not None:
+            self.spill.close()
+            yield from _SpillFiles.read(path)
+
+    def discard(self):
+        """删除临时文件"""
+        path = self.spill.paths.pop(self.index, None)
+        if path is not None:
+            self.spill.close()
+            os.remove(path)
+
+
+def split_by_size(input_file, output_dir, max_bytes, writer=None, sheet_name=None,
+                  progress_callback=None, cache=None, cancel_token=None, convert_xls=False,
+                  stage_times=None, selection=None):
+    """
+    拆分文件，使每个输出文件不超过max_bytes字节（单行就超过上限时该文件只包含这一行）
+    输出文件名与按行数拆分相同：<原文件名>[_<工作表名>]_001
+    progress_callback(已完成文件数, 预估文件总数, 输出文件名, 该文件行数)
+    cancel_token被取消时删除写了一半的文件，抛出SplitCancelled，其files为已完成的文件
+    stage_times（profiling.StageTimes）不为None时记录各阶段耗时，样本估算和超限重写计入序列化
+    selection（row_filter.RowSelection）只输出保留的列和满足条件的行
+    返回 [(输出文件名, 行数), ...]
+    """
+    if max_bytes <= 0:
+        raise ValueError("文件大小上限必须大于0")
+
+    with timed(stage_times, 'open'):
+        header, rows, estimated_rows = open_rows(input_file, sheet_name, cache, convert_xls, selection)
+        chunk_writer = writer_for(writer, input_file, sheet_name, selection)
+    rows = timed_rows(check_rows(rows, cancel_token), stage_times)
+
+    os.makedirs(output_dir, exist_ok=True)
+    work_dir = tempfile.mkdtemp(prefix='excel_size_split_')
+    spill = _SpillFiles(work_dir, 1)
+    results = []
+    output_path = None
+    try:
+        # 待写出的行：样本行和超限重写后顺延的行，先于输入中剩余的行写出
+        pending = deque(itertools.islice(rows, SAMPLE_ROWS))
+        with timed(stage_times, 'serialize'):
+            estimator = SizeEstimator.from_sample(chunk_writer, header, list(pending), work_dir)
+
+        def next_row():
+            return pending.popleft() if pending else next(rows, None)
+
+        rows_written = 0
+        while True:
+            row = next_row()
+            if row is None:
+                break
+
+            output_filename = output_filename_for(input_file, len(results), chunk_writer.extension, sheet_name)
+            output_path = os.path.join(output_dir, output_filename)
+            limit = estimator.rows_for(max_bytes)
+            written = _ChunkRows(spill, len(results))
+            count = 0
+            sink = timed_sink(chunk_writer.open(partial_path(output_path), header), stage_times)
+            try:
+                while row is not None:
+                    sink.append(row)
+                    written.append(row)
+                    count += 1
+                    row = next_row() if count < limit else None
+            finally:
+                sink.close()
+            size = os.path.getsize(partial_path(output_path))
+            estimator.update(count, size)
+
+            # 超过上限时按修正后的估算减少行数重写，直到不超过上限
+            keep = count
+            while size > max_bytes and keep > 1:
+                keep = min(keep - 1, estimator.rows_for(max_bytes))
+                with timed(stage_times, 'serialize'):
+                    chunk_writer.write(partial_path(output_path), header, itertools.islice(written, keep))
+                size = os.path.getsize(partial_path(output_path))
+                estimator.update(keep, size)
+            commit_partial(output_path, stage_times)
+
+            if keep < count:
+                # 多出的行放回待写出行的前面，由下一个文件接着写
+                pending.extendleft(reversed(list(itertools.islice(written, keep, None))))
+            written.discard()
+
+            results.append((output_filename, keep))
+            rows_written += keep
+            if progress_callback:
+                num_files = len(results)
+                if estimated_rows is not None and estimated_rows > rows_written:
+                    remaining = estimated_rows - rows_written
+                    per_file = estimator.rows_for(max_bytes)
+                    num_files += (remaining + per_file - 1) // per_file
+                progress_callback(len(results), num_files, output_filename, keep)
+    except SplitCancelled:
+        raise SplitCancelled(results)
+    finally:
+        spill.close()
+        if output_path is not None:
+            remove_partial(output_path)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    return results
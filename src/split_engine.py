@@ -0,0 +1,892 @@
+#!/usr/bin/env python3
+"""
+Excel拆分引擎
+与GUI无关的拆分实现，提供两种引擎：
+- pandas: 一次性读取整个工作表为DataFrame后按行切片（原有实现）
+- streaming: 基于openpyxl只读模式逐行读取，直接写入当前分块文件，
+  每满rows_per_file行轮换一次输出文件，峰值内存以单个分块为上限
+两种引擎的行数、表头和空行处理相同，但单元格的值并不总是相同：pandas按整列推断类型，
+流式引擎只能逐个单元格转换（写出第一个分块时还没有读到后面的行），因此
+- 文本NA、N/A、null、nan等：streaming保留文本，pandas视为缺失值
+- 整列都是数字样式的文本（如编号007）：streaming保留文本，pandas转为数字7
+- 同一列中的整数和小数：streaming各自保持，pandas把整数也变为小数（3 -> 3.0）
+- xlsx/xls中含空单元格的布尔列：streaming为True/False，pandas为1/0
+- CSV的字段：streaming把规范写法的数字逐个转为数字、其余（包括True/False）保持文本，
+  pandas整列能转换时才转换（True/False转为布尔值），含空字段的列里整数值的小数变为整数
+完整列表见README的“两种引擎的差异”
+两种引擎都支持workers>1时用进程池并发写出分块（openpyxl序列化会占用GIL，线程无法并行）
+分块的输出格式由writers模块中的写出后端决定
+CSV/TSV输入由csv_input模块读取；逗号分隔的CSV拆分为CSV时按字节范围复制，不解析字段
+pandas、numpy和openpyxl在用到时才导入，GUI导入本模块时不会加载它们，见prewarm_imports
+"""
+
+import datetime
+import itertools
+import os
+import re
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+
+from cancel import (CANCEL_POLL_SECONDS, SplitCancelled, check_rows, init_worker_cancel,
+                    process_cancel_event, worker_cancel_token)
+from csv_input import can_split_bytes, is_csv, iter_csv_rows, read_csv_dataframe, split_csv_bytes
+from parse_cache import load_converted, save_converted
+from profiling import timed_rows, timed_sink
+from sheet_template import compile_template, read_sheet_style
+from writers import get_writer
+
+
+ENGINE_STREAMING = 'streaming'
+ENGINE_PANDAS = 'pandas'
+ENGINES = (ENGINE_STREAMING, ENGINE_PANDAS)
+
+_INVALID_FILENAME_CHARS = re.compile(r'[\\/:*?"<>|]')
+
+# 较重的依赖，GUI窗口显示后在后台线程预先导入，第一次拆分时不必再等待
+PREWARM_MODULES = ('numpy', 'pandas', 'openpyxl')
+
+# xlrd的单元格类型（xlrd.XL_CELL_*），在这里定义以免导入本模块时就加载xlrd
+_XL_CELL_TEXT = 1
+_XL_CELL_NUMBER = 2
+_XL_CELL_DATE = 3
+_XL_CELL_BOOLEAN = 4
+
+# 读取列格式时检查的数据行数
+FORMAT_SAMPLE_ROWS = 20
+
+
+def read_excel_dataframe(input_file, sheet_name=None):
+    """按扩展名选择引擎，将整个工作表读取为DataFrame，sheet_name为None时读取第一个工作表"""
+    import pandas as pd
+
+    sheet = 0 if sheet_name is None else sheet_name
+    if is_csv(input_file):
+        return read_csv_dataframe(input_file, sheet_name)
+    if input_file.lower().endswith('.xlsx'):
+        return pd.read_excel(input_file, sheet_name=sheet, engine='openpyxl')
+    elif input_file.lower().endswith('.xls'):
+        # .xls 文件使用 xlrd 引擎
+        return pd.read_excel(input_file, sheet_name=sheet, engine='xlrd')
+    return pd.read_excel(input_file, sheet_name=sheet)
+
+
+def prewarm_imports(modules=PREWARM_MODULES):
+    """依次导入较重的依赖，供后台线程调用；导入失败时忽略，等真正用到时再报错"""
+    import importlib
+
+    for name in modules:
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            pass
+
+
+def output_filename_for(input_file, index, extension='.xlsx', sheet_name=None):
+    """
+    生成第index个（从0开始）分块的输出文件名，扩展名由写出后端决定
+    指定工作表时文件名为 <原文件名>_<工作表名>_001
+    """
+    stem = Path(input_file).stem
+    if sheet_name is not None:
+        # 工作表名中可能含有文件名不允许的字符
+        stem = f"{stem}_{_INVALID_FILENAME_CHARS.sub('_', sheet_name)}"
+    return f"{stem}_{index + 1:03d}{extension}"
+
+
+def _trim_row(row):
+    """去掉行尾的空单元格，与pandas读取时的处理保持一致"""
+    end = len(row)
+    while end and row[end - 1] is None:
+        end -= 1
+    return row[:end]
+
+
+def _normalize_header(row):
+    """按pandas的规则生成列名：空列名为"Unnamed: n"，重复列名追加".n"后缀"""
+    header = []
+    counts = {}
+    for i, value in enumerate(row):
+        name = f"Unnamed: {i}" if value is None else value
+        count = counts.get(name, 0)
+        while count > 0:
+            counts[name] = count + 1
+            name = f"{name}.{count}"
+            count = counts.get(name, 0)
+        counts[name] = count + 1
+        header.append(name)
+    return header
+
+
+def _column_values(series):
+    """
+    把DataFrame的一列转换为逐个迭代即得到写出用Python值的序列（列表或object数组），不经过整表的object副本：
+    - 缺失值为None
+    - 因为有空单元格被pandas升为float64的整数列恢复为int
+    - datetime64列直接转为datetime，不构造Timestamp
+    """
+    import numpy as np
+
+    if isinstance(series.dtype, np.dtype) and series.dtype.kind in 'iubfM':
+        values = series.to_numpy()
+        kind = values.dtype.kind
+        if kind in 'iub':
+            return values.tolist()
+        if kind == 'M':
+            # 微秒精度的datetime64转为object时得到datetime，NaT得到None
+            return values.astype('datetime64[us]').astype(object)
+        missing = np.isnan(values)
+        if not missing.any():
+            return values.tolist()
+        present = values[~missing]
+        result = np.full(len(values), None, dtype=object)
+        if (present == np.trunc(present)).all() and (np.abs(present) < 2 ** 53).all():
+            present = present.astype(np.int64)
+        result[~missing] = present
+        return result
+    # 文本、混合类型和pandas扩展类型（如StringDtype、Int64）；object数组迭代时直接得到元素，不必转为列表
+    return series.to_numpy(dtype=object, na_value=None)
+
+
+def frame_rows(df):
+    """将DataFrame转换为 (表头, 数据行) ，按列转换后再组成行，供写出后端使用"""
+    columns = [_column_values(df.iloc[:, i]) for i in range(df.shape[1])]
+    return list(df.columns), zip(*columns)
+
+
+def partial_path(output_path):
+    """分块先写入同目录下的临时文件，写完后才重命名为最终文件名，中断时不会留下看似完整的文件"""
+    directory, filename = os.path.split(output_path)
+    return os.path.join(directory, f".part-{filename}")
+
+
+def remove_partial(output_path):
+    """删除写了一半的分块（取消或失败时）"""
+    try:
+        os.remove(partial_path(output_path))
+    except FileNotFoundError:
+        pass
+
+
+def commit_partial(output_path, stage_times=None):
+    """
+    把写完的临时文件刷到磁盘，再重命名为最终文件名，崩溃后不会留下内容不完整的最终文件
+    返回耗时（秒）；stage_times不为None时计入fsync阶段
+    """
+    started = time.perf_counter()
+    with open(partial_path(output_path), 'rb+') as f:
+        os.fsync(f.fileno())
+    os.replace(partial_path(output_path), output_path)
+    seconds = time.perf_counter() - started
+    if stage_times is not None:
+        stage_times.add('fsync', seconds)
+    return seconds
+
+
+def _write_rows_chunk(writer, output_path, header, rows, cancel_token=None):
+    """
+    写出一个分块，先写临时文件再重命名
+    在工作进程中调用时cancel_token为None，使用进程池传入的取消事件
+    返回 {'serialize': 秒, 'write': 秒, 'fsync': 秒}，供性能分析汇总（见profiling）
+    """
+    cancel_token = cancel_token or worker_cancel_token()
+    started = time.perf_counter()
+    serialized = None
+    try:
+        sink = writer.open(partial_path(output_path), header)
+        try:
+            for row in check_rows(rows, cancel_token):
+                sink.append(row)
+            serialized = time.perf_counter()
+        finally:
+            sink.close()
+    except BaseException:
+        remove_partial(output_path)
+        raise
+    written = time.perf_counter()
+    return {'serialize': serialized - started, 'write': written - serialized,
+            'fsync': commit_partial(output_path)}
+
+
+def _write_frame_chunk(writer, output_path, chunk_df, cancel_token=None):
+    """写出一个DataFrame分块，参数同_write_rows_chunk，返回值另含'slice'（转换为数据行的耗时）"""
+    started = time.perf_counter()
+    header, rows = frame_rows(chunk_df)
+    converted = time.perf_counter() - started
+    timings = _write_rows_chunk(writer, output_path, header, rows, cancel_token)
+    timings['slice'] = converted
+    return timings
+
+
+def _checkpointed(progress_callback, checkpoint, rows_per_file, stage_times=None):
+    """包装进度回调：分块按顺序完成时先记录到检查点，再回调进度"""
+    if checkpoint is None:
+        return progress_callback
+
+    def on_progress(done, total, output_filename, row_count):
+        started = time.perf_counter()
+        checkpoint.record(done - 1, output_filename, (done - 1) * rows_per_file, row_count)
+        if stage_times is not None:
+            stage_times.add('checkpoint', time.perf_counter() - started)
+        if progress_callback:
+            progress_callback(done, total, output_filename, row_count)
+
+    return on_progress
+
+
+def run_chunk_tasks(tasks, workers, num_files=None, progress_callback=None, cancel_token=None,
+                    stage_times=None):
+    """
+    用进程池并发执行分块写入任务
+    tasks: 迭代器，依次产生 (输出文件名, 行数, 函数, 参数元组)，按需惰性读取；
+           函数为None表示该分块已经写出（断点续拆时跳过），直接计入结果
+    同时在途的分块不超过workers*2个，以限制内存占用；
+    进度按分块顺序回调；任一分块失败时取消尚未开始的任务并抛出异常
+    cancel_token被取消时通知工作进程停止，等待正在写出的分块清理完毕后抛出SplitCancelled，
+    其files为已完成的分块（可能不连续）
+    stage_times（profiling.StageTimes）不为None时汇总各分块在工作进程中的耗时
+    返回 [(输出文件名, 行数), ...]
+    """
+    tasks = iter(tasks)
+    max_in_flight = workers * 2
+    results = []
+    finished = {}
+    pending = {}
+    submitted = 0
+    exhausted = False
+
+    cancel_event = process_cancel_event(cancel_token)
+    executor = ProcessPoolExecutor(max_workers=workers, initializer=init_worker_cancel,
+                                   initargs=(cancel_event,))
+    try:
+        while True:
+            if cancel_token is not None:
+                cancel_token.check()
+            while not exhausted and len(pending) < max_in_flight:
+                task = next(tasks, None)
+                if task is None:
+                    exhausted = True
+                    break
+                output_filename, row_count, func, args = task
+                if func is None:
+                    finished[submitted] = (output_filename, row_count)
+                else:
+                    pending[executor.submit(func, *args)] = (submitted, output_filename, row_count)
+                submitted += 1
+
+            if not pending and not finished:
+                break
+
+            # 启用取消时定时醒来检查取消标记
+            timeout = CANCEL_POLL_SECONDS if cancel_token is not None else None
+            done, _ = wait(pending, timeout, FIRST_COMPLETED) if pending else ((), ())
+            for future in done:
+                index, output_filename, row_count = pending.pop(future)
+                # 分块写入失败时在这里抛出异常
+                timings = future.result()
+                if stage_times is not None:
+                    stage_times.merge(timings)
+                finished[index] = (output_filename, row_count)
+
+            # 只汇报连续完成的分块，保证进度按顺序推进
+            while len(results) in finished:
+                results.append(finished.pop(len(results)))
+                if progress_callback:
+                    total = submitted if exhausted else num_files
+                    progress_callback(len(results), total, *results[-1])
+    except SplitCancelled:
+        if cancel_event is not None:
+            cancel_event.set()
+        for future in pending:
+            future.cancel()
+        # 等待正在写出的分块停止，已经写完的分块计入结果
+        for future, (index, output_filename, row_count) in pending.items():
+            if not future.cancelled() and future.exception() is None:
+                finished[index] = (output_filename, row_count)
+        raise SplitCancelled(results + [finished[index] for index in sorted(finished)])
+    except BaseException:
+        for future in pending:
+            future.cancel()
+        raise
+    finally:
+        executor.shutdown(wait=True)
+
+    return results
+
+
+def iter_sheet_rows(input_file, sheet_name=None, selection=None):
+    """
+    以只读模式逐行读取工作表，sheet_name为None时读取第一个工作表
+    返回 (列名, 数据行迭代器, 预估数据行数)；预估行数来自工作表的dimension，可能为None
+    selection（row_filter.RowSelection）不为None时只转换需要的列，见_iter_selected_rows
+    """
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(input_file, read_only=True, data_only=True)
+    sheet = workbook.worksheets[0] if sheet_name is None else workbook[sheet_name]
+    estimated_rows = sheet.max_row - 1 if sheet.max_row else None
+    if selection is not None:
+        return _iter_selected_rows(workbook, sheet, selection, estimated_rows)
+    rows = sheet.iter_rows(values_only=True)
+
+    # 跳过表头之前的空行
+    header = []
+    for row in rows:
+        header = _trim_row(row)
+        if header:
+            break
+
+    def data_rows():
+        try:
+            yield from _skip_blank_rows(rows)
+        finally:
+            workbook.close()
+
+    return _normalize_header(header), data_rows(), estimated_rows
+
+
+def _skip_blank_rows(rows):
+    """只有后面还有数据时才输出中间的空行，丢弃末尾空行"""
+    # 暂存连续的空行，后面还有数据时才输出
+    pending_blank = 0
+    for row in rows:
+        row = _trim_row(row)
+        if not row:
+            pending_blank += 1
+            continue
+        for _ in range(pending_blank):
+            yield ()
+        pending_blank = 0
+        yield row
+
+
+def _keep_matches(rows):
+    """
+    rows中每项为 (源行是否为空行, selection.pick的结果)，pick为None表示被筛选掉
+    空行的判断基于投影前的整行：源行为空行时与_skip_blank_rows相同，只有后面还有数据时才输出；
+    满足条件的行一律输出，即使保留的列都为空
+    """
+    pending_blank = 0
+    for blank, row in rows:
+        if row is None:
+            continue
+        if blank:
+            pending_blank += 1
+            continue
+        for _ in range(pending_blank):
+            yield ()
+        pending_blank = 0
+        yield _trim_row(row)
+
+
+def _pushdown_rows(workbook, sheet):
+    """
+    用openpyxl的工作表解析器逐行解析，设置parser.keep（从1开始的列号集合）后跳过其余列的单元格，
+    只检查被跳过的单元格是否有值，不查共享字符串，也不转换数字和日期
+    返回 (parser, 生成 (行号, {列序号: 值}, 是否有被跳过的非空单元格) 的迭代器, 关闭函数)
+    依赖openpyxl的内部接口（已在3.0和3.1上验证），接口变化时抛出ImportError、AttributeError或TypeError
+    """
+    from openpyxl.utils.cell import column_index_from_string
+    from openpyxl.worksheet._reader import INLINE_STRING, VALUE_TAG, WorkSheetParser
+
+    column_numbers = {}
+
+    class SelectedParser(WorkSheetParser):
+        # 需要转换的列号（从1开始），None表示所有列
+        keep = None
+        # 当前行中是否有被跳过的非空单元格
+        skipped_value = False
+
+        def parse_row(self, row):
+            self.skipped_value = False
+            return super().parse_row(row)
+
+        def parse_cell(self, element):
+            if self.keep is not None:
+                coordinate = element.get('r')
+                if coordinate:
+                    letters = coordinate.rstrip('0123456789')
+                    column = column_numbers.get(letters)
+                    if column is None:
+                        column = column_numbers[letters] = column_index_from_string(letters)
+                    self.col_counter = column
+                else:
+                    self.col_counter += 1
+                    column = self.col_counter
+                if column not in self.keep:
+                    if not self.skipped_value and (element.findtext(VALUE_TAG)
+                                                   or element.find(INLINE_STRING) is not None):
+                        self.skipped_value = True
+                    return None
+                if not coordinate:
+                    # 交给openpyxl转换时它会再加一次
+                    self.col_counter -= 1
+            return super().parse_cell(element)
+
+    source = sheet._get_source()
+    try:
+        parser = SelectedParser(source, sheet._shared_strings, data_only=True, epoch=workbook.epoch,
+                                date_formats=workbook._date_formats,
+                                timedelta_formats=workbook._timedelta_formats)
+    except BaseException:
+        source.close()
+        raise
+
+    def rows():
+        for row_number, cells in parser.parse():
+            values = {cell['column'] - 1: cell['value'] for cell in cells if cell is not None}
+            yield row_number, values, parser.skipped_value
+
+    def close():
+        source.close()
+        workbook.close()
+
+    return parser, rows(), close
+
+
+def _public_rows(sheet):
+    """openpyxl公开的iter_rows，逐行转换所有列；返回值同_pushdown_rows，没有parser"""
+    def rows():
+        for row_number, row in enumerate(sheet.iter_rows(values_only=True), 1):
+            yield row_number, {index: value for index, value in enumerate(row) if value is not None}, False
+
+    return None, rows(), sheet.parent.close
+
+
+def _iter_selected_rows(workbook, sheet, selection, estimated_rows):
+    """
+    按selection读取.xlsx工作表：表头之后只转换selection.needed中的列，
+    其余单元格在openpyxl的解析器中直接跳过，不查共享字符串，也不转换数字和日期
+    openpyxl的内部接口不可用时退回公开的iter_rows，结果相同，只是所有列都会转换
+    返回值同iter_sheet_rows，表头和数据行都只包含保留的列；有筛选条件时预估行数为None
+    """
+    try:
+        parser, parsed, close = _pushdown_rows(workbook, sheet)
+    except (ImportError, AttributeError, TypeError):
+        parser, parsed, close = _public_rows(sheet)
+
+    try:
+        # 跳过表头之前的空行
+        header = []
+        header_row = None
+        for header_row, values, _ in parsed:
+            if values:
+                row = [None] * (max(values) + 1)
+                for index, value in values.items():
+                    row[index] = value
+                header = _trim_row(tuple(row))
+            if header:
+                break
+        selection.bind(_normalize_header(header))
+    except BaseException:
+        close()
+        raise
+    if parser is not None:
+        parser.keep = frozenset(index + 1 for index in selection.needed)
+
+    def picked_rows():
+        previous = header_row
+        for row_number, values, skipped_value in parsed:
+            # 工作表XML中省略的行是空行
+            if previous is not None:
+                for _ in range(row_number - previous - 1):
+                    yield True, selection.pick({})
+            previous = row_number
+            blank = not skipped_value and all(value is None for value in values.values())
+            yield blank, selection.pick(values)
+
+    def data_rows():
+        try:
+            yield from _keep_matches(picked_rows())
+        finally:
+            close()
+
+    return selection.header, data_rows(), None if selection.filters else estimated_rows
+
+
+def _xls_row_blank(types, values):
+    """.xls的一行是否为空行（与_xls_cell转换后全为None一致），不转换单元格"""
+    for cell_type, value in zip(types, values):
+        if cell_type in (_XL_CELL_NUMBER, _XL_CELL_DATE, _XL_CELL_BOOLEAN):
+            return False
+        if cell_type == _XL_CELL_TEXT and value != '':
+            return False
+    return True
+
+
+def _xls_cell(cell_type, value, datemode):
+    """按pandas（xlrd引擎）的规则转换.xls单元格的值"""
+    if cell_type == _XL_CELL_NUMBER:
+        # 整数值的浮点数转为int
+        return int(value) if value == int(value) else value
+    if cell_type == _XL_CELL_TEXT:
+        return value if value != '' else None
+    if cell_type == _XL_CELL_DATE:
+        from xlrd.xldate import xldate_as_datetime
+
+        try:
+            value = xldate_as_datetime(value, datemode)
+        except OverflowError:
+            return value
+        # 只有时间部分的单元格转为time
+        if value.date() == (datetime.date(1904, 1, 1) if datemode else datetime.date(1899, 12, 31)):
+            return value.time()
+        return value
+    if cell_type == _XL_CELL_BOOLEAN:
+        return bool(value)
+    # 空单元格和错误值
+    return None
+
+
+def iter_xls_rows(input_file, sheet_name=None, convert=False, selection=None):
+    """
+    读取.xls（BIFF）工作表，返回值同iter_sheet_rows
+    xlrd以on_demand模式打开，只解析要拆分的工作表，逐行转换后直接交给写出后端，不构造DataFrame
+    convert为True时，完整读取后把转换结果按列保存到本地（见parse_cache.save_converted），
+    之后拆分同一文件时直接读取转换结果，跳过BIFF解析
+    selection不为None时只转换需要的列；convert为True时仍完整转换并保存，读取后再筛选
+    """
+    converted = load_converted(input_file, sheet_name)
+    if converted is not None:
+        header, rows, row_count = converted
+        if selection is not None:
+            selection.bind(header)
+            return (selection.header, map(_trim_row, selection.apply(rows)),
+                    None if selection.filters else row_count)
+        return header, rows, row_count
+
+    import xlrd
+
+    book = xlrd.open_workbook(input_file, on_demand=True)
+    try:
+        sheet = book.sheet_by_index(0) if sheet_name is None else book.sheet_by_name(sheet_name)
+    except BaseException:
+        book.release_resources()
+        raise
+    estimated_rows = sheet.nrows - 1 if sheet.nrows else None
+    # 表头之后只转换的列，None表示所有列
+    needed = None
+
+    def raw_rows():
+        datemode = book.datemode
+        for index in range(sheet.nrows):
+            if needed is None:
+                yield _trim_row(tuple(map(_xls_cell, sheet.row_types(index), sheet.row_values(index),
+                                          itertools.repeat(datemode))))
+                continue
+            types = sheet.row_types(index)
+            values = sheet.row_values(index)
+            yield _xls_row_blank(types, values), selection.pick(
+                {column: _xls_cell(types[column], values[column], datemode)
+                 for column in needed if column < len(types)})
+
+    rows = raw_rows()
+    # 跳过表头之前的空行
+    header = []
+    for row in rows:
+        header = row
+        if header:
+            break
+    header = _normalize_header(header)
+    if selection is not None and not convert:
+        needed = selection.bind(header).needed
+
+        def selected_rows():
+            try:
+                yield from _keep_matches(rows)
+            finally:
+                book.release_resources()
+
+        return selection.header, selected_rows(), None if selection.filters else estimated_rows
+
+    def data_rows():
+        saved = [] if convert else None
+        try:
+            # 与iter_sheet_rows相同，丢弃末尾空行
+            pending_blank = 0
+            for row in rows:
+                if not row:
+                    pending_blank += 1
+                    continue
+                for _ in range(pending_blank):
+                    yield ()
+                    if saved is not None:
+                        saved.append(())
+                pending_blank = 0
+                yield row
+                if saved is not None:
+                    saved.append(row)
+            if saved is not None:
+                # 只有完整读取后才保存，取消或出错时不会留下不完整的转换结果
+                save_converted(input_file, sheet_name, header, saved)
+        finally:
+            book.release_resources()
+
+    if selection is not None:
+        selection.bind(header)
+        return (selection.header, map(_trim_row, selection.apply(data_rows())),
+                None if selection.filters else estimated_rows)
+    return header, data_rows(), estimated_rows
+
+
+def read_number_formats(input_file, sheet_name=None, sample_rows=FORMAT_SAMPLE_ROWS):
+    """
+    读取.xlsx工作表各列的数字格式，取表头之后前sample_rows行中每列第一个非常规格式
+    返回按列排列的格式字符串列表（常规格式为None），没有任何格式或不是.xlsx时返回None
+    只读取开头几行的单元格对象，之后的数据行仍按值读取
+    """
+    if not input_file.lower().endswith('.xlsx'):
+        return None
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(input_file, read_only=True)
+    try:
+        sheet = workbook.worksheets[0] if sheet_name is None else workbook[sheet_name]
+        formats = {}
+        header_found = False
+        for row in sheet.iter_rows():
+            if not header_found:
+                header_found = any(cell.value is not None for cell in row)
+                continue
+            for column, cell in enumerate(row):
+                if cell.value is not None and column not in formats and cell.number_format != 'General':
+                    formats[column] = cell.number_format
+            sample_rows -= 1
+            if sample_rows <= 0:
+                break
+    finally:
+        workbook.close()
+    if not formats:
+        return None
+    return [formats.get(column) for column in range(max(formats) + 1)]
+
+
+def writer_for(writer, input_file, sheet_name=None, selection=None):
+    """
+    创建写出后端；xlsx后端带上输入工作表各列的数字格式，见read_number_formats
+    模板后端改为读取一次输入工作表的外观并编译为骨架，见sheet_template
+    selection为已经bind的RowSelection时，格式和样式按保留的列重新排列
+    """
+    chunk_writer = get_writer(writer)
+    if chunk_writer.uses_template:
+        style = read_sheet_style(input_file, sheet_name)
+        if style is not None and selection is not None:
+            style = style.select(selection.indexes)
+        chunk_writer.template = compile_template(style)
+    elif chunk_writer.keeps_formats:
+        formats = read_number_formats(input_file, sheet_name)
+        chunk_writer.formats = selection.select(formats) if selection is not None else formats
+    return chunk_writer
+
+
+def open_rows(input_file, sheet_name=None, cache=None, convert_xls=False, selection=None):
+    """
+    逐行读取输入文件，返回值同iter_sheet_rows
+    .xlsx用openpyxl流式读取；.xls用xlrd逐行读取（见iter_xls_rows），
+    cache中已有该工作表解析好的DataFrame时直接复用；CSV/TSV见csv_input.iter_csv_rows
+    selection（row_filter.RowSelection）不为None时只返回保留的列和满足条件的行，
+    读取时只转换需要的列；返回前selection已按输入的表头bind
+    """
+    if is_csv(input_file):
+        return iter_csv_rows(input_file, sheet_name, selection)
+    if input_file.lower().endswith('.xls'):
+        df = cache.peek(input_file, sheet_name) if cache is not None else None
+        if df is not None:
+            if selection is not None:
+                df = selection.apply_frame(df)
+            header, rows = frame_rows(df)
+            return header, rows, len(df)
+        return iter_xls_rows(input_file, sheet_name, convert=convert_xls, selection=selection)
+    return iter_sheet_rows(input_file, sheet_name, selection)
+
+
+def split_streaming(input_file, output_dir, rows_per_file, progress_callback=None, cache=None,
+                    workers=1, writer=None, sheet_name=None, checkpoint=None, cancel_token=None,
+                    convert_xls=False, stage_times=None, selection=None):
+    """
+    流式拆分：逐行读取并写入当前分块，满rows_per_file行后轮换到下一个文件
+    progress_callback(已完成文件数, 文件总数, 输出文件名, 该文件行数)
+    流式读取时文件总数来自dimension预估，可能为None或偏小，最后一个文件回调时修正为实际值
+    .xls用xlrd逐行读取，cache中已有该工作表的DataFrame时直接复用；
+    convert_xls为True时保存.xls的转换结果，见iter_xls_rows
+    workers>1时读取在当前进程进行，分块交给进程池写出
+    writer为写出后端名称，默认openpyxl
+    逗号分隔的CSV拆分为CSV时改用csv_input.split_csv_bytes按字节范围复制
+    sheet_name为要拆分的工作表，None表示第一个工作表
+    checkpoint（checkpoint.Checkpoint）不为None时记录每个完成的分块，并跳过其中已完成的分块；
+    流式读取无法直接定位到指定行，已完成分块的行只读取不写出
+    cancel_token（cancel.CancelToken）被取消时删除写了一半的分块，
+    抛出SplitCancelled，其files为已完成的分块
+    stage_times（profiling.StageTimes）不为None时记录各阶段耗时
+    selection（row_filter.RowSelection）不为None时只输出保留的列和满足条件的行，
+    读取时只转换需要的列，见open_rows
+    返回 [(输出文件名, 行数), ...]
+    """
+    started = time.perf_counter()
+    if selection is None and can_split_bytes(input_file, get_writer(writer).name):
+        return split_csv_bytes(input_file, output_dir, rows_per_file, progress_callback, workers,
+                               sheet_name, checkpoint, cancel_token, stage_times)
+    header, rows, estimated_rows = open_rows(input_file, sheet_name, cache, convert_xls, selection)
+    chunk_writer = writer_for(writer, input_file, sheet_name, selection)
+    if stage_times is not None:
+        stage_times.add('open', time.perf_counter() - started)
+    rows = timed_rows(check_rows(rows, cancel_token), stage_times)
+
+    def filename_for(index):
+        return output_filename_for(input_file, index, chunk_writer.extension, sheet_name)
+
+    num_files = None
+    if estimated_rows is not None:
+        num_files = max((estimated_rows + rows_per_file - 1) // rows_per_file, 1)
+
+    os.makedirs(output_dir, exist_ok=True)
+    progress_callback = _checkpointed(progress_callback, checkpoint, rows_per_file, stage_times)
+
+    if workers > 1:
+        def tasks():
+            for i in itertools.count():
+                if checkpoint is not None and checkpoint.is_complete(i):
+                    skipped = sum(1 for _ in itertools.islice(rows, rows_per_file))
+                    if not skipped:
+                        return
+                    yield filename_for(i), skipped, None, None
+                    continue
+                chunk = list(itertools.islice(rows, rows_per_file))
+                if not chunk:
+                    return
+                output_filename = filename_for(i)
+                output_path = os.path.join(output_dir, output_filename)
+                yield (output_filename, len(chunk), _write_rows_chunk,
+                       (chunk_writer, output_path, header, chunk))
+
+        return run_chunk_tasks(tasks(), workers, num_files, progress_callback, cancel_token, stage_times)
+
+    results = []
+    sink = None
+    try:
+        for row in rows:
+            if sink is None:
+                output_filename = filename_for(len(results))
+                if checkpoint is not None and checkpoint.is_complete(len(results)):
+                    # 已完成的分块：只读取对应的行，不再写出
+                    skipped = 1 + sum(1 for _ in itertools.islice(rows, rows_per_file - 1))
+                    results.append((output_filename, skipped))
+                    if progress_callback:
+                        progress_callback(len(results), num_files, output_filename, skipped)
+                    continue
+                output_path = os.path.join(output_dir, output_filename)
+                sink = timed_sink(chunk_writer.open(partial_path(output_path), header), stage_times)
+                sink_rows = 0
+            sink.append(row)
+            sink_rows += 1
+            if sink_rows >= rows_per_file:
+                sink.close()
+                commit_partial(output_path, stage_times)
+                sink = None
+                results.append((output_filename, sink_rows))
+                if progress_callback:
+                    progress_callback(len(results), num_files, output_filename, sink_rows)
+
+        if sink is not None:
+            sink.close()
+            commit_partial(output_path, stage_times)
+            sink = None
+            results.append((output_filename, sink_rows))
+            if progress_callback:
+                progress_callback(len(results), len(results), output_filename, sink_rows)
+    except BaseException as e:
+        # 取消、读取出错或写出出错：关闭并删除写了一半的分块
+        if sink is not None:
+            sink.close()
+            remove_partial(output_path)
+        if isinstance(e, SplitCancelled):
+            raise SplitCancelled(results)
+        raise
+
+    return results
+
+
+def split_pandas(input_file, output_dir, rows_per_file, progress_callback=None, cache=None,
+                 workers=1, writer=None, sheet_name=None, checkpoint=None, cancel_token=None,
+                 stage_times=None, selection=None):
+    """
+    原有实现：读取整个工作表后按df.iloc切片，逐块写出
+    传入cache（parse_cache.WorkbookCache）时复用已解析的DataFrame
+    selection在读取整表后筛选，见row_filter.RowSelection.apply_frame
+    其余参数与返回值同split_streaming
+    """
+    started = time.perf_counter()
+    if cache is not None:
+        df = cache.get(input_file, lambda path: read_excel_dataframe(path, sheet_name), sheet_name)
+    else:
+        df = read_excel_dataframe(input_file, sheet_name)
+    if selection is not None:
+        df = selection.apply_frame(df)
+    chunk_writer = writer_for(writer, input_file, sheet_name, selection)
+    if stage_times is not None:
+        stage_times.add('parse', time.perf_counter() - started)
+    total_rows = len(df)
+    # 整表读取无法中途停止，读完后再检查一次
+    if cancel_token is not None:
+        cancel_token.check()
+
+    # 计算需要生成的文件数量
+    num_files = (total_rows + rows_per_file - 1) // rows_per_file
+
+    # 创建输出目录（如果不存在）
+    os.makedirs(output_dir, exist_ok=True)
+    progress_callback = _checkpointed(progress_callback, checkpoint, rows_per_file, stage_times)
+
+    def tasks():
+        for i in range(num_files):
+            start_row = i * rows_per_file
+            end_row = min((i + 1) * rows_per_file, total_rows)
+            output_filename = output_filename_for(input_file, i, chunk_writer.extension, sheet_name)
+            if checkpoint is not None and checkpoint.is_complete(i):
+                yield output_filename, end_row - start_row, None, None
+                continue
+            output_path = os.path.join(output_dir, output_filename)
+            yield (output_filename, end_row - start_row, _write_frame_chunk,
+                   (chunk_writer, output_path, df.iloc[start_row:end_row]))
+
+    if workers > 1:
+        return run_chunk_tasks(tasks(), workers, num_files, progress_callback, cancel_token, stage_times)
+
+    results = []
+    for output_filename, row_count, func, args in tasks():
+        if func is not None:
+            try:
+                timings = func(*args, cancel_token=cancel_token)
+            except SplitCancelled:
+                raise SplitCancelled(results)
+            if stage_times is not None:
+                stage_times.merge(timings)
+        results.append((output_filename, row_count))
+        if progress_callback:
+            progress_callback(len(results), num_files, output_filename, row_count)
+
+    return results
+
+
+def split_file(input_file, output_dir, rows_per_file, engine=ENGINE_STREAMING,
+               progress_callback=None, cache=None, workers=1, writer=None, sheet_name=None,
+               checkpoint=None, cancel_token=None, convert_xls=False, stage_times=None,
+               selection=None):
+    """
+    按指定引擎拆分文件的一个工作表
+    workers为并发写出分块的进程数，writer为写出后端名称，sheet_name为None时拆分第一个工作表
+    checkpoint用于断点续拆，见checkpoint.Checkpoint；cancel_token用于取消，见cancel.CancelToken
+    convert_xls只对streaming引擎有效，见iter_xls_rows；stage_times用于性能分析，见profiling
+    selection为列选择和行筛选，见row_filter
+    """
+    if engine == ENGINE_PANDAS:
+        return split_pandas(input_file, output_dir, rows_per_file, progress_callback=progress_callback,
+                            cache=cache, workers=workers, writer=writer, sheet_name=sheet_name,
+                            checkpoint=checkpoint, cancel_token=cancel_token, stage_times=stage_times,
+                            selection=selection)
+    if engine == ENGINE_STREAMING:
+        return split_streaming(input_file, output_dir, rows_per_file, progress_callback=progress_callback,
+                               cache=cache, workers=workers, writer=writer, sheet_name=sheet_name,
+                               checkpoint=checkpoint, cancel_token=cancel_token, convert_xls=convert_xls,
+                               stage_times=stage_times, selection=selection)
+    raise ValueError(f"未知的拆分引擎: {engine}")
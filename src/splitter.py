@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+可导入的拆分接口
+GUI、命令行、批量拆分和性能测试都通过Splitter调用拆分引擎：
+
+    from splitter import Splitter
+
+    result = Splitter('data.xlsx', 5000, output_dir='out', engine='streaming',
+                      writer='xlsxwriter', progress_callback=print).run()
+    print(result['rows_per_sec'], result['first_file_seconds'])
+
+指定by_column时按该列的值拆分（每个值一个文件），rows_per_file可为None：
+
+    Splitter('data.xlsx', None, output_dir='out', by_column='地区').run()
+
+按行数拆分时会在输出目录中记录检查点，中途失败后指定resume=True重新运行，
+只写出尚未完成的分块（指定resume时另外记录分块的校验和）：
+
+    Splitter('data.xlsx', 5000, output_dir='out', resume=True).run()
+
+指定max_bytes时按文件大小拆分，每个输出文件不超过该字节数：
+
+    Splitter('data.xlsx', None, output_dir='out', max_bytes=10 * 1024 * 1024).run()
+
+指定profile=True时记录各阶段耗时，结果中的'profile'为性能报告（见profiling.build_report）；
+指定pstats_path时用cProfile记录整个拆分过程并保存为pstats文件：
+
+    result = Splitter('data.xlsx', 5000, output_dir='out', profile=True, pstats_path='split.pstats').run()
+    print('\n'.join(format_report(result['profile'])))
+
+指定selection时只输出保留的列和满足条件的行，读取时只转换需要的列（见row_filter）：
+
+    selection = parse_selection('订单号,金额', ['地区=华东,华南', '日期=2024-01-01..2024-03-31'])
+    Splitter('data.xlsx', 5000, output_dir='out', selection=selection).run()
+"""
+
+import os
+import time
+
+from checkpoint import Checkpoint
+from partition import DEFAULT_MAX_OPEN_WRITERS, partition_file
+from profiling import StageTimes, build_report, cprofile_to, timed
+from size_split import split_by_size
+from writers import get_writer
+from split_engine import ENGINE_STREAMING, split_file
+
+
+class Splitter:
+    """按行数或按列值拆分一个Excel文件"""
+
+    def __init__(self, input_path, rows_per_file, output_dir=None, engine=ENGINE_STREAMING,
+                 writer=None, workers=1, progress_callback=None, cache=None, sheet_name=None,
+                 by_column=None, max_open_writers=DEFAULT_MAX_OPEN_WRITERS, max_bytes=None, resume=False, cancel_token=None,
+                 convert_xls=False, profile=False, pstats_path=None, selection=None):
+        if by_column is not None and max_bytes is not None:
+            raise ValueError("不能同时按列值和按文件大小拆分")
+        if max_bytes is not None and max_bytes <= 0:
+            raise ValueError("文件大小上限必须大于0")
+        if by_column is None and max_bytes is None and (rows_per_file is None or rows_per_file <= 0):
+            raise ValueError("行数必须大于0")
+        if workers <= 0:
+            raise ValueError("进程数必须大于0")
+        self.input_path = input_path
+        self.rows_per_file = rows_per_file
+        # 默认输出到输入文件所在目录
+        self.output_dir = output_dir or os.path.dirname(os.path.abspath(input_path))
+        self.engine = engine
+        self.writer = writer
+        self.workers = workers
+        self.progress_callback = progress_callback
+        self.cache = cache
+        # None表示第一个工作表，指定工作表时输出文件名中包含工作表名
+        self.sheet_name = sheet_name
+        # 按列值拆分时只读取一遍，engine和workers不起作用
+        self.by_column = by_column
+        self.max_open_writers = max_open_writers
+        # 按文件大小拆分时行数由在线估算决定，engine和workers不起作用
+        self.max_bytes = max_bytes
+        # 按行数拆分时跳过上次中断前已完成的分块
+        self.resume = resume
+        # cancel.CancelToken，取消后run()抛出SplitCancelled，其files为已完成的文件
+        self.cancel_token = cancel_token
+        # 保存.xls的按列转换结果，之后拆分同一文件时跳过BIFF解析
+        self.convert_xls = convert_xls
+        # 记录各阶段耗时和峰值内存；pstats_path不为None时另外用cProfile记录
+        self.profile = profile
+        self.pstats_path = pstats_path
+        # row_filter.RowSelection，None表示输出所有列和所有行
+        self.selection = selection
+
+    def run(self):
+        """
+        执行拆分，返回结果字典：
+        {'files': [(输出文件名, 行数), ...], 'rows', 'elapsed',
+         'first_file_seconds'(生成第一个文件所用时间), 'rows_per_sec'}
+        profile为True时另有'profile'（性能报告）
+        """
+        started = time.perf_counter()
+        first_file_seconds = None
+        stage_times = StageTimes() if self.profile else None
+
+        def on_progress(done, total, output_filename, row_count):
+            nonlocal first_file_seconds
+            if first_file_seconds is None and output_filename is not None:
+                first_file_seconds = time.perf_counter() - started
+            if self.progress_callback:
+                self.progress_callback(done, total, output_filename, row_count)
+
+        with cprofile_to(self.pstats_path):
+            files = self._split(on_progress, stage_times)
+
+        elapsed = time.perf_counter() - started
+        rows = sum(row_count for _, row_count in files)
+        result = {
+            'files': files,
+            'rows': rows,
+            'elapsed': elapsed,
+            'first_file_seconds': first_file_seconds,
+            'rows_per_sec': rows / elapsed if elapsed > 0 else 0,
+        }
+        if stage_times is not None:
+            result['profile'] = build_report(stage_times, result, input=self.input_path,
+                                             sheet=self.sheet_name, engine=self.engine,
+                                             writer=get_writer(self.writer).name, workers=self.workers)
+        return result
+
+    def _split(self, on_progress, stage_times):
+        """按拆分方式调用对应的拆分函数，返回 [(输出文件名, 行数), ...]"""
+        if self.by_column is not None:
+            return partition_file(self.input_path, self.output_dir, self.by_column, writer=self.writer,
+                                  sheet_name=self.sheet_name, max_open_writers=self.max_open_writers,
+                                  progress_callback=on_progress, cache=self.cache,
+                                  cancel_token=self.cancel_token, convert_xls=self.convert_xls,
+                                  stage_times=stage_times, selection=self.selection)
+        if self.max_bytes is not None:
+            return split_by_size(self.input_path, self.output_dir, self.max_bytes, writer=self.writer,
+                                 sheet_name=self.sheet_name, progress_callback=on_progress,
+                                 cache=self.cache, cancel_token=self.cancel_token,
+                                 convert_xls=self.convert_xls, stage_times=stage_times,
+                                 selection=self.selection)
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        with timed(stage_times, 'checkpoint'):
+            checkpoint = Checkpoint(self.input_path, self.output_dir, self.rows_per_file,
+                                    sheet_name=self.sheet_name, engine=self.engine,
+                                    writer=get_writer(self.writer).name, resume=self.resume,
+                                    selection=self.selection)
+        files = split_file(self.input_path, self.output_dir, self.rows_per_file,
+                           engine=self.engine, progress_callback=on_progress, cache=self.cache,
+                           workers=self.workers, writer=self.writer, sheet_name=self.sheet_name,
+                           checkpoint=checkpoint, cancel_token=self.cancel_token,
+                           convert_xls=self.convert_xls, stage_times=stage_times,
+                           selection=self.selection)
+        # 取消或失败时保留清单，之后可以续拆
+        checkpoint.remove()
+        return files
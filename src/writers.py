@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+分块写出后端
+所有后端都以 (表头, 数据行) 的形式逐行写出，拆分引擎只负责读取和分块：
+- openpyxl: 只写模式的openpyxl工作簿（原有的xlsx输出）
+- xlsxwriter: constant_memory模式的xlsxwriter，逐行落盘，写xlsx最快
+- csv: UTF-8（带BOM，Excel可直接打开）的CSV文件，跳过xlsx序列化
+- parquet: Parquet列式文件，便于下游加载，需要安装pyarrow
+- template: 按输入工作表编译一次的xlsx骨架写出，保留表头样式、列宽和冻结窗格，见sheet_template
+xlsx后端可以带上输入工作表各列的数字格式（formats），写出时原样应用，日期、前导零编号等的显示与原表一致
+"""
+
+import csv
+import importlib.util
+
+
+class ChunkWriter:
+    """写出后端基类：open返回一个支持append(row)和close()的写入器"""
+
+    name = None
+    extension = None
+    # 是否使用列的数字格式；CSV和Parquet只写值
+    keeps_formats = False
+    # 是否使用从输入工作表编译的骨架（表头样式、列宽、冻结窗格）
+    uses_template = False
+
+    def __init__(self, formats=None):
+        # 各列的数字格式，None表示该列使用默认格式
+        self.formats = formats if self.keeps_formats else None
+
+    def open(self, output_path, header):
+        raise NotImplementedError
+
+    def write(self, output_path, header, rows):
+        """一次性写出整个分块；rows迭代中途出错（如被取消）时也会关闭文件，由调用方删除"""
+        sink = self.open(output_path, header)
+        try:
+            for row in rows:
+                sink.append(row)
+        finally:
+            sink.close()
+
+
+class _OpenpyxlSink:
+    def __init__(self, output_path, header, formats=None):
+        from openpyxl import Workbook
+        from openpyxl.cell import WriteOnlyCell
+
+        self.output_path = output_path
+        self.workbook = Workbook(write_only=True)
+        # 与pandas.to_excel的默认工作表名保持一致
+        self.sheet = self.workbook.create_sheet(title='Sheet1')
+        self.sheet.append(header)
+        self.cell = WriteOnlyCell
+        # 只有带格式的列需要创建单元格对象，其余列直接写值
+        self.formatted = [(column, number_format) for column, number_format in enumerate(formats or ())
+                          if number_format is not None]
+
+    def append(self, row):
+        if self.formatted:
+            row = list(row)
+            for column, number_format in self.formatted:
+                if column < len(row) and row[column] is not None:
+                    cell = self.cell(self.sheet, row[column])
+                    cell.number_format = number_format
+                    row[column] = cell
+        self.sheet.append(row)
+
+    def close(self):
+        self.workbook.save(self.output_path)
+
+
+class OpenpyxlWriter(ChunkWriter):
+    """openpyxl只写模式，与原有输出一致"""
+
+    name = 'openpyxl'
+    extension = '.xlsx'
+
+    keeps_formats = True
+
+    def open(self, output_path, header):
+        return _OpenpyxlSink(output_path, header, self.formats)
+
+
+class _XlsxWriterSink:
+    def __init__(self, output_path, header, formats=None):
+        import xlsxwriter
+
+        # constant_memory模式下每写完一行就刷到临时文件，内存占用与行数无关；
+        # 关闭默认的文本转换：http://等文本不转为超链接（过长或过多的链接会被丢弃），=开头的文本不转为公式
+        self.workbook = xlsxwriter.Workbook(output_path, {
+            'constant_memory': True,
+            'default_date_format': 'yyyy-mm-dd hh:mm:ss',
+            'strings_to_urls': False,
+            'strings_to_formulas': False,
+        })
+        self.sheet = self.workbook.add_worksheet('Sheet1')
+        self.next_row = 0
+        # 表头不带数字格式
+        self.formats = ()
+        self.append(header)
+        # 每种数字格式只创建一个Format对象
+        cell_formats = {}
+        self.formats = [
+            None if number_format is None
+            else cell_formats.setdefault(number_format, self.workbook.add_format({'num_format': number_format}))
+            for number_format in formats or ()
+        ]
+
+    def append(self, row):
+        # 文本用write_string原样写出：write()会把{=开头、}结尾的文本转为数组公式，不受选项控制
+        formats = self.formats
+        write = self.sheet.write
+        write_string = self.sheet.write_string
+        for column, value in enumerate(row):
+            # 列格式不会作用于写入的单元格，逐个单元格带上格式
+            cell_format = formats[column] if column < len(formats) and value is not None else None
+            if isinstance(value, str):
+                write_string(self.next_row, column, value, cell_format)
+            else:
+                write(self.next_row, column, value, cell_format)
+        self.next_row += 1
+
+    def close(self):
+        self.workbook.close()
+
+
+class XlsxWriterWriter(ChunkWriter):
+    """xlsxwriter的constant_memory模式"""
+
+    name = 'xlsxwriter'
+    extension = '.xlsx'
+
+    keeps_formats = True
+
+    def open(self, output_path, header):
+        return _XlsxWriterSink(output_path, header, self.formats)
+
+
+class TemplateWriter(ChunkWriter):
+    """
+    模板输出：template为sheet_template.compile_template编译好的骨架，由split_engine.writer_for设置；
+    没有设置时按formats编译一个只带数字格式的骨架
+    """
+
+    name = 'template'
+    extension = '.xlsx'
+
+    keeps_formats = True
+    uses_template = True
+
+    def __init__(self, formats=None):
+        super().__init__(formats)
+        self.template = None
+
+    def open(self, output_path, header):
+        from sheet_template import TemplateSink, compile_template
+
+        if self.template is None:
+            self.template = compile_template(formats=self.formats)
+        return TemplateSink(output_path, header, self.template)
+
+
+class _CsvSink:
+    def __init__(self, output_path, header):
+        # utf-8-sig带BOM，Excel打开时不会出现中文乱码
+        self.file = open(output_path, 'w', newline='', encoding='utf-8-sig')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(header)
+
+    def append(self, row):
+        self.writer.writerow(row)
+
+    def close(self):
+        self.file.close()
+
+
+class CsvWriter(ChunkWriter):
+    """CSV输出"""
+
+    name = 'csv'
+    extension = '.csv'
+
+    def open(self, output_path, header):
+        return _CsvSink(output_path, header)
+
+
+class _ParquetSink:
+    def __init__(self, output_path, header):
+        self.output_path = output_path
+        # Parquet的列名必须是字符串
+        self.header = [str(name) for name in header]
+        self.rows = []
+
+    def append(self, row):
+        self.rows.append(row)
+
+    def close(self):
+        import pandas as pd
+        import pyarrow
+
+        width = len(self.header)
+        # 数据行可能比表头短（行尾空单元格已去掉），补齐到表头宽度
+        rows = [tuple(row) + (None,) * (width - len(row)) if len(row) < width else row[:width]
+                for row in self.rows]
+        df = pd.DataFrame(rows, columns=self.header)
+        try:
+            df.to_parquet(self.output_path, index=False)
+        except (pyarrow.ArrowInvalid, pyarrow.ArrowTypeError):
+            # 同一列中混有数字和文本时，将这些列统一转为文本
+            for column in df.columns[df.dtypes == object]:
+                df[column] = df[column].map(lambda v: None if v is None else str(v))
+            df.to_parquet(self.output_path, index=False)
+
+
+class ParquetWriter(ChunkWriter):
+    """Parquet输出，每个分块在内存中组装后一次写出"""
+
+    name = 'parquet'
+    extension = '.parquet'
+
+    def open(self, output_path, header):
+        return _ParquetSink(output_path, header)
+
+
+WRITERS = {
+    writer.name: writer
+    for writer in (OpenpyxlWriter, XlsxWriterWriter, TemplateWriter, CsvWriter, ParquetWriter)
+}
+DEFAULT_WRITER = OpenpyxlWriter.name
+
+
+def available_writers():
+    """返回当前环境可用的后端名称，缺少可选依赖的后端不列出"""
+    names = []
+    for name in WRITERS:
+        # 只检查是否已安装，不导入pyarrow，GUI启动时调用也很快
+        if name == ParquetWriter.name and importlib.util.find_spec('pyarrow') is None:
+            continue
+        names.append(name)
+    return names
+
+
+def get_writer(name=None, formats=None):
+    """按名称创建写出后端，name为None时使用默认后端；formats为各列的数字格式，只有xlsx后端使用"""
+    name = name or DEFAULT_WRITER
+    if name not in WRITERS:
+        raise ValueError(f"未知的输出格式: {name}")
+    return WRITERS[name](formats)
@@ -0,0 +1,6 @@
+"""测试公共设置：src中的模块以顶层模块导入（与GUI和命令行相同）"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
@@ -0,0 +1,46 @@
+"""批量拆分：同名输入的输出目录，以及续拆"""
+
+import os
+
+import pytest
+
+from batch import job_output_dirs, run_batch
+from checkpoint import Checkpoint
+from split_engine import ENGINE_STREAMING
+
+
+def test_distinct_stems_share_output_dir():
+    jobs = [('in/a.xlsx', None), ('in/b.xlsx', None)]
+    assert job_output_dirs(jobs, 'out') == {job: 'out' for job in jobs}
+
+
+def test_same_stem_gets_subdirectories():
+    jobs = [('in/a.xls', None), ('in/A.xlsx', None), ('in/b.csv', None)]
+    output_dirs = job_output_dirs(jobs, 'out')
+    assert output_dirs[jobs[0]] == os.path.join('out', 'a_xls')
+    assert output_dirs[jobs[1]] == os.path.join('out', 'A_xlsx')
+    assert output_dirs[jobs[2]] == 'out'
+
+
+def test_unresolvable_collision_is_rejected():
+    with pytest.raises(ValueError):
+        job_output_dirs([('in/x.xlsx', 'a/b'), ('in/x.xlsx', 'a_b')], 'out')
+
+
+@pytest.mark.parametrize('resume', [True, False])
+def test_batch_passes_resume_to_each_file(tmp_path, resume):
+    input_file = tmp_path / 'in.csv'
+    input_file.write_text('id\n1\n2\n3\n4\n', encoding='utf-8')
+    output_dir = tmp_path / 'out'
+    output_dir.mkdir()
+    # 模拟上次中断前已完成第一个分块
+    first = output_dir / 'in_001.csv'
+    first.write_text('kept\n', encoding='utf-8')
+    Checkpoint(str(input_file), str(output_dir), 2, engine=ENGINE_STREAMING,
+               writer='csv').record(0, first.name, 0, 2)
+
+    summary = run_batch([str(input_file)], str(output_dir), 2, writer='csv', resume=resume)
+
+    assert summary['files'] == 1 and summary['failed'] == 0
+    assert (first.read_text(encoding='utf-8') == 'kept\n') == resume
+    assert (output_dir / 'in_002.csv').exists()
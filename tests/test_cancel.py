@@ -0,0 +1,58 @@
+"""取消和失败时的清理：流式拆分不留下写了一半的.part-分块"""
+
+import pytest
+from openpyxl import Workbook
+
+import split_engine
+from cancel import CancelToken, SplitCancelled
+from split_engine import split_streaming
+
+
+def _write_input(tmp_path, rows=1000):
+    # xlsx输入写出为CSV：逐行写入.part-文件（CSV输入会改走按字节复制）
+    input_file = tmp_path / 'in.xlsx'
+    workbook = Workbook()
+    workbook.active.append(['id'])
+    for i in range(rows):
+        workbook.active.append([i])
+    workbook.save(input_file)
+    return str(input_file)
+
+
+def _partials(output_dir):
+    return sorted(path.name for path in output_dir.iterdir() if path.name.startswith('.part-'))
+
+
+def test_cancel_removes_partial_chunk(tmp_path):
+    input_file = _write_input(tmp_path)
+    output_dir = tmp_path / 'out'
+    output_dir.mkdir()
+    token = CancelToken()
+
+    def on_progress(done, total, output_filename, rows):
+        # 第一个分块完成后取消，第二个分块正在写出
+        token.cancel()
+
+    with pytest.raises(SplitCancelled) as excinfo:
+        split_streaming(input_file, str(output_dir), 300, on_progress, writer='csv',
+                        cancel_token=token)
+    assert excinfo.value.files == [('in_001.csv', 300)]
+    assert _partials(output_dir) == []
+    assert sorted(path.name for path in output_dir.iterdir()) == ['in_001.csv']
+
+
+def test_read_error_removes_partial_chunk(tmp_path, monkeypatch):
+    input_file = _write_input(tmp_path)
+    output_dir = tmp_path / 'out'
+    output_dir.mkdir()
+
+    def failing_rows():
+        for i in range(450):
+            yield (i,)
+        raise OSError("读取失败")
+
+    monkeypatch.setattr(split_engine, 'open_rows', lambda *args: (['id'], failing_rows(), 450))
+    with pytest.raises(OSError, match="读取失败"):
+        split_streaming(input_file, str(output_dir), 300, writer='csv')
+    assert _partials(output_dir) == []
+    assert sorted(path.name for path in output_dir.iterdir()) == ['in_001.csv']
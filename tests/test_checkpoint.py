@@ -0,0 +1,150 @@
+"""断点续拆：总是记录清单、只在启用续拆时计算校验和，以及读取清单时的校验"""
+
+import json
+import os
+
+import pytest
+
+import checkpoint
+from checkpoint import Checkpoint, manifest_path
+from row_filter import parse_selection
+from splitter import Splitter
+
+
+def _write_input(tmp_path):
+    input_file = tmp_path / 'in.csv'
+    input_file.write_text('id\n1\n2\n3\n4\n5\n', encoding='utf-8')
+    return str(input_file)
+
+
+def test_manifest_without_checksums_when_not_resuming(tmp_path, monkeypatch):
+    input_file = _write_input(tmp_path)
+    output_dir = str(tmp_path / 'out')
+    path = manifest_path(output_dir, input_file)
+    recorded = []
+
+    def fail(path):
+        raise AssertionError("没有启用续拆时不应计算校验和")
+
+    def on_progress(*args):
+        with open(path, encoding='utf-8') as f:
+            recorded.append(len(f.read().splitlines()) - 1)
+
+    monkeypatch.setattr(checkpoint, 'file_checksum', fail)
+    result = Splitter(input_file, 2, output_dir=output_dir, writer='csv', progress_callback=on_progress).run()
+    assert len(result['files']) == 3
+    # 每完成一个分块就记录到清单，全部完成后删除
+    assert recorded == [1, 2, 3]
+    assert not os.path.exists(path)
+
+
+def test_resume_honours_manifest_from_run_without_resume(tmp_path):
+    input_file, output_dir = _recorded(tmp_path, engine='streaming', writer='csv')
+    with open(manifest_path(output_dir, input_file), encoding='utf-8') as f:
+        assert '"sha256"' not in f.read()
+    Splitter(input_file, 2, output_dir=output_dir, engine='streaming', writer='csv', resume=True).run()
+    # 前两个分块来自清单，没有重新写出
+    assert (tmp_path / 'out' / 'in_001.csv').read_text(encoding='utf-8') == 'chunk 0\n'
+    assert (tmp_path / 'out' / 'in_002.csv').read_text(encoding='utf-8') == 'chunk 1\n'
+    assert (tmp_path / 'out' / 'in_003.csv').read_text(encoding='utf-8-sig').splitlines() == ['id', '5']
+
+
+def test_resume_records_until_done(tmp_path, monkeypatch):
+    input_file = _write_input(tmp_path)
+    output_dir = str(tmp_path / 'out')
+    recorded = []
+    original = checkpoint.file_checksum
+
+    def spy(path):
+        recorded.append(path)
+        return original(path)
+
+    monkeypatch.setattr(checkpoint, 'file_checksum', spy)
+    result = Splitter(input_file, 2, output_dir=output_dir, writer='csv', resume=True).run()
+    assert len(recorded) == len(result['files']) == 3
+    # 全部完成后删除清单
+    assert not (tmp_path / 'out' / manifest_path('', input_file)).exists()
+
+
+def _recorded(tmp_path, rows_per_file=2, chunks=2, **kwargs):
+    """写出chunks个分块并记录到清单，返回 (输入文件, 输出目录)"""
+    input_file = _write_input(tmp_path)
+    output_dir = tmp_path / 'out'
+    output_dir.mkdir(exist_ok=True)
+    recorder = Checkpoint(input_file, str(output_dir), rows_per_file, **kwargs)
+    for index in range(chunks):
+        name = f'in_{index + 1:03d}.csv'
+        (output_dir / name).write_text(f'chunk {index}\n', encoding='utf-8')
+        recorder.record(index, name, index * rows_per_file, rows_per_file)
+    return input_file, str(output_dir)
+
+
+def test_load_keeps_verified_chunks(tmp_path):
+    input_file, output_dir = _recorded(tmp_path)
+    loaded = Checkpoint(input_file, output_dir, 2, resume=True)
+    assert sorted(loaded.chunks) == [0, 1]
+    assert loaded.completed_rows == 4
+
+
+def test_load_ignores_truncated_last_line(tmp_path):
+    input_file, output_dir = _recorded(tmp_path)
+    path = manifest_path(output_dir, input_file)
+    with open(path, 'rb') as f:
+        data = f.read()
+    # 崩溃时最后一行只写了一半
+    with open(path, 'wb') as f:
+        f.write(data[:-20])
+    loaded = Checkpoint(input_file, output_dir, 2, resume=True)
+    assert sorted(loaded.chunks) == [0]
+
+    # 之后记录的分块接在清单后面，再次读取时仍然有效
+    (tmp_path / 'out' / 'in_002.csv').write_text('again\n', encoding='utf-8')
+    loaded.record(1, 'in_002.csv', 2, 2)
+    assert sorted(Checkpoint(input_file, output_dir, 2, resume=True).chunks) == [0, 1]
+
+
+@pytest.mark.parametrize('resume', [False, True])
+def test_load_rejects_modified_chunk_file(tmp_path, resume):
+    input_file, output_dir = _recorded(tmp_path, resume=resume)
+    (tmp_path / 'out' / 'in_001.csv').write_text('changed longer\n', encoding='utf-8')
+    assert sorted(Checkpoint(input_file, output_dir, 2, resume=True).chunks) == [1]
+
+
+def test_checksum_catches_change_with_same_size_and_mtime(tmp_path):
+    input_file, output_dir = _recorded(tmp_path, resume=True)
+    path = tmp_path / 'out' / 'in_001.csv'
+    stat = os.stat(path)
+    path.write_text('chunk 9\n', encoding='utf-8')
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert sorted(Checkpoint(input_file, output_dir, 2, resume=True).chunks) == [1]
+
+
+@pytest.mark.parametrize('changes', [
+    {'rows_per_file': 3},
+    {'engine': 'pandas'},
+    {'writer': 'xlsxwriter'},
+    {'selection': parse_selection('id', [])},
+])
+def test_load_ignores_manifest_with_changed_parameters(tmp_path, changes):
+    input_file, output_dir = _recorded(tmp_path, engine='streaming', writer='csv')
+    arguments = {'rows_per_file': 2, 'engine': 'streaming', 'writer': 'csv', **changes}
+    rows_per_file = arguments.pop('rows_per_file')
+    assert Checkpoint(input_file, output_dir, rows_per_file, resume=True, **arguments).chunks == {}
+
+
+def test_load_ignores_manifest_after_input_changes(tmp_path):
+    input_file, output_dir = _recorded(tmp_path)
+    with open(input_file, 'a', encoding='utf-8') as f:
+        f.write('6\n')
+    assert Checkpoint(input_file, output_dir, 2, resume=True).chunks == {}
+
+
+def test_first_record_rewrites_manifest_without_stale_chunks(tmp_path):
+    input_file, output_dir = _recorded(tmp_path)
+    # 参数变化后第一次记录时重写清单，旧的分块不再出现
+    restarted = Checkpoint(input_file, output_dir, 3, resume=True)
+    restarted.record(0, 'in_001.csv', 0, 3)
+    with open(manifest_path(output_dir, input_file), encoding='utf-8') as f:
+        lines = [json.loads(line) for line in f]
+    assert lines[0]['source']['rows_per_file'] == 3
+    assert [chunk['index'] for chunk in lines[1:]] == [0]
@@ -0,0 +1,124 @@
+"""CSV按字节范围拆分：引号内的换行、CRLF和GBK编码；编码检测和无法解码时报错"""
+
+import csv
+import io
+
+import pytest
+
+from csv_input import _SAMPLE_BYTES, _chunk_offsets, _scan_range, detect_encoding, iter_csv_rows, split_csv_bytes
+
+
+def _records(text):
+    return list(csv.reader(io.StringIO(text, newline='')))
+
+
+def _split(tmp_path, data, rows_per_file, workers=1):
+    """拆分data（字节），返回 (各分块的记录列表（不含表头）, 各分块的表头)"""
+    input_file = tmp_path / 'in.csv'
+    input_file.write_bytes(data)
+    output_dir = tmp_path / 'out'
+    results = split_csv_bytes(str(input_file), str(output_dir), rows_per_file, workers=workers)
+    chunks, headers = [], []
+    for output_filename, row_count in results:
+        records = _records((output_dir / output_filename).read_bytes().decode('utf-8-sig'))
+        headers.append(records[0])
+        chunks.append(records[1:])
+        assert len(chunks[-1]) == row_count
+    return chunks, headers
+
+
+def test_chunk_offsets_skip_quoted_newlines(tmp_path):
+    data = b'1,"a\nb"\n2,c\n3,"d\n\ne"\n4,f\n'
+    path = tmp_path / 'in.csv'
+    path.write_bytes(data)
+    record_ends = [data.index(b'"\n') + 2, data.index(b'c\n') + 2, data.index(b'e"\n') + 3]
+    assert _chunk_offsets(str(path), 0, len(data), False, 0, 1) == record_ends + [len(data)]
+    assert _chunk_offsets(str(path), 0, len(data), False, 0, 2) == [record_ends[1], len(data)]
+
+
+def test_chunk_offsets_start_inside_quotes(tmp_path):
+    data = b'1,"a\nb"\n2,c\n3,d\n'
+    path = tmp_path / 'in.csv'
+    path.write_bytes(data)
+    # 从引号内的换行之后开始：起点在引号外时后面的换行都在字段内，起点在引号内时都是行结束
+    start = data.index(b'\n') + 1
+    assert _scan_range(str(path), start, len(data)) == (0, 3, 1)
+    offsets = _chunk_offsets(str(path), start, len(data), True, 0, 1)
+    assert offsets == [data.index(b'"\n') + 2, data.index(b'c\n') + 2, len(data)]
+    # breaks_before为之前段中的行结束数，分块边界按全局行号计算
+    assert _chunk_offsets(str(path), start, len(data), True, 1, 2) == [data.index(b'"\n') + 2, len(data)]
+
+
+@pytest.mark.parametrize('workers', [1, 3])
+def test_quoted_newlines_stay_in_one_row(tmp_path, workers):
+    rows = [['id', 'text']] + [[str(i), f'第{i}行\n"引号"\n' if i % 3 == 0 else f'v{i}'] for i in range(20)]
+    buffer = io.StringIO(newline='')
+    csv.writer(buffer, lineterminator='\n').writerows(rows)
+    chunks, headers = _split(tmp_path, buffer.getvalue().encode('utf-8'), 6, workers)
+    assert [len(chunk) for chunk in chunks] == [6, 6, 6, 2]
+    assert headers == [rows[0]] * 4
+    assert [record for chunk in chunks for record in chunk] == rows[1:]
+
+
+def test_crlf_rows_are_copied_unchanged(tmp_path):
+    data = b'id,v\r\n1,a\r\n2,"b\r\nc"\r\n3,d\r\n4,e\r\n'
+    input_file = tmp_path / 'in.csv'
+    chunks, headers = _split(tmp_path, data, 2)
+    assert headers == [['id', 'v'], ['id', 'v']]
+    assert chunks == [[['1', 'a'], ['2', 'b\r\nc']], [['3', 'd'], ['4', 'e']]]
+    first = (tmp_path / 'out' / 'in_001.csv').read_bytes()
+    assert first.endswith(b'1,a\r\n2,"b\r\nc"\r\n')
+    assert input_file.read_bytes() == data
+
+
+def test_gbk_is_transcoded_to_utf8(tmp_path):
+    text = '地区,金额\n华东,100\n华南,"20\n0"\n西北,300\n'
+    chunks, headers = _split(tmp_path, text.encode('gbk'), 2)
+    assert headers == [['地区', '金额']] * 2
+    assert chunks == [[['华东', '100'], ['华南', '20\n0']], [['西北', '300']]]
+    assert (tmp_path / 'out' / 'in_001.csv').read_bytes().startswith('﻿地区'.encode('utf-8'))
+
+
+def test_missing_trailing_newline(tmp_path):
+    chunks, _ = _split(tmp_path, b'id\n1\n2\n3', 2)
+    assert chunks == [[['1'], ['2']], [['3']]]
+
+
+def _ascii_then(text, encoding):
+    """开头超过一个样本大小的ASCII行，之后是按encoding编码的text"""
+    ascii_rows = ''.join(f'{i},{i * 7}\n' for i in range(_SAMPLE_BYTES // 6))
+    return ('id,v\n' + ascii_rows).encode('ascii') + text.encode(encoding), ascii_rows.count('\n')
+
+
+def test_gbk_after_a_long_ascii_head_is_detected(tmp_path):
+    data, ascii_count = _ascii_then('华东,金额\n', 'gbk')
+    path = tmp_path / 'in.csv'
+    path.write_bytes(data)
+    assert detect_encoding(str(path)) == 'gb18030'
+    _, rows, _ = iter_csv_rows(str(path))
+    assert list(rows)[ascii_count:] == [('华东', '金额')]
+
+    chunks, _ = _split(tmp_path, data, ascii_count)
+    assert chunks[-1] == [['华东', '金额']]
+
+
+def test_utf8_after_a_long_ascii_head_is_detected(tmp_path):
+    data, _ = _ascii_then('华东,金额\n', 'utf-8')
+    path = tmp_path / 'in.csv'
+    path.write_bytes(data)
+    assert detect_encoding(str(path)) == 'utf-8'
+
+
+def test_mixed_encodings_raise_instead_of_replacing(tmp_path):
+    # 开头是UTF-8的中文，后面混入GBK：不能用替换字符悄悄写出
+    data = '地区,金额\n华东,1\n'.encode('utf-8') + ''.join(f'{i},x\n' for i in range(20000)).encode('ascii')
+    data += '华南,2\n'.encode('gbk')
+    path = tmp_path / 'in.csv'
+    path.write_bytes(data)
+    assert detect_encoding(str(path)) == 'utf-8'
+    _, rows, _ = iter_csv_rows(str(path))
+    with pytest.raises(UnicodeDecodeError):
+        list(rows)
+    with pytest.raises(UnicodeDecodeError):
+        _split(tmp_path, data, 5000)
+    assert sorted(p.name for p in (tmp_path / 'out').iterdir()) == [f'in_00{i}.csv' for i in range(1, 5)]
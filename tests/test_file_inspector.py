@@ -0,0 +1,53 @@
+"""文件分析：工作表列表、dimension给出的行列数，以及dimension不可信时扫描<row>"""
+
+import re
+import zipfile
+
+from openpyxl import Workbook
+
+from file_inspector import inspect_file
+
+
+def _write_xlsx(path, sheets):
+    """sheets为 {工作表名: 行列表}"""
+    workbook = Workbook()
+    workbook.remove(workbook.active)
+    for name, rows in sheets.items():
+        sheet = workbook.create_sheet(name)
+        for row in rows:
+            sheet.append(row)
+    workbook.save(path)
+
+
+def test_xlsx_sheets_from_dimension(tmp_path):
+    path = tmp_path / 'in.xlsx'
+    _write_xlsx(path, {
+        '订单': [['id', 'name', 'amount']] + [[i, f'n{i}', i * 1.5] for i in range(10)],
+        '空表': [],
+    })
+    info = inspect_file(str(path))
+    assert [sheet['name'] for sheet in info['sheets']] == ['订单', '空表']
+    assert (info['total_rows'], info['columns'], info['exact']) == (10, 3, False)
+    assert info['sheets'][1]['total_rows'] == 0
+
+
+def test_xlsx_untrusted_dimension_falls_back_to_scanning(tmp_path):
+    path = tmp_path / 'in.xlsx'
+    _write_xlsx(path, {'Sheet': [['id', 'name']] + [[i, f'第{i}行'] for i in range(2000)]})
+    # 有的导出工具把dimension写成A1：工作表明显不止一行时改为扫描<row>
+    patched = tmp_path / 'patched.xlsx'
+    with zipfile.ZipFile(path) as src, zipfile.ZipFile(patched, 'w', zipfile.ZIP_DEFLATED) as dst:
+        for item in src.infolist():
+            data = src.read(item.filename)
+            if item.filename.startswith('xl/worksheets/'):
+                data = re.sub(rb'<dimension ref="[^"]*"', b'<dimension ref="A1"', data)
+            dst.writestr(item, data)
+    info = inspect_file(str(patched))
+    assert (info['total_rows'], info['columns'], info['exact']) == (2000, 2, True)
+
+
+def test_csv_is_one_sheet_named_after_the_file(tmp_path):
+    path = tmp_path / 'data.csv'
+    path.write_text('a,b,c\n1,2,3\n4,5,6\n', encoding='utf-8')
+    info = inspect_file(str(path))
+    assert info['sheets'] == [{'name': 'data', 'total_rows': 2, 'columns': 3, 'exact': True}]
@@ -0,0 +1,51 @@
+"""合并：表头检查、重复的表头行和按行数输出多个文件"""
+
+import csv
+
+import pytest
+
+from merge import merge_files
+
+
+def _write_inputs(tmp_path, tables):
+    """每个table为 [表头, 数据行...]，写为in_1.csv、in_2.csv…，返回路径列表"""
+    paths = []
+    for index, table in enumerate(tables, 1):
+        path = tmp_path / f'in_{index}.csv'
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            csv.writer(f).writerows(table)
+        paths.append(str(path))
+    return paths
+
+
+def _read(path):
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        return list(csv.reader(f))
+
+
+def test_merge_drops_repeated_header_rows(tmp_path):
+    paths = _write_inputs(tmp_path, [
+        [['id', 'v'], ['1', 'a'], ['2', 'b']],
+        [['id', 'v'], ['id', 'v'], ['3', 'c']],
+    ])
+    result = merge_files(paths, str(tmp_path / 'out'), writer='csv')
+    assert result['files'] == [('merged.csv', 3)]
+    assert _read(tmp_path / 'out' / 'merged.csv') == [['id', 'v'], ['1', 'a'], ['2', 'b'], ['3', 'c']]
+
+
+def test_merge_with_rows_per_file(tmp_path):
+    paths = _write_inputs(tmp_path, [[['id']] + [[str(i)] for i in range(3)]] * 2)
+    result = merge_files(paths, str(tmp_path / 'out'), rows_per_file=4, writer='csv')
+    assert result['files'] == [('merged_001.csv', 4), ('merged_002.csv', 2)]
+    assert result['rows'] == 6
+
+
+@pytest.mark.parametrize('prefetch', [0, 2])
+def test_mismatched_header_is_rejected_before_writing(tmp_path, prefetch):
+    # 不一致的是最后一个输入，prefetch为0时它不在预读范围内，只读取表头检查
+    tables = [[['id', 'v']] + [[str(i), 'x'] for i in range(5000)]] * 3
+    paths = _write_inputs(tmp_path, tables + [[['id', 'value'], ['1', 'x']]])
+    output_dir = tmp_path / 'out'
+    with pytest.raises(ValueError, match='in_4.csv'):
+        merge_files(paths, str(output_dir), rows_per_file=1000, writer='csv', prefetch=prefetch)
+    assert list(output_dir.iterdir()) == []
@@ -0,0 +1,136 @@
+""".xls转换结果的保存、读取、权限检查和总大小上限；解析缓存的淘汰、落盘和清理"""
+
+import datetime
+import os
+import time
+
+import pandas as pd
+import pytest
+
+from parse_cache import (WorkbookCache, converted_path, load_converted, private_dir,
+                         remove_stale_spills, save_converted)
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / 'data.xls'
+    path.write_bytes(b'placeholder')
+    return str(path)
+
+
+def test_round_trip_keeps_types(tmp_path, source):
+    cache_dir = str(tmp_path / 'converted')
+    rows = [
+        (1, 'a', 1.5, datetime.datetime(2024, 1, 2, 3, 4, 5), True),
+        (),
+        (2, None, None, datetime.time(8, 30)),
+        ('文本', '$datetime', 3),
+    ]
+    save_converted(source, None, ['id', 'name', 'amount', 'when', 'flag'], rows, cache_dir)
+
+    header, loaded, row_count = load_converted(source, None, cache_dir)
+    assert header == ['id', 'name', 'amount', 'when', 'flag']
+    assert row_count == len(rows)
+    assert list(loaded) == rows
+
+
+def test_cache_file_is_not_pickle(tmp_path, source):
+    cache_dir = str(tmp_path / 'converted')
+    save_converted(source, None, ['a'], [(1,)], cache_dir)
+    (name,) = os.listdir(cache_dir)
+    assert name.endswith('.json')
+
+
+@pytest.mark.skipif(os.name != 'posix', reason="POSIX权限")
+def test_cache_dir_is_private(tmp_path, source):
+    cache_dir = str(tmp_path / 'converted')
+    save_converted(source, None, ['a'], [(1,)], cache_dir)
+    assert os.stat(cache_dir).st_mode & 0o777 == 0o700
+
+    # 其他用户可写的目录中的转换结果不读取
+    os.chmod(cache_dir, 0o777)
+    assert load_converted(source, None, cache_dir) is None
+    private_dir(cache_dir)
+    assert load_converted(source, None, cache_dir) is not None
+
+
+def test_budget_evicts_least_recently_used(tmp_path):
+    cache_dir = str(tmp_path / 'converted')
+    paths = []
+    for i in range(3):
+        path = tmp_path / f"{i}.xls"
+        path.write_bytes(b'x' * (i + 1))
+        paths.append(str(path))
+        save_converted(str(path), None, ['a'], [(n,) for n in range(100)], cache_dir, budget=10 ** 6)
+        # 依次设为更晚的最后使用时间
+        os.utime(converted_path(str(path), None, cache_dir), (i, i))
+    size = sum(os.path.getsize(os.path.join(cache_dir, name)) for name in os.listdir(cache_dir))
+
+    # 上限只够三个文件：再保存一个时最久未使用的0.xls被删除
+    save_converted(paths[2], 'other', ['a'], [(n,) for n in range(100)], cache_dir, budget=size)
+    assert load_converted(paths[0], None, cache_dir) is None
+    assert load_converted(paths[1], None, cache_dir) is not None
+    assert load_converted(paths[2], 'other', cache_dir) is not None
+
+
+def _workbooks(tmp_path, count):
+    """count个输入文件，以及按文件名生成对应DataFrame的loader"""
+    paths = []
+    for i in range(count):
+        path = tmp_path / f'book{i}.xlsx'
+        path.write_bytes(b'placeholder')
+        paths.append(str(path))
+
+    def loader(path):
+        return pd.DataFrame({'id': range(1000), 'name': [os.path.basename(path)] * 1000})
+
+    return paths, loader
+
+
+def test_cache_evicts_spills_and_reloads(tmp_path):
+    pytest.importorskip('pyarrow')
+    paths, loader = _workbooks(tmp_path, 3)
+    size = int(loader(paths[0]).memory_usage(deep=True).sum())
+    cache = WorkbookCache(memory_budget=size * 2, spill_dir=str(tmp_path / 'spill'))
+    for path in paths:
+        cache.get(path, loader)
+    # 预算只够两个条目，最早的被淘汰并落盘
+    stats = cache.stats()
+    assert (stats['entries'], stats['spilled'], stats['misses']) == (2, 1, 3)
+    assert cache.peek(paths[0]) is None
+
+    def fail(path):
+        raise AssertionError("落盘的条目不应重新解析")
+
+    df = cache.get(paths[0], fail)
+    assert df.equals(loader(paths[0]))
+    assert cache.stats()['spill_hits'] == 1
+
+
+def test_spill_files_are_removed_on_clear(tmp_path):
+    pytest.importorskip('pyarrow')
+    paths, loader = _workbooks(tmp_path, 2)
+    spill_dir = tmp_path / 'spill'
+    cache = WorkbookCache(memory_budget=1, spill_dir=str(spill_dir))
+    for path in paths:
+        cache.get(path, loader)
+    [process_dir] = spill_dir.iterdir()
+    assert process_dir.name.startswith(f'{os.getpid()}-')
+    assert len(list(process_dir.glob('*.parquet'))) == 2
+    cache.clear()
+    assert list(spill_dir.iterdir()) == []
+
+
+def test_stale_spills_are_swept(tmp_path):
+    spill_dir = private_dir(str(tmp_path / 'spill'))
+    stale = os.path.join(spill_dir, '1-stale')
+    recent = os.path.join(spill_dir, '2-recent')
+    for path in (stale, recent):
+        os.mkdir(path)
+        open(os.path.join(path, 'x.parquet'), 'wb').close()
+    legacy = os.path.join(spill_dir, 'legacy.parquet')
+    open(legacy, 'wb').close()
+    old = time.time() - 2 * 24 * 3600
+    os.utime(stale, (old, old))
+    remove_stale_spills(spill_dir)
+    assert sorted(os.listdir(spill_dir)) == ['2-recent']
@@ -0,0 +1,44 @@
+"""按列值拆分：每个值一个文件，超出同时打开的写入器上限的值经溢出文件写出，以及文件名的清理"""
+
+import csv
+import os
+
+import pytest
+
+from partition import partition_file
+
+
+def _write_input(tmp_path, rows):
+    input_file = tmp_path / 'in.csv'
+    with open(input_file, 'w', newline='', encoding='utf-8') as f:
+        csv.writer(f).writerows([['地区', 'id']] + rows)
+    return str(input_file)
+
+
+def _read(path):
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        return list(csv.reader(f))
+
+
+@pytest.mark.parametrize('max_open_writers', [1, 64])
+def test_one_file_per_value_in_first_seen_order(tmp_path, max_open_writers):
+    keys = ['华东', '华南', '华东', '', '西北', '华南', '华东']
+    rows = [[key, str(i)] for i, key in enumerate(keys)]
+    output_dir = tmp_path / 'out'
+    results = partition_file(_write_input(tmp_path, rows), str(output_dir), '地区', writer='csv',
+                             max_open_writers=max_open_writers)
+    assert results == [('in_华东.csv', 3), ('in_华南.csv', 2), ('in_空值.csv', 1), ('in_西北.csv', 1)]
+    assert _read(output_dir / 'in_华东.csv') == [['地区', 'id'], ['华东', '0'], ['华东', '2'], ['华东', '6']]
+    assert _read(output_dir / 'in_空值.csv') == [['地区', 'id'], ['', '3']]
+    assert sorted(os.listdir(output_dir)) == sorted(name for name, _ in results)
+
+
+def test_values_that_clean_to_the_same_name_get_a_suffix(tmp_path):
+    rows = [['a/b', '1'], ['a_b', '2'], ['A_B', '3']]
+    results = partition_file(_write_input(tmp_path, rows), str(tmp_path / 'out'), 1, writer='csv')
+    assert results == [('in_a_b.csv', 1), ('in_a_b_2.csv', 1), ('in_A_B_3.csv', 1)]
+
+
+def test_unknown_column_is_rejected(tmp_path):
+    with pytest.raises(ValueError, match='部门'):
+        partition_file(_write_input(tmp_path, [['华东', '1']]), str(tmp_path / 'out'), '部门', writer='csv')
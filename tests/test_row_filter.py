@@ -0,0 +1,147 @@
+"""列选择与行筛选：条件的解析和匹配规则，以及streaming和pandas引擎输出一致"""
+
+import csv
+import datetime
+
+import pytest
+from openpyxl import Workbook
+
+from row_filter import parse_filter, parse_selection
+from split_engine import ENGINE_PANDAS, ENGINE_STREAMING
+from splitter import Splitter
+
+
+def _write_xlsx(path, rows):
+    workbook = Workbook()
+    for row in rows:
+        workbook.active.append(row)
+    workbook.save(path)
+
+
+def _write_csv(path, rows):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        csv.writer(f).writerows(['' if value is None else value for value in row] for row in rows)
+
+
+def _output_rows(output_dir):
+    rows = []
+    for path in sorted(output_dir.iterdir()):
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            rows.extend(list(csv.reader(f))[1:])
+    return rows
+
+
+@pytest.mark.parametrize('write, name', [(_write_xlsx, 'in.xlsx'), (_write_csv, 'in.csv')])
+@pytest.mark.parametrize('columns, filters', [
+    ('name', ['id=1..7']),
+    ('name', []),
+    ('x,name', ['x=3,7,9']),
+])
+def test_engines_agree(tmp_path, write, name, columns, filters):
+    # 第3、7行满足条件但保留的列为空，不能被当作空行丢弃
+    rows = [['id', 'name', 'x']]
+    rows += [[i, None if i in (3, 7) else f'n{i}', i] for i in range(1, 11)]
+    path = tmp_path / name
+    write(path, rows)
+
+    counts = {}
+    for engine in (ENGINE_STREAMING, ENGINE_PANDAS):
+        output_dir = tmp_path / engine
+        Splitter(str(path), 4, output_dir=str(output_dir), engine=engine, writer='csv',
+                 selection=parse_selection(columns, filters)).run()
+        counts[engine] = len(_output_rows(output_dir))
+    assert counts[ENGINE_STREAMING] == counts[ENGINE_PANDAS]
+
+
+def test_filtered_rows_with_empty_kept_columns_are_kept(tmp_path):
+    path = tmp_path / 'in.xlsx'
+    _write_xlsx(path, [['id', 'name']] + [[i, None if i == 7 else f'n{i}'] for i in range(1, 11)])
+
+    result = Splitter(str(path), 100, output_dir=str(tmp_path / 'out'), writer='csv',
+                      selection=parse_selection('name', ['id=1..7'])).run()
+    assert result['rows'] == 7
+
+
+@pytest.mark.parametrize('value, matched', [
+    (100, True), (100.0, True), ('100', True), (True, False), ('0100', False), (None, False),
+])
+def test_equal_number_matches_numbers_and_text(value, matched):
+    assert parse_filter('金额=100').matches(value) is matched
+
+
+@pytest.mark.parametrize('text, value', [
+    ('id=1', True), ('id=0', False), ('有效=true', 1), ('有效=true', 1.0), ('有效=false', 0),
+])
+def test_booleans_do_not_match_numbers(text, value):
+    assert not parse_filter(text).matches(value)
+
+
+def test_one_of_text_and_booleans():
+    row_filter = parse_filter('地区 = 华东, 华南')
+    assert row_filter.matches('华南')
+    assert not row_filter.matches('华北')
+    assert parse_filter('有效=true').matches(True)
+    assert not parse_filter('有效=true').matches(1.5)
+
+
+def test_equal_date_matches_the_whole_day_value():
+    row_filter = parse_filter('日期=2024-01-02')
+    assert row_filter.matches(datetime.datetime(2024, 1, 2))
+    assert row_filter.matches(datetime.date(2024, 1, 2))
+    assert row_filter.matches('2024-01-02')
+    assert not row_filter.matches(datetime.datetime(2024, 1, 2, 8, 30))
+
+
+def test_number_range_only_matches_numbers():
+    row_filter = parse_filter('金额=10..20.5')
+    assert row_filter.matches(10) and row_filter.matches(20.5) and row_filter.matches(15.0)
+    assert not row_filter.matches(9.99) and not row_filter.matches(21)
+    # 文本和布尔值不参与数字区间
+    assert not row_filter.matches('15')
+    assert not row_filter.matches(True)
+
+
+@pytest.mark.parametrize('text, inside, outside', [
+    ('金额=1000..', [1000, 10 ** 9], [999.5]),
+    ('金额=..0', [-5, 0], [0.1]),
+    ('日期=2024-03-01..', [datetime.date(2024, 3, 1), datetime.datetime(2025, 1, 1)],
+     [datetime.datetime(2024, 2, 29, 23, 59)]),
+    ('日期=..2024-03-31', [datetime.datetime(2024, 3, 31)], [datetime.datetime(2024, 3, 31, 0, 1)]),
+    ('编号=B..', ['B', 'C01'], ['A99', 12]),
+])
+def test_open_ended_ranges(text, inside, outside):
+    row_filter = parse_filter(text)
+    assert all(row_filter.matches(value) for value in inside)
+    assert not any(row_filter.matches(value) for value in outside)
+    assert not row_filter.matches(None)
+
+
+def test_date_range_ignores_timezone_and_non_dates():
+    row_filter = parse_filter('日期=2024-01-01..2024-01-31')
+    aware = datetime.datetime(2024, 1, 15, tzinfo=datetime.timezone.utc)
+    assert row_filter.matches(aware)
+    assert not row_filter.matches('2024-01-15')
+    assert not row_filter.matches(20240115)
+
+
+def test_timezone_in_filter_values_is_ignored():
+    row_filter = parse_filter('日期=2024-01-01..2024-02-01T00:00+08:00')
+    assert row_filter.matches(datetime.datetime(2024, 1, 31, 12))
+    assert row_filter.matches(datetime.date(2024, 2, 1))
+    assert not row_filter.matches(datetime.datetime(2024, 2, 1, 0, 1))
+    assert parse_filter('日期=2024-01-02T08:00+08:00').matches(datetime.datetime(2024, 1, 2, 8))
+    aware = datetime.datetime(2024, 1, 2, 8, tzinfo=datetime.timezone.utc)
+    assert parse_filter('日期=2024-01-02T08:00').matches(aware)
+
+
+def test_mixed_range_ends_compare_as_text():
+    row_filter = parse_filter('编号=100..ABC')
+    assert row_filter.kind == 'text'
+    assert row_filter.matches('2') and row_filter.matches(500)
+    assert not row_filter.matches('ZZZ')
+
+
+@pytest.mark.parametrize('text', ['金额', '=5', '金额=..'])
+def test_invalid_filters_are_rejected(text):
+    with pytest.raises(ValueError):
+        parse_filter(text)
@@ -0,0 +1,58 @@
+"""模板输出：分块沿用输入工作表的表头样式、列宽、冻结窗格和数据列格式"""
+
+import datetime
+
+from openpyxl import Workbook, load_workbook
+from openpyxl.styles import Font, PatternFill
+
+from row_filter import parse_selection
+from splitter import Splitter
+
+
+def _write_styled_input(path):
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(['id', '日期', '金额'])
+    for i in range(5):
+        sheet.append([i, datetime.date(2024, 1, i + 1), i * 10.5])
+    for cell in sheet[1]:
+        cell.font = Font(bold=True)
+        cell.fill = PatternFill('solid', fgColor='FFFF00')
+    for row in sheet.iter_rows(min_row=2):
+        row[1].number_format = 'yyyy/mm/dd'
+        row[2].number_format = '#,##0.00'
+    sheet.column_dimensions['B'].width = 24
+    sheet.row_dimensions[1].height = 30
+    sheet.freeze_panes = 'B2'
+    workbook.save(path)
+
+
+def test_chunks_keep_the_input_layout(tmp_path):
+    input_file = tmp_path / 'in.xlsx'
+    _write_styled_input(input_file)
+    result = Splitter(str(input_file), 3, output_dir=str(tmp_path / 'out'), writer='template').run()
+    assert [rows for _, rows in result['files']] == [3, 2]
+
+    sheet = load_workbook(tmp_path / 'out' / 'in_002.xlsx').active
+    assert [cell.value for cell in sheet[1]] == ['id', '日期', '金额']
+    assert all(cell.font.bold and cell.fill.fgColor.rgb == '00FFFF00' for cell in sheet[1])
+    assert sheet.row_dimensions[1].height == 30
+    assert sheet.column_dimensions['B'].width == 24
+    assert sheet.freeze_panes == 'B2'
+    assert [cell.value for cell in sheet[2]] == [3, datetime.datetime(2024, 1, 4), 31.5]
+    assert (sheet['B2'].number_format, sheet['C2'].number_format) == ('yyyy/mm/dd', '#,##0.00')
+
+
+def test_selected_columns_take_their_styles_along(tmp_path):
+    input_file = tmp_path / 'in.xlsx'
+    _write_styled_input(input_file)
+    selection = parse_selection('金额,日期', [])
+    Splitter(str(input_file), 10, output_dir=str(tmp_path / 'out'), writer='template',
+             selection=selection).run()
+
+    sheet = load_workbook(tmp_path / 'out' / 'in_001.xlsx').active
+    assert [cell.value for cell in sheet[1]] == ['金额', '日期']
+    assert (sheet['A2'].number_format, sheet['B2'].number_format) == ('#,##0.00', 'yyyy/mm/dd')
+    # 日期列移到了B列；原冻结的首列id没有保留，只冻结表头行
+    assert sheet.column_dimensions['B'].width == 24
+    assert sheet.freeze_panes == 'A2'
@@ -0,0 +1,78 @@
+"""按文件大小拆分：大小上限、超限重写后顺延的行，以及每行字节数的在线估算"""
+
+import csv
+import os
+
+import pytest
+
+import size_split
+from size_split import SizeEstimator, split_by_size
+from writers import get_writer
+
+
+def _write_input(tmp_path, rows):
+    input_file = tmp_path / 'in.csv'
+    with open(input_file, 'w', newline='', encoding='utf-8') as f:
+        csv.writer(f).writerows([['id', 'text']] + rows)
+    return str(input_file)
+
+
+def _split(tmp_path, rows, max_bytes):
+    """拆分为CSV，返回 (各文件的大小, 各文件的数据行)"""
+    output_dir = tmp_path / 'out'
+    results = split_by_size(_write_input(tmp_path, rows), str(output_dir), max_bytes, writer='csv')
+    sizes, chunks = [], []
+    for output_filename, row_count in results:
+        path = output_dir / output_filename
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            records = list(csv.reader(f))
+        assert records[0] == ['id', 'text']
+        assert len(records) - 1 == row_count
+        sizes.append(os.path.getsize(path))
+        chunks.append(records[1:])
+    assert not [name for name in os.listdir(output_dir) if name.startswith('.part-')]
+    return sizes, chunks
+
+
+def test_files_stay_under_the_cap(tmp_path):
+    rows = [[str(i), 'x' * 20] for i in range(2000)]
+    sizes, chunks = _split(tmp_path, rows, 4096)
+    assert len(chunks) > 1
+    assert max(sizes) <= 4096
+    assert [row for chunk in chunks for row in chunk] == rows
+
+
+def test_rows_after_a_rewrite_move_to_the_next_file(tmp_path, monkeypatch):
+    # 样本之后的行长得多，按样本估算的分块超出上限，需要重写并把多出的行顺延
+    monkeypatch.setattr(size_split, 'SAMPLE_ROWS', 10)
+    monkeypatch.setattr(size_split, 'MEMORY_ROWS', 5)
+    rows = [[str(i), 'x' * (2 if i < 10 else 200)] for i in range(300)]
+    sizes, chunks = _split(tmp_path, rows, 2048)
+    assert max(sizes) <= 2048
+    assert [row for chunk in chunks for row in chunk] == rows
+
+
+def test_single_row_over_the_cap_gets_its_own_file(tmp_path):
+    rows = [['1', 'a'], ['2', 'x' * 500], ['3', 'b']]
+    sizes, chunks = _split(tmp_path, rows, 200)
+    assert [row for chunk in chunks for row in chunk] == rows
+    assert [['2', 'x' * 500]] in chunks
+
+
+def test_estimator_from_sample(tmp_path):
+    sample = [(i, 'x' * 8) for i in range(100)]
+    estimator = SizeEstimator.from_sample(get_writer('csv'), ['id', 'text'], sample, str(tmp_path))
+    # 带BOM的表头；样本行为 "<i>,xxxxxxxx\r\n"
+    assert estimator.overhead == len('﻿id,text\r\n'.encode('utf-8'))
+    assert estimator.bytes_per_row == pytest.approx(sum(len(f'{i},xxxxxxxx\r\n') for i in range(100)) / 100)
+    assert os.listdir(tmp_path) == []
+
+
+def test_estimator_rows_for_and_update():
+    estimator = SizeEstimator(overhead=100, bytes_per_row=10)
+    assert estimator.rows_for(1100) == int((1100 * size_split.SIZE_HEADROOM - 100) / 10)
+    # 上限连固定开销都放不下时至少一行
+    assert estimator.rows_for(50) == 1
+    # 实测每行30字节，与旧估算各占一半
+    estimator.update(10, 100 + 300)
+    assert estimator.bytes_per_row == 20
@@ -0,0 +1,87 @@
+"""streaming和pandas引擎读取的单元格值：相同的部分和README“两种引擎的差异”中列出的不同"""
+
+import csv
+import datetime
+
+from openpyxl import Workbook
+
+from split_engine import frame_rows, open_rows, read_excel_dataframe
+
+
+def _engine_rows(path):
+    """返回 (streaming的数据行, pandas的数据行)"""
+    _, rows, _ = open_rows(path)
+    _, frame = frame_rows(read_excel_dataframe(path))
+    return [tuple(row) for row in rows], [tuple(row) for row in frame]
+
+
+def _column(rows, index):
+    return [row[index] if index < len(row) else None for row in rows]
+
+
+def _typed(values):
+    return [(type(value).__name__, value) for value in values]
+
+
+def _write_xlsx(path, rows):
+    workbook = Workbook()
+    for row in rows:
+        workbook.active.append(row)
+    workbook.save(path)
+
+
+def test_xlsx_common_values_agree(tmp_path):
+    path = tmp_path / 'in.xlsx'
+    _write_xlsx(path, [
+        ['name', 'count', 'day', None, 'name'],
+        ['a', 1, datetime.datetime(2024, 1, 2), None, 'x'],
+        ['b', None, datetime.datetime(2024, 3, 4), None, 'y'],
+        [None, None, None, None, None],
+        ['c', 3, None, None, None],
+    ])
+    streaming, pandas = _engine_rows(str(path))
+    assert open_rows(str(path))[0] == list(read_excel_dataframe(str(path)).columns)
+    assert len(streaming) == len(pandas)
+    for index in range(5):
+        assert _typed(_column(streaming, index)) == _typed(_column(pandas, index))
+
+
+def test_xlsx_documented_differences(tmp_path):
+    path = tmp_path / 'in.xlsx'
+    _write_xlsx(path, [
+        ['code', 'note', 'amount', 'flag'],
+        ['007', 'NA', 3, True],
+        ['010', 'x', 2.5, None],
+    ])
+    streaming, pandas = _engine_rows(str(path))
+    # 数字样式的文本
+    assert _column(streaming, 0) == ['007', '010']
+    assert _column(pandas, 0) == [7, 10]
+    # NA等文本
+    assert _column(streaming, 1) == ['NA', 'x']
+    assert _column(pandas, 1) == [None, 'x']
+    # 同一列中的整数和小数
+    assert _typed(_column(streaming, 2)) == [('int', 3), ('float', 2.5)]
+    assert _typed(_column(pandas, 2)) == [('float', 3.0), ('float', 2.5)]
+    # 含空单元格的布尔列
+    assert _typed(_column(streaming, 3)) == [('bool', True), ('NoneType', None)]
+    assert _typed(_column(pandas, 3)) == [('int', 1), ('NoneType', None)]
+
+
+def test_csv_documented_differences(tmp_path):
+    path = tmp_path / 'in.csv'
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        csv.writer(f).writerows([
+            ['code', 'mixed', 'flag', 'ratio'],
+            ['007', 'abc', 'True', '1.0'],
+            ['010', '5', 'False', ''],
+        ])
+    streaming, pandas = _engine_rows(str(path))
+    assert _column(streaming, 0) == ['007', '010']
+    assert _column(pandas, 0) == [7, 10]
+    assert _column(streaming, 1) == ['abc', 5]
+    assert _column(pandas, 1) == ['abc', '5']
+    assert _typed(_column(streaming, 2)) == [('str', 'True'), ('str', 'False')]
+    assert _typed(_column(pandas, 2)) == [('bool', True), ('bool', False)]
+    assert _typed(_column(streaming, 3)) == [('float', 1.0), ('NoneType', None)]
+    assert _typed(_column(pandas, 3)) == [('int', 1), ('NoneType', None)]
@@ -0,0 +1,74 @@
+"""写出后端：各xlsx后端写出的值与openpyxl后端一致"""
+
+import datetime
+import warnings
+
+import pytest
+from openpyxl import load_workbook
+
+from writers import CsvWriter, get_writer
+
+HEADER = ['text', 'number', 'when']
+ROWS = [
+    ('http://example.com/a', 1, datetime.datetime(2024, 1, 2, 3, 4, 5)),
+    ('https://example.com/' + 'x' * 2100, 2.5, None),
+    ('mailto:someone@example.com', -3, datetime.datetime(2024, 2, 1)),
+    ('{=SUM(A1:A2)}', None, None),
+    ('=1+1', 10 ** 12, None),
+    ('007', 0, None),
+    ('  前后空格  ', None, None),
+    ('ftp://files.example.com/data.csv', None, None),
+]
+
+
+def _read_back(path):
+    workbook = load_workbook(path, read_only=True)
+    try:
+        rows = []
+        for row in workbook.active.iter_rows(values_only=True):
+            # 只读模式按工作表的dimension补齐行尾的空单元格，各后端的dimension可能不同
+            row = list(row)
+            while row and row[-1] is None:
+                row.pop()
+            rows.append(tuple(row))
+        return rows
+    finally:
+        workbook.close()
+
+
+def _write(tmp_path, name):
+    writer = get_writer(name)
+    path = str(tmp_path / f'{name}{writer.extension}')
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        writer.write(path, HEADER, ROWS)
+    return path
+
+
+@pytest.mark.parametrize('name', ['xlsxwriter', 'template'])
+def test_xlsx_backends_keep_text_cells(tmp_path, name):
+    expected = _read_back(_write(tmp_path, 'openpyxl'))
+    actual = _read_back(_write(tmp_path, name))
+    assert actual == expected
+    assert [row[0] for row in actual[1:]] == [row[0] for row in ROWS]
+
+
+def test_many_urls_are_all_kept(tmp_path):
+    # xlsxwriter每个工作表最多65530个超链接，超出的文本会被丢弃
+    rows = [(f'http://example.com/{i}',) for i in range(65600)]
+    path = str(tmp_path / 'urls.xlsx')
+    get_writer('xlsxwriter').write(path, ['url'], rows)
+    values = [row[0] for row in _read_back(path)[1:]]
+    assert len(values) == len(rows)
+    assert values[-1] == 'http://example.com/65599'
+
+
+def test_csv_round_trip(tmp_path):
+    path = tmp_path / 'out.csv'
+    CsvWriter().write(str(path), HEADER, [('地区', 1, None)])
+    assert path.read_bytes() == '﻿text,number,when\r\n地区,1,\r\n'.encode('utf-8')
+
+
+def test_unknown_writer_is_rejected():
+    with pytest.raises(ValueError):
+        get_writer('xls')